@@ -4,7 +4,7 @@
 #
 
 from kubernetes.client.rest import ApiException
-from .. import consts, kubeutils, config, utils
+from .. import consts, kubeutils, config, utils, metrics, sharding, executors
 from ..kubeutils import api_core, api_batch
 from ..innodbcluster.cluster_api import InnoDBCluster
 from .backup_api import MySQLBackup
@@ -15,7 +15,10 @@ from logging import Logger
 
 @kopf.on.create(consts.GROUP, consts.VERSION,
                 consts.MYSQLBACKUP_PLURAL)  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_kubernetes_io)
 def on_mysqlbackup_create(name: str, namespace: str, spec: dict, body: dict, logger: Logger, **kwargs):
+    sharding.ensure_owned(namespace, spec.get("clusterName"))
     logger.info(f"Initializing MySQL Backup job name={name} namespace={namespace}")
 
     backup = MySQLBackup(body)
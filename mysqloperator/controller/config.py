@@ -18,6 +18,70 @@ if _pull_policy:
 else:
     default_image_pull_policy = ImagePullPolicy.Always
 
+# Number of instances diagnosed in parallel and the time budget in seconds
+# for diagnosing all instances of a cluster
+DIAGNOSE_MAX_WORKERS = int(os.getenv("MYSQL_OPERATOR_DIAGNOSE_MAX_WORKERS", default="8"))
+DIAGNOSE_TIMEOUT = int(os.getenv("MYSQL_OPERATOR_DIAGNOSE_TIMEOUT", default="60"))
+# Diagnose the active members from performance_schema instead of the AdminAPI
+# cluster status, which is only used if the members don't agree on the group
+DIAGNOSE_FAST = os.getenv("MYSQL_OPERATOR_DIAGNOSE_FAST", default="1").lower() in ("1", "true")
+
+# Number of threads waiting for group view change notices of the monitored
+# clusters, and number of threads running the view change handlers
+GROUP_MONITOR_SHARDS = int(os.getenv("MYSQL_OPERATOR_GROUP_MONITOR_SHARDS", default="4"))
+GROUP_MONITOR_HANDLER_WORKERS = int(os.getenv("MYSQL_OPERATOR_GROUP_MONITOR_HANDLER_WORKERS", default="4"))
+# Seconds of inactivity after which a monitoring session is pinged
+GROUP_MONITOR_PING_INTERVAL = int(os.getenv("MYSQL_OPERATOR_GROUP_MONITOR_PING_INTERVAL", default="30"))
+# Seconds a monitoring session may take to connect to a member
+GROUP_MONITOR_CONNECT_TIMEOUT = int(os.getenv("MYSQL_OPERATOR_GROUP_MONITOR_CONNECT_TIMEOUT", default="5"))
+# Seconds to wait for more view changes of a cluster before handling them
+GROUP_MONITOR_DEBOUNCE = float(os.getenv("MYSQL_OPERATOR_GROUP_MONITOR_DEBOUNCE", default="1"))
+
+# Admin session pool: max sessions per member, seconds to wait for one when
+# the limit is reached, seconds an idle session is kept and seconds of
+# idleness after which a session is checked before being reused
+SESSION_POOL_MAX_PER_TARGET = int(os.getenv("MYSQL_OPERATOR_SESSION_POOL_MAX_PER_TARGET", default="4"))
+SESSION_POOL_ACQUIRE_TIMEOUT = int(os.getenv("MYSQL_OPERATOR_SESSION_POOL_ACQUIRE_TIMEOUT", default="10"))
+SESSION_POOL_IDLE_TIMEOUT = int(os.getenv("MYSQL_OPERATOR_SESSION_POOL_IDLE_TIMEOUT", default="300"))
+SESSION_POOL_HEALTH_CHECK_INTERVAL = int(os.getenv("MYSQL_OPERATOR_SESSION_POOL_HEALTH_CHECK_INTERVAL", default="5"))
+
+# Seconds a handler waits for its turn to work on a cluster and the max number
+# of handlers waiting per cluster, before they're retried later by kopf
+CLUSTER_MUTEX_TIMEOUT = int(os.getenv("MYSQL_OPERATOR_CLUSTER_MUTEX_TIMEOUT", default="30"))
+CLUSTER_MUTEX_MAX_WAITERS = int(os.getenv("MYSQL_OPERATOR_CLUSTER_MUTEX_MAX_WAITERS", default="2"))
+# Number of threads running delayed retries of pod events
+POD_EVENT_RETRY_WORKERS = int(os.getenv("MYSQL_OPERATOR_POD_EVENT_RETRY_WORKERS", default="2"))
+# Seconds after which status.cluster is rewritten by a probe even if the
+# status didn't change, so that lastProbeTime doesn't get too old
+CLUSTER_STATUS_HEARTBEAT = int(os.getenv("MYSQL_OPERATOR_CLUSTER_STATUS_HEARTBEAT", default="600"))
+
+# Number of clusters handled in parallel by the housekeeping done after the
+# operator starts, and seconds after which it stops waiting for one cluster
+STARTUP_WORKERS = int(os.getenv("MYSQL_OPERATOR_STARTUP_WORKERS", default="8"))
+STARTUP_CLUSTER_TIMEOUT = int(os.getenv("MYSQL_OPERATOR_STARTUP_CLUSTER_TIMEOUT", default="120"))
+
+# Number of threads running the kopf handlers, one pool for handlers doing
+# Kubernetes API calls and short queries, another for long MySQL admin
+# operations (creating the cluster, joining with clone, rejoin, reboot)
+KUBERNETES_IO_WORKERS = int(os.getenv("MYSQL_OPERATOR_KUBERNETES_IO_WORKERS", default="16"))
+MYSQL_ADMIN_WORKERS = int(os.getenv("MYSQL_OPERATOR_MYSQL_ADMIN_WORKERS", default="8"))
+
+# Number of threads running the ConfigMap commands queued while handling a
+# spec change, which are all done before the StatefulSet is updated
+API_COMMAND_WORKERS = int(os.getenv("MYSQL_OPERATOR_API_COMMAND_WORKERS", default="4"))
+
+# Number of parsed InnoDBCluster specs kept, one per cluster and generation
+PARSED_SPEC_CACHE_SIZE = int(os.getenv("MYSQL_OPERATOR_PARSED_SPEC_CACHE_SIZE", default="256"))
+
+# Sharding of the clusters between operator replicas, which are then all
+# active, instead of a single active replica. Membership is tracked with
+# Leases in the operator namespace that expire after the given seconds
+SHARDING = os.getenv("MYSQL_OPERATOR_SHARDING", default="false").lower() in ("1", "true")
+SHARDING_LEASE_DURATION = int(os.getenv("MYSQL_OPERATOR_SHARDING_LEASE_DURATION", default="15"))
+
+# Port of the operator's Prometheus metrics endpoint (/metrics), 0 disables it
+METRICS_PORT = int(os.getenv("MYSQL_OPERATOR_METRICS_PORT", default="9090"))
+
 
 # Constants
 OPERATOR_VERSION = "2.2.2"
@@ -69,6 +133,9 @@ def log_config_banner(logger) -> None:
     logger.info(f"DEFAULT_VERSION_TAG={DEFAULT_VERSION_TAG}")
     logger.info(f"SIDECAR_VERSION_TAG={DEFAULT_OPERATOR_VERSION_TAG}")
     logger.info(f"DEFAULT_IMAGE_REPOSITORY   ={DEFAULT_IMAGE_REPOSITORY}")
+    logger.info(f"KUBERNETES_IO_WORKERS={KUBERNETES_IO_WORKERS}")
+    logger.info(f"MYSQL_ADMIN_WORKERS  ={MYSQL_ADMIN_WORKERS}")
+    logger.info(f"API_COMMAND_WORKERS  ={API_COMMAND_WORKERS}")
     for dist in pkg_resources.working_set:
         pkg = str(dist).split(" ")
         logger.info(f"{pkg[0]:20} = {pkg[1]:10}")
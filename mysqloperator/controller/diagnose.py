@@ -8,10 +8,13 @@ from kubernetes.client.rest import ApiException
 from .innodbcluster.cluster_api import InnoDBCluster, MySQLPod
 import typing
 from typing import Optional, TYPE_CHECKING, Tuple, List, Set, Dict, cast
-from . import shellutils, consts, errors
+from . import shellutils, consts, config, errors, metrics
+from .session_pool import g_session_pool
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 import kopf
 import mysqlsh
 import enum
+import threading
 import time
 if TYPE_CHECKING:
     from mysqlsh.mysql import ClassicSession
@@ -66,7 +69,7 @@ class InstanceStatus:
     def __repr__(self) -> str:
         return f"InstanceStatus: pod={self.pod} status={self.status} connect_error={self.connect_error} view_id={self.view_id} is_primary={self.is_primary} in_quorum={self.in_quorum} peers={self.peers}"
 
-def diagnose_instance(pod: MySQLPod, logger, dba: 'Dba' = None) -> InstanceStatus:
+def diagnose_instance(pod: MySQLPod, logger, dba: 'Dba' = None, fast: bool = False) -> InstanceStatus:
     """
     Check state of an instance in the given pod.
 
@@ -74,32 +77,126 @@ def diagnose_instance(pod: MySQLPod, logger, dba: 'Dba' = None) -> InstanceStatu
     and its own local copy of the metadata (if there is one). Thus, it can be
     incorrect, if for example, the pod was deleted and didn't have its copy of
     the metadata updated or if there's a split-brain.
+
+    With fast, active members are diagnosed from performance_schema only, see
+    diagnose_connected_instance_fast().
     """
     status = InstanceStatus()
     status.pod = pod
 
-    if not dba:
-        try:
-            dba = mysqlsh.connect_dba(pod.endpoint_co)
-        except mysqlsh.Error as e:
-            logger.info(f"Could not connect to {pod.endpoint}: error={e}")
-            status.connect_error = e.code
-
-            if mysql.ErrorCode.CR_MAX_ERROR >= e.code >= mysql.ErrorCode.CR_MIN_ERROR:
-                # client side errors mean we can't connect to the server, but the
-                # problem could be in the client or network and not the server
-
-                # Check status of the pod
-                pod.reload()
-                logger.debug(f"{pod.endpoint}: pod.phase={pod.phase}  deleting={pod.deleting}")
-                if pod.phase != "Running" or not pod.check_containers_ready() or pod.deleting:
-                    # not ONLINE for sure if the Pod is not running
-                    status.status = InstanceDiagStatus.OFFLINE
-            else:
-                if shellutils.check_fatal_connect(e, pod.endpoint_url_safe, logger):
-                    raise
+    if dba:
+        return diagnose_connected_instance(status, dba, logger)
+
+    try:
+        key, entry = g_session_pool.acquire(pod, logger)
+    except mysqlsh.Error as e:
+        logger.info(f"Could not connect to {pod.endpoint}: error={e}")
+        status.connect_error = e.code
+
+        if mysql.ErrorCode.CR_MAX_ERROR >= e.code >= mysql.ErrorCode.CR_MIN_ERROR:
+            # client side errors mean we can't connect to the server, but the
+            # problem could be in the client or network and not the server
+
+            # Check status of the pod
+            pod.reload()
+            logger.debug(f"{pod.endpoint}: pod.phase={pod.phase}  deleting={pod.deleting}")
+            if pod.phase != "Running" or not pod.check_containers_ready() or pod.deleting:
+                # not ONLINE for sure if the Pod is not running
+                status.status = InstanceDiagStatus.OFFLINE
+        else:
+            if shellutils.check_fatal_connect(e, pod.endpoint_url_safe, logger):
+                raise
+
+        return status
+
+    reuse = False
+    try:
+        if not (fast and diagnose_connected_instance_fast(status, entry.dba, logger)):
+            status = diagnose_connected_instance(status, entry.dba, logger)
+        # don't keep sessions which might have gone bad while diagnosing
+        reuse = status.status != InstanceDiagStatus.UNKNOWN
+        return status
+    finally:
+        g_session_pool.release(key, entry, reuse)
+
+
+def diagnose_connected_instance(status: InstanceStatus, dba: 'Dba', logger) -> InstanceStatus:
+    metrics.diagnose_instances.inc("full")
+    with metrics.mysql_query_duration.time(shellutils.target_role(status.pod)):
+        return do_diagnose_connected_instance(status, dba, logger)
+
+
+# The group as seen by the instance, one row per member (or a single row with
+# NULL member columns if Group Replication is not installed)
+k_fast_diagnose_query = """SELECT @@server_uuid, @@gtid_executed,
+    (SELECT view_id FROM performance_schema.replication_group_member_stats
+      WHERE member_id = @@server_uuid),
+    m.member_id, m.member_host, m.member_port, m.member_state, m.member_role
+  FROM (SELECT 1) AS dual_row
+    LEFT JOIN performance_schema.replication_group_members AS m ON m.member_id <> ''"""
+
+
+def diagnose_connected_instance_fast(status: InstanceStatus, dba: 'Dba', logger) -> bool:
+    """
+    Diagnose an active member with a single query of performance_schema,
+    instead of reading the metadata and the status of every member through
+    the AdminAPI. Each member reports its own view of the group, which is all
+    the cluster diagnosis needs.
+
+    Returns False if that's not conclusive, in which case the full AdminAPI
+    status must be used: for read replicas, for instances that aren't ONLINE
+    or RECOVERING (telling OFFLINE, NOT_MANAGED and UNMANAGED apart needs the
+    metadata) and if the query fails.
+    """
+    pod = status.pod
+    if pod.instance_type != "group-member":
+        return False
+
+    try:
+        with metrics.mysql_query_duration.time(shellutils.target_role(pod)):
+            rows = dba.session.run_sql(k_fast_diagnose_query).fetch_all()
+    except mysqlsh.Error as e:
+        if shellutils.check_fatal(e, pod.endpoint_url_safe, "diagnose", logger):
+            raise
+        logger.info(f"Fast diagnosis failed at {pod.endpoint}: error={e}")
+        return False
+
+    server_uuid, gtid_executed, view_id = rows[0][0], rows[0][1], rows[0][2]
+    members = {}
+    mystate = myrole = myendpoint = None
+    for row in rows:
+        member_id, host, port, state, role = row[3], row[4], row[5], row[6], row[7]
+        if not member_id:
+            continue
+        members[f"{host}:{port}"] = state
+        if member_id == server_uuid:
+            mystate, myrole, myendpoint = state, role, f"{host}:{port}"
+
+    if mystate not in ("ONLINE", "RECOVERING") or not view_id:
+        return False
+    if myendpoint != pod.endpoint:
+        logger.info(f"{pod.endpoint} reports itself as {myendpoint} in the group")
+        return False
+
+    metrics.diagnose_instances.inc("fast")
+    status.gtid_executed = gtid_executed
+    status.view_id = view_id
+    status.peers = members
+    # members that are UNREACHABLE still count for the majority
+    reachable = [m for m, state in members.items() if state != "UNREACHABLE"]
+    status.in_quorum = len(reachable) * 2 > len(members)
+    if mystate == "ONLINE":
+        status.is_primary = myrole == "PRIMARY"
+        status.status = InstanceDiagStatus.ONLINE
+    else:
+        status.status = InstanceDiagStatus.RECOVERING
+    if not status.in_quorum:
+        logger.info(f"No quorum visible from {pod.endpoint}: members={members}")
+    return True
+
 
-            return status
+def do_diagnose_connected_instance(status: InstanceStatus, dba: 'Dba', logger) -> InstanceStatus:
+    pod = status.pod
 
     cluster = None
     if dba:
@@ -457,6 +554,93 @@ class ClusterStatus:
     gtid_executed: Dict[int,str] = {}
 
 
+# Probes that did not finish within the deadline of diagnose_instances() and
+# are still running, at most one per instance. They hold a connection until
+# they return, so an instance isn't probed again until its probe finished.
+g_late_probes: Dict[str, Future] = {}
+g_late_probes_lock = threading.Lock()
+
+
+def forget_late_probe(endpoint: str, future: Future) -> None:
+    with g_late_probes_lock:
+        if g_late_probes.get(endpoint) is future:
+            del g_late_probes[endpoint]
+
+
+def diagnose_instances(pods: typing.Iterable[MySQLPod], logger, fast: bool = False) -> Dict[MySQLPod, InstanceStatus]:
+    """
+    Diagnose the given instances in parallel, using at most
+    config.DIAGNOSE_MAX_WORKERS connections at a time.
+
+    Instances that could not be diagnosed within config.DIAGNOSE_TIMEOUT
+    seconds are reported with status UNKNOWN, as are the instances for which
+    such a late probe is still running.
+    """
+    pods = list(pods)
+    statuses = {}
+
+    def unknown(pod: MySQLPod) -> InstanceStatus:
+        status = InstanceStatus()
+        status.pod = pod
+        return status
+
+    with g_late_probes_lock:
+        late = [pod for pod in pods if pod.endpoint in g_late_probes]
+    for pod in late:
+        logger.warning(f"Previous diagnosis of {pod} is still running")
+        statuses[pod] = unknown(pod)
+    pods = [pod for pod in pods if pod not in statuses]
+    if not pods:
+        return statuses
+
+    executor = ThreadPoolExecutor(max_workers=min(len(pods), config.DIAGNOSE_MAX_WORKERS),
+                                  thread_name_prefix="diagnose")
+    try:
+        futures = {executor.submit(diagnose_instance, pod, logger, None, fast): pod for pod in pods}
+        try:
+            for future in as_completed(futures, timeout=config.DIAGNOSE_TIMEOUT):
+                statuses[futures[future]] = future.result()
+        except FuturesTimeoutError:
+            for future, pod in futures.items():
+                if pod not in statuses:
+                    logger.warning(f"Diagnosing {pod} did not finish within {config.DIAGNOSE_TIMEOUT}s")
+                    if not future.cancel():
+                        with g_late_probes_lock:
+                            g_late_probes[pod.endpoint] = future
+                        future.add_done_callback(lambda f, endpoint=pod.endpoint: forget_late_probe(endpoint, f))
+                    statuses[pod] = unknown(pod)
+    finally:
+        # don't wait for probes stuck past the deadline, they will finish on their own
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return statuses
+
+
+def instance_statuses_consistent(statuses: Dict[MySQLPod, InstanceStatus], logger) -> bool:
+    """
+    Check that the views of the group reported by the active members agree,
+    i.e. that the members with quorum have the same view, only list pods of
+    the cluster and that their ONLINE peers report themselves as active.
+    """
+    endpoints = {pod.endpoint for pod in statuses}
+    active = {pod.endpoint: status for pod, status in statuses.items()
+              if status.status in (InstanceDiagStatus.ONLINE, InstanceDiagStatus.RECOVERING)}
+    views = set()
+    for endpoint, status in active.items():
+        if not status.in_quorum:
+            continue
+        views.add(status.view_id)
+        unknown = set(status.peers) - endpoints
+        missing = {peer for peer, state in status.peers.items() if state in ("ONLINE", "RECOVERING")} - set(active)
+        if unknown or missing:
+            logger.info(f"Group view of {endpoint} is inconsistent: unknown={unknown} not_active={missing}")
+            return False
+    if len(views) > 1:
+        logger.info(f"Members with quorum have different views: {views}")
+        return False
+    return True
+
+
 def do_diagnose_cluster(cluster: InnoDBCluster, logger) -> ClusterStatus:
     if not cluster.deleting:
         cluster.reload()
@@ -485,12 +669,12 @@ def do_diagnose_cluster(cluster: InnoDBCluster, logger) -> ClusterStatus:
     gtid_executed = {}
 
     online_pod_statuses = {}
-    for pod in all_pods:
-        # Diagnose the instance even if deleting - so we can remove it from the cluster and later re-add it
-#        if pod.deleting:
-#            logger.info(f"instance {pod} is deleting")
-#            continue
-        status = diagnose_instance(pod, logger)
+    # Diagnose the instance even if deleting - so we can remove it from the cluster and later re-add it
+    statuses = diagnose_instances(all_pods, logger, fast=config.DIAGNOSE_FAST)
+    if config.DIAGNOSE_FAST and not instance_statuses_consistent(statuses, logger):
+        logger.info(f"Fast diagnosis of {cluster.name} is inconsistent, using the AdminAPI status")
+        statuses = diagnose_instances(all_pods, logger)
+    for pod, status in statuses.items():
         log_msg += f"\ndiag instance {pod} --> {status.status} quorum={status.in_quorum} gtid_executed={status.gtid_executed}"
 
         gtid_executed[pod.index] = status.gtid_executed
@@ -583,6 +767,60 @@ def do_diagnose_cluster(cluster: InnoDBCluster, logger) -> ClusterStatus:
     return cluster_status
 
 
+class DiagnosisCache:
+    """
+    Last diagnosis of each cluster, reused until the group or the pods of the
+    cluster change. The key is made of the membership of the group as seen by
+    the GroupMonitor (member ids, roles, states and view id) and of the names
+    and UIDs of the pods, so any observed view change, member state change or
+    pod replacement makes the entry stale. Changes made by the operator
+    itself (e.g. a join or a reboot) invalidate the entry explicitly, as they
+    may not have been observed yet.
+
+    Only healthy statuses are cached, anything else is diagnosed again so
+    that it can be acted upon. Nothing is cached while a member is
+    RECOVERING, as it becomes ONLINE (or fails) without a view change.
+    """
+
+    cacheable = (ClusterDiagStatus.ONLINE, ClusterDiagStatus.ONLINE_PARTIAL)
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # namespace/name -> (key, ClusterStatus)
+        self.entries: Dict[str, Tuple[tuple, ClusterStatus]] = {}
+
+    def key(self, cluster: InnoDBCluster, view: Optional[tuple]) -> Optional[tuple]:
+        if not view or any(status == "RECOVERING" for _, _, status, _ in view):
+            return None
+        pods = frozenset((pod.name, pod.metadata.uid) for pod in cluster.get_pods())
+        return (cluster.uid, view, pods)
+
+    def get(self, cluster: InnoDBCluster, key: Optional[tuple]) -> Optional[ClusterStatus]:
+        if not key:
+            return None
+        with self.lock:
+            entry = self.entries.get(f"{cluster.namespace}/{cluster.name}")
+        if entry and entry[0] == key:
+            metrics.diagnose_cache.inc("hit")
+            return entry[1]
+        metrics.diagnose_cache.inc("miss")
+        return None
+
+    def set(self, cluster: InnoDBCluster, key: Optional[tuple], status: ClusterStatus) -> None:
+        with self.lock:
+            if key and status.status in self.cacheable:
+                self.entries[f"{cluster.namespace}/{cluster.name}"] = (key, status)
+            else:
+                self.entries.pop(f"{cluster.namespace}/{cluster.name}", None)
+
+    def invalidate(self, cluster: InnoDBCluster) -> None:
+        with self.lock:
+            self.entries.pop(f"{cluster.namespace}/{cluster.name}", None)
+
+
+g_diagnosis_cache = DiagnosisCache()
+
+
 def diagnose_cluster(cluster: InnoDBCluster, logger) -> ClusterStatus:
     """
     Diagnose the state of an InnoDB cluster, assuming it was already initialized.
@@ -613,4 +851,5 @@ def diagnose_cluster(cluster: InnoDBCluster, logger) -> ClusterStatus:
         - auth error on a pod that's already initialized
     """
 
-    return cast(ClusterStatus, shellutils.RetryLoop(logger).call(do_diagnose_cluster, cluster, logger))
+    with metrics.diagnose_cluster_duration.time():
+        return cast(ClusterStatus, shellutils.RetryLoop(logger).call(do_diagnose_cluster, cluster, logger))
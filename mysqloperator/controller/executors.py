@@ -0,0 +1,86 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from . import config, metrics
+import asyncio
+import contextvars
+import functools
+import time
+
+T = TypeVar("T")
+
+
+class HandlerExecutor(ThreadPoolExecutor):
+    """
+    Thread pool running the blocking part of the handlers. The handlers are
+    async and kopf runs them in its event loop, each one picks the pool
+    matching how long its work can take, so that handlers doing Kubernetes
+    I/O and short queries never wait behind a clone or a reboot.
+    """
+
+    def __init__(self, name: str, max_workers: int) -> None:
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        self.name = name
+        metrics.handler_executor_workers.set(name, value=max_workers)
+        metrics.handler_executor_active.set(name, value=0)
+        metrics.handler_executor_queued.set(name, value=0)
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Call fn in the pool and wait for it. The context is copied like kopf
+        does for sync handlers, so that kopf.adopt() etc. work in fn.
+        """
+        context = contextvars.copy_context()
+        queued = time.monotonic()
+        metrics.handler_executor_queued.inc(self.name)
+
+        def call() -> T:
+            metrics.handler_executor_queued.dec(self.name)
+            metrics.handler_executor_wait.observe(self.name, value=time.monotonic() - queued)
+            metrics.handler_executor_active.inc(self.name)
+            try:
+                return context.run(fn, *args, **kwargs)
+            finally:
+                metrics.handler_executor_active.dec(self.name)
+
+        future = asyncio.get_running_loop().run_in_executor(self, call)
+        # As kopf does, if the handler gets cancelled let the thread finish
+        # first, so that there are no orphan threads still using the pool
+        cancellation: Optional[asyncio.CancelledError] = None
+        while not future.done():
+            try:
+                await asyncio.shield(future)
+            except asyncio.CancelledError as e:
+                cancellation = e
+        if cancellation is not None:
+            raise cancellation
+        return future.result()
+
+
+g_kubernetes_io = HandlerExecutor("kubernetes-io", config.KUBERNETES_IO_WORKERS)
+g_mysql_admin = HandlerExecutor("mysql-admin", config.MYSQL_ADMIN_WORKERS)
+
+
+def run_in(executor: HandlerExecutor) -> Callable[[Callable[..., T]], Callable[..., Any]]:
+    """
+    Decorator turning a sync handler into an async one that runs it in the
+    given pool. kopf follows __wrapped__ to tell sync and async handlers
+    apart, so only the names are copied, which keeps the handler id.
+    """
+    def decorator(f: Callable[..., T]) -> Callable[..., Any]:
+        async def wrapper(*args, **kwargs) -> T:
+            return await executor.run(f, *args, **kwargs)
+
+        functools.update_wrapper(wrapper, f, updated=())
+        del wrapper.__wrapped__
+        return wrapper
+    return decorator
+
+
+def shutdown() -> None:
+    for executor in (g_kubernetes_io, g_mysql_admin):
+        executor.shutdown(wait=False, cancel_futures=True)
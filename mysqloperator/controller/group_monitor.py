@@ -10,15 +10,21 @@ from mysqloperator.controller.innodbcluster.cluster_api import InnoDBCluster
 
 from mysqloperator.controller.shellutils import RetryLoop
 from . import shellutils
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from . import config, metrics
 import threading
 import time
 import select
+import socket
+import zlib
 import mysqlsh
 
 mysql = mysqlsh.mysql
 mysqlx = mysqlsh.mysqlx
 
 k_connect_retry_interval = 10
+# Upper bound for how long the monitor loop sleeps when it has nothing to do
+k_max_poll_interval = 60
 
 
 class MonitoredCluster:
@@ -32,11 +38,22 @@ class MonitoredCluster:
         self.target = None
         self.target_not_primary = None
         self.last_connect_attempt = 0
+        self.next_connect_attempt = 0
+        self.last_activity = 0
         self.last_primary_id = None
         self.last_view_id = None
+        # (member_id, role, status, view_id) of the members, as last queried
+        self.view: Optional[tuple] = None
 
         self.handler = handler
 
+        # Set when the cluster is assigned to a shard. The notice pending to
+        # be passed to the handler is coalesced while the handler is running
+        self.shard: Optional['GroupMonitorShard'] = None
+        self.handler_running = False
+        self.handler_due: Optional[float] = None
+        self.pending_notice: Optional[Tuple[list[tuple], bool, float]] = None
+
     @property
     def name(self) -> str:
         return self.cluster.name
@@ -46,17 +63,19 @@ class MonitoredCluster:
         return self.cluster.namespace
 
     def ensure_connected(self) -> Optional['mysqlx.Session']:
-        # TODO run a ping every X seconds
-        if not self.session and (not self.last_connect_attempt or time.time() - self.last_connect_attempt > k_connect_retry_interval):
+        if not self.session and time.time() >= self.next_connect_attempt:
             print(f"GroupMonitor: Trying to connect to a member of cluster {self.cluster.namespace}/{self.cluster.name}")
             self.last_connect_attempt = time.time()
+            self.next_connect_attempt = self.last_connect_attempt + k_connect_retry_interval
             self.session = None
             self.connect_to_primary()
 
             # force a refresh after we connect so we don't miss anything
             # that happened while we were out
+            metrics.group_monitor_connects.inc("ok" if self.session else "failed")
             if self.session:
                 print(f"GroupMonitor: Connect member of {self.cluster.namespace}/{self.cluster.name} OK {self.session}")
+                self.last_activity = time.time()
                 self.on_view_change(None)
             else:
                 print(f"GroupMonitor: Connect to member of {self.cluster.namespace}/{self.cluster.name} failed")
@@ -76,7 +95,8 @@ class MonitoredCluster:
                 try:
                     # extend number of seconds for the server to wait for a command to arrive to a full day
                     session.run_sql(f"set session mysqlx_wait_timeout = {24*60*60}")
-                    session._enable_notices(["GRViewChanged"])
+                    # state changes (e.g. RECOVERING -> ONLINE) don't change the view
+                    session._enable_notices(["GRViewChanged", "GRStateChanged"])
                     co = shellutils.parse_uri(session.uri)
                     self.target = f"{co['host']}:{co['port']}"
                     self.target_not_primary = not is_primary
@@ -92,69 +112,147 @@ class MonitoredCluster:
             break
 
     def find_primary(self) -> Tuple[Optional['mysqlx.Session'], bool]:
+        """
+        Connect to all pods at once and keep the first session that gets to
+        the PRIMARY. If there's no PRIMARY, a session to any member is
+        returned instead. All other sessions are closed.
+        """
+        pods = self.cluster.get_pods()
+        if not pods:
+            return None, False
+
+        primary = None
         not_primary = None
 
-        pods = self.cluster.get_pods()
-        # Try to find the PRIMARY the easy way
-        for pod in pods:
-            member_info = pod.get_membership_info()
-            if member_info and member_info.get("role") == "PRIMARY":
-                session = self.try_connect(pod)
+        def close_result(future) -> None:
+            if not future.cancelled() and not future.exception():
+                session, _ = future.result()
                 if session:
-                    s = shellutils.jump_to_primary(session, self.account)
-                    if s:
-                        if s != session:
-                            session.close()
-                        return s, True
-                    else:
-                        not_primary = session
+                    session.close()
 
-        # Try to connect to anyone and find the primary from there
-        for pod in pods:
-            session = self.try_connect(pod)
-            if session:
-                s = shellutils.jump_to_primary(session, self.account)
-                if s:
-                    if s != session:
-                        session.close()
-                    return s, True
+        executor = ThreadPoolExecutor(max_workers=len(pods),
+                                      thread_name_prefix="group-monitor-connect")
+        futures = [executor.submit(self.try_connect_to_primary, pod) for pod in pods]
+        handled = set()
+        try:
+            for future in as_completed(futures):
+                handled.add(future)
+                session, is_primary = future.result()
+                if not session:
+                    continue
+                if is_primary:
+                    primary = session
+                    break
+                if not_primary:
+                    session.close()
                 else:
                     not_primary = session
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            # close whatever the other attempts get, now or once they finish
+            for future in futures:
+                if future not in handled:
+                    future.add_done_callback(close_result)
+
+        if primary:
+            if not_primary:
+                not_primary.close()
+            return primary, True
 
         return not_primary, False
 
+    def try_connect_to_primary(self, pod) -> Tuple[Optional['mysqlx.Session'], bool]:
+        session = self.try_connect(pod)
+        if not session:
+            return None, False
+
+        try:
+            s = shellutils.jump_to_primary(session, self.account)
+        except mysqlsh.Error as e:
+            print(f"GroupMonitor: Error looking for PRIMARY from {pod.xendpoint}: {e}")
+            session.close()
+            return None, False
+
+        if s:
+            if s != session:
+                session.close()
+            return s, True
+
+        return session, False
+
     def try_connect(self, pod) -> Optional['mysqlx.Session']:
+        co = pod.xendpoint_co
+        co["connect-timeout"] = str(config.GROUP_MONITOR_CONNECT_TIMEOUT * 1000)
         try:
-            session = mysqlx.get_session(pod.xendpoint_co)
+            with metrics.mysql_connect_duration.time(shellutils.target_role(pod)):
+                session = mysqlx.get_session(co)
         except mysqlsh.Error as e:
             print(f"GroupMonitor: Error connecting to {pod.xendpoint}: {e}")
             return None
 
         return session
 
-    def handle_notice(self) -> None:
-        while 1:
+    def close(self) -> None:
+        self.view = None
+        if self.session:
+            self.session.close()
+            self.session = None
+
+    @property
+    def next_ping(self) -> float:
+        return self.last_activity + config.GROUP_MONITOR_PING_INTERVAL
+
+    def ping(self) -> None:
+        """
+        Keepalive, which detects dead connections and, as a side effect, makes
+        the client read any notices that are waiting on the socket.
+        """
+        try:
+            self.session.run_sql("select 1")
+            self.last_activity = time.time()
+        except mysqlsh.Error as e:
+            print(
+                f"GroupMonitor: Keepalive failed: dest={self.target} error={e}")
+            self.close()
+            return
+
+        self.drain_notices()
+
+    def drain_notices(self) -> int:
+        """
+        Handle the notices already read by the client, without a round trip.
+        """
+        count = 0
+        while self.session:
             try:
-                # TODO hack to force unexpected async notice to be read, xsession should read packets itself
-                self.session.run_sql("select 1")
                 notice = self.session._fetch_notice()
                 if not notice:
                     break
+                count += 1
                 print(f"GOT NOTICE {notice}")
-                self.on_view_change(notice.get("view_id"))
-                if not self.session:
-                    break
+                # This queries the members and may buffer more notices.
+                # State change notices may come without the view id
+                self.on_view_change(notice.get("view_id") or self.last_view_id)
+                self.last_activity = time.time()
 
             except mysqlsh.Error as e:
                 print(
                     f"GroupMonitor: Error fetching notice: dest={self.target} error={e}")
-                self.session.close()
-                self.session = None
+                self.close()
                 break
+        return count
+
+    def handle_notice(self) -> None:
+        # The socket is readable. If the client didn't buffer the notice yet,
+        # a single ping pulls it in
+        if not self.drain_notices() and self.session:
+            self.ping()
 
     def on_view_change(self, view_id: Optional[str]) -> None:
-        members = shellutils.query_members(self.session)
-        self.handler(self.cluster, members, view_id != self.last_view_id)
+        with metrics.mysql_query_duration.time("secondary" if self.target_not_primary else "primary"):
+            members = shellutils.query_members(self.session)
+        self.view = tuple(sorted(m[:4] for m in members))
+        self.shard.dispatch(self, members, view_id != self.last_view_id)
         self.last_view_id = view_id
 
         primary = None
@@ -178,54 +276,252 @@ class MonitoredCluster:
 
 
 # TODO change this to a per cluster kopf.daemon?
-class GroupMonitor(threading.Thread):
-    def __init__(self):
-        super().__init__(daemon=True, name="group-monitor")
+class GroupMonitorShard(threading.Thread):
+    def __init__(self, index: int, executor: ThreadPoolExecutor):
+        super().__init__(daemon=True, name=f"group-monitor-{index}")
+
+        self.index = index
+        self.executor = executor
+
+        # number of clusters with a notice waiting for the handler and the
+        # time it took for the last notice to get to its handler
+        self.queue_depth = 0
+        self.last_handler_lag = 0.0
+        self.max_handler_lag = 0.0
 
         self.clusters : List[MonitoredCluster] = []
+        self.removed_clusters : List[MonitoredCluster] = []
+        self.lock = threading.Lock()
         self.stopped = False
 
-    def monitor_cluster(self, cluster: InnoDBCluster,
-                        handler: Callable[[InnoDBCluster, list[tuple], bool], None],
-                        logger: Logger) -> None:
-        for c in self.clusters:
-            if c.name == cluster.name and c.namespace == cluster.namespace:
-                return
-
-        # We could get called here before the Secret is ready
-        account = RetryLoop(logger).call(cluster.get_admin_account)
+        # Writing to the wakeup socket interrupts the select() in run(), so
+        # that added/removed clusters are picked up right away
+        self.wakeup_r, self.wakeup_w = socket.socketpair()
+        self.wakeup_r.setblocking(False)
+        self.wakeup_w.setblocking(False)
 
-        target = MonitoredCluster(cluster, account, handler)
-        self.clusters.append(target)
-        print(f"Added monitor for {cluster.namespace}/{cluster.name}")
+    def wakeup(self) -> None:
+        try:
+            self.wakeup_w.send(b"\0")
+        except BlockingIOError:
+            # the buffer is full, so there's a wakeup pending already
+            pass
+
+    def monitor_cluster(self, target: MonitoredCluster) -> None:
+        with self.lock:
+            for c in self.clusters:
+                if c.name == target.name and c.namespace == target.namespace:
+                    return
+            target.shard = self
+            self.clusters.append(target)
+        self.wakeup()
+        print(f"Added monitor for {target.namespace}/{target.name} to shard {self.index}")
 
     def remove_cluster(self, cluster: InnoDBCluster) -> None:
-        for c in self.clusters:
-            if c.name == cluster.name and c.namespace == cluster.namespace:
-                self.clusters.remove(c)
-                break
+        with self.lock:
+            for c in self.clusters:
+                if c.name == cluster.name and c.namespace == cluster.namespace:
+                    self.clusters.remove(c)
+                    if c.handler_due is not None:
+                        # drop the view change which wasn't handled yet
+                        c.handler_due = None
+                        c.pending_notice = None
+                        self.queue_depth -= 1
+                    # the session is closed from the monitor thread, which
+                    # might be waiting on it
+                    self.removed_clusters.append(c)
+                    break
+        self.wakeup()
+
+    def dispatch(self, cluster: MonitoredCluster, members: list[tuple],
+                 view_id_changed: bool) -> None:
+        """
+        Pass a view change to the cluster's handler in the handler executor.
+        Handlers of a cluster never run concurrently. If one is already
+        running or queued, the new member list replaces the pending one.
+
+        The handler is started config.GROUP_MONITOR_DEBOUNCE seconds after
+        the first notice, so that a burst of view changes (e.g. a member
+        leaving and the PRIMARY being re-elected) is handled once.
+        """
+        now = time.time()
+        with self.lock:
+            if cluster.pending_notice:
+                _, changed, queued_at = cluster.pending_notice
+                cluster.pending_notice = (members, changed or view_id_changed, queued_at)
+                return
+            cluster.pending_notice = (members, view_id_changed, now)
+            self.queue_depth += 1
+            if not cluster.handler_running:
+                cluster.handler_due = now + config.GROUP_MONITOR_DEBOUNCE
+
+    def submit_due_handlers(self, clusters: List[MonitoredCluster]) -> float:
+        """
+        Start the handlers which are due and return the number of seconds
+        until the next one is.
+        """
+        timeout = k_max_poll_interval
+        now = time.time()
+        with self.lock:
+            for cluster in clusters:
+                if cluster.handler_due is None:
+                    continue
+                if cluster.handler_due > now:
+                    timeout = min(timeout, cluster.handler_due - now)
+                    continue
+                cluster.handler_due = None
+                cluster.handler_running = True
+                self.executor.submit(self.run_handler, cluster)
+        return timeout
+
+    def run_handler(self, cluster: MonitoredCluster) -> None:
+        while True:
+            with self.lock:
+                if not cluster.pending_notice:
+                    cluster.handler_running = False
+                    return
+                members, view_id_changed, queued_at = cluster.pending_notice
+                cluster.pending_notice = None
+                self.queue_depth -= 1
+                self.last_handler_lag = time.time() - queued_at
+                self.max_handler_lag = max(self.max_handler_lag, self.last_handler_lag)
+            metrics.group_monitor_handler_lag.observe(value=self.last_handler_lag)
+            try:
+                cluster.handler(cluster.cluster, members, view_id_changed)
+            except Exception as e:
+                print(f"GroupMonitor: Error handling view change of {cluster.namespace}/{cluster.name}: {e}")
+
+    def stats(self) -> dict:
+        with self.lock:
+            now = time.time()
+            oldest = min([c.pending_notice[2] for c in self.clusters if c.pending_notice], default=now)
+            return {
+                "shard": self.index,
+                "clusters": len(self.clusters),
+                "connected": len([c for c in self.clusters if c.session]),
+                "queue_depth": self.queue_depth,
+                "lag": now - oldest,
+                "last_handler_lag": self.last_handler_lag,
+                "max_handler_lag": self.max_handler_lag,
+            }
+
+    def drain_wakeup(self) -> None:
+        try:
+            while self.wakeup_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
 
     def run(self) -> None:
-        last_ping = time.time()
         while not self.stopped:
+            with self.lock:
+                clusters = list(self.clusters)
+                removed_clusters = self.removed_clusters
+                self.removed_clusters = []
+
+            for cluster in removed_clusters:
+                cluster.close()
+
             session_fds_to_cluster = {}
-            for cluster in self.clusters:
+            timeout = k_max_poll_interval
+            now = time.time()
+            for cluster in clusters:
                 cluster.ensure_connected()
+                if cluster.session and now >= cluster.next_ping:
+                    cluster.ping()
                 if cluster.session:
                     session_fds_to_cluster[cluster.session._get_socket_fd()] = cluster
+                    timeout = min(timeout, max(0, cluster.next_ping - now))
+                else:
+                    # sleep only until the next reconnect attempt is due
+                    timeout = min(timeout, max(0, cluster.next_connect_attempt - now))
 
-            # wait for 1s at most so that newly added session don't wait much
-            # TODO replace poll_sessions() with something to get the session fd
-            # - do the poll loop in python
-            # - add a socket_pair() to allow interrupting the poll when a new
-            # cluster is added and increase the timeout
+            timeout = min(timeout, self.submit_due_handlers(clusters))
 
-            ready, _, _ = select.select(session_fds_to_cluster.keys(), [], [], 1000)
+            # select() timeout is in seconds. Notices and wakeups interrupt it
+            # right away, so the timeout only bounds reconnects, keepalives and
+            # debounced handlers
+            ready, _, _ = select.select([self.wakeup_r.fileno(), *session_fds_to_cluster.keys()], [], [], timeout)
             for fd in ready:
-                session_fds_to_cluster[fd].handle_notice()
+                if fd == self.wakeup_r.fileno():
+                    self.drain_wakeup()
+                else:
+                    session_fds_to_cluster[fd].handle_notice()
+
+        with self.lock:
+            clusters = self.clusters + self.removed_clusters
+        for cluster in clusters:
+            cluster.close()
 
     def stop(self) -> None:
         self.stopped = True
+        self.wakeup()
+
+
+class GroupMonitor:
+    """
+    Watches the group membership of all clusters over X Protocol
+    GRViewChanged and GRStateChanged notices. Clusters are spread over
+    config.GROUP_MONITOR_SHARDS threads, each one waiting on the sessions of
+    its clusters, while the view change handlers run in a shared pool of
+    config.GROUP_MONITOR_HANDLER_WORKERS threads.
+    """
+
+    def __init__(self, shards: int = config.GROUP_MONITOR_SHARDS,
+                 handler_workers: int = config.GROUP_MONITOR_HANDLER_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, handler_workers),
+                                           thread_name_prefix="group-monitor-handler")
+        self.shards = [GroupMonitorShard(i, self.executor) for i in range(max(1, shards))]
+        metrics.g_registry.add_collector(self.collect_metrics)
+
+    def shard_for(self, namespace: str, name: str) -> GroupMonitorShard:
+        return self.shards[zlib.crc32(f"{namespace}/{name}".encode()) % len(self.shards)]
+
+    def monitor_cluster(self, cluster: InnoDBCluster,
+                        handler: Callable[[InnoDBCluster, list[tuple], bool], None],
+                        logger: Logger) -> None:
+        shard = self.shard_for(cluster.namespace, cluster.name)
+        with shard.lock:
+            for c in shard.clusters:
+                if c.name == cluster.name and c.namespace == cluster.namespace:
+                    return
+
+        # We could get called here before the Secret is ready
+        account = RetryLoop(logger).call(cluster.get_admin_account)
+
+        shard.monitor_cluster(MonitoredCluster(cluster, account, handler))
+
+    def remove_cluster(self, cluster: InnoDBCluster) -> None:
+        self.shard_for(cluster.namespace, cluster.name).remove_cluster(cluster)
+
+    def get_view(self, cluster: InnoDBCluster) -> Optional[tuple]:
+        """
+        Membership of the group last seen by the monitor, or None if the
+        monitor is not connected to the cluster.
+        """
+        shard = self.shard_for(cluster.namespace, cluster.name)
+        with shard.lock:
+            for c in shard.clusters:
+                if c.name == cluster.name and c.namespace == cluster.namespace:
+                    return c.view if c.session else None
+        return None
+
+    def stats(self) -> List[dict]:
+        return [shard.stats() for shard in self.shards]
+
+    def collect_metrics(self) -> None:
+        for stats in self.stats():
+            metrics.group_monitor_queue_depth.set(stats["shard"], value=stats["queue_depth"])
+            metrics.group_monitor_connected_clusters.set(stats["shard"], value=stats["connected"])
+
+    def start(self) -> None:
+        for shard in self.shards:
+            shard.start()
+
+    def stop(self) -> None:
+        for shard in self.shards:
+            shard.stop()
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
 
 g_group_monitor = GroupMonitor()
@@ -14,19 +14,24 @@ from logging import getLogger, Logger
 
 from .. import fqdn
 from ..k8sobject import K8sInterfaceObject
-from .. import utils, config, consts
+from .. import utils, config, consts, metrics, reconcile_context
 from ..backup.backup_api import BackupProfile, BackupSchedule
 from ..storage_api import StorageSpec
 from ..api_utils import Edition, dget_bool, dget_dict, dget_enum, dget_str, dget_int, dget_float, dget_list, ApiSpecError, ImagePullPolicy
 from ..kubeutils import api_core, api_apps, api_customobj, api_policy, api_rbac, api_batch, api_cron_job
-from ..kubeutils import client as api_client, ApiException
+from ..kubeutils import client as api_client, ApiException, read_json
+from ..kubeviews import PodView, StatefulSetView
 from ..kubeutils import k8s_cluster_domain
 from .logs.logs_api import LogsSpec
 from .logs.logs_types_api import ConfigMapMountBase, get_object_name, patch_sts_spec_template_complex_attribute
+from .pod_cache import g_pod_cache
+from ..secret_cache import g_secret_cache
+import copy
 import json
 import yaml
 import datetime
-from cryptography import x509
+import threading
+from collections import OrderedDict
 from kubernetes import client
 
 AddToInitconfHandler = Callable[[dict, str, Logger], None]
@@ -382,6 +387,23 @@ class InitDB:
             self.snapshot.parse(snapshot, "spec.initDB.snapshot")
 
 
+def mysql_volumes_patch(mounts: List[dict], volumes: Optional[List[dict]] = None) -> dict:
+    """
+    Patch for the pod template of the server StatefulSet, mounting the volumes
+    in the initmysql and mysql containers. Each container gets its own copy
+    of the mounts.
+    """
+    patch = {
+        "spec": {
+            "initContainers": [{"name": "initmysql", "volumeMounts": copy.deepcopy(mounts)}],
+            "containers": [{"name": "mysql", "volumeMounts": copy.deepcopy(mounts)}]
+        }
+    }
+    if volumes:
+        patch["spec"]["volumes"] = volumes
+    return patch
+
+
 class KeyringConfigStorage(Enum):
     CONFIGMAP = 1
     SECRET = 2
@@ -454,59 +476,27 @@ class KeyringFileSpec(KeyringSpecBase):
 
     def add_conf_to_sts_spec(self, statefulset: dict) -> None:
         cm_mount_name = "keyringfile-conf"
-        mounts = f"""
-- name: {cm_mount_name}
-  mountPath: "/usr/lib64/mysql/plugin/{self.component_manifest_name}"
-  subPath: "{self.component_manifest_name}"     #should be the same as the volume.items.path
-"""
-
-        volumes = f"""
-- name: {cm_mount_name}
-  configMap:
-    name: {self.component_config_configmap_name}
-    items:
-    - key: "{self.component_manifest_name}"
-      path: "{self.component_manifest_name}"
-"""
-
-        patch = f"""
-spec:
-  initContainers:
-  - name: initmysql
-    volumeMounts:
-{utils.indent(mounts, 4)}
-  containers:
-  - name: mysql
-    volumeMounts:
-{utils.indent(mounts, 4)}
-  volumes:
-{utils.indent(volumes, 2)}
-"""
-        utils.merge_patch_object(statefulset["spec"]["template"], yaml.safe_load(patch))
+        mounts = [{
+            "name": cm_mount_name,
+            "mountPath": f"/usr/lib64/mysql/plugin/{self.component_manifest_name}",
+            "subPath": self.component_manifest_name  # should be the same as the volume.items.path
+        }]
+        volumes = [{
+            "name": cm_mount_name,
+            "configMap": {
+                "name": self.component_config_configmap_name,
+                "items": [{"key": self.component_manifest_name, "path": self.component_manifest_name}]
+            }
+        }]
+        utils.merge_patch_object(statefulset["spec"]["template"], mysql_volumes_patch(mounts, volumes))
 
     def add_storage_to_sts_spec(self, statefulset: dict) -> None:
         if not self.storage:
             return
 
         storage_mount_name = "keyringfile-storage"
-        mounts = f"""
-- name: {storage_mount_name}
-  mountPath: {self.keyring_mount_path}
-
-"""
-
-        patch = f"""
-spec:
-  initContainers:
-  - name: initmysql
-    volumeMounts:
-{utils.indent(mounts, 6)}
-  containers:
-  - name: mysql
-    volumeMounts:
-{utils.indent(mounts, 6)}
-"""
-        utils.merge_patch_object(statefulset["spec"]["template"], yaml.safe_load(patch))
+        mounts = [{"name": storage_mount_name, "mountPath": self.keyring_mount_path}]
+        utils.merge_patch_object(statefulset["spec"]["template"], mysql_volumes_patch(mounts))
 
         statefulset["spec"]["template"]["spec"]["volumes"].append({"name" : storage_mount_name, **self.storage})
 
@@ -578,59 +568,27 @@ class KeyringEncryptedFileSpec(KeyringSpecBase):
 
     def add_conf_to_sts_spec(self, statefulset: dict) -> None:
         cm_mount_name = "keyringencfile-conf"
-        mounts = f"""
-- name: {cm_mount_name}
-  mountPath: "/usr/lib64/mysql/plugin/{self.component_manifest_name}"
-  subPath: "{self.component_manifest_name}"     #should be the same as the volume.items.path
-"""
-
-        volumes = f"""
-- name: {cm_mount_name}
-  secret:
-    secretName: {self.component_config_configmap_name}
-    items:
-    - key: "{self.component_manifest_name}"
-      path: "{self.component_manifest_name}"
-"""
-
-        patch = f"""
-spec:
-  initContainers:
-  - name: initmysql
-    volumeMounts:
-{utils.indent(mounts, 4)}
-  containers:
-  - name: mysql
-    volumeMounts:
-{utils.indent(mounts, 4)}
-  volumes:
-{utils.indent(volumes, 2)}
-"""
-        utils.merge_patch_object(statefulset["spec"]["template"], yaml.safe_load(patch))
+        mounts = [{
+            "name": cm_mount_name,
+            "mountPath": f"/usr/lib64/mysql/plugin/{self.component_manifest_name}",
+            "subPath": self.component_manifest_name  # should be the same as the volume.items.path
+        }]
+        volumes = [{
+            "name": cm_mount_name,
+            "secret": {
+                "secretName": self.component_config_configmap_name,
+                "items": [{"key": self.component_manifest_name, "path": self.component_manifest_name}]
+            }
+        }]
+        utils.merge_patch_object(statefulset["spec"]["template"], mysql_volumes_patch(mounts, volumes))
 
     def add_storage_to_sts_spec(self, statefulset: dict) -> None:
         if not self.storage:
             return
 
         storage_mount_name = "keyringencfile-storage"
-        mounts = f"""
-- name: {storage_mount_name}
-  mountPath: {self.keyring_mount_path}
-
-"""
-
-        patch = f"""
-spec:
-  initContainers:
-  - name: initmysql
-    volumeMounts:
-{utils.indent(mounts, 6)}
-  containers:
-  - name: mysql
-    volumeMounts:
-{utils.indent(mounts, 6)}
-"""
-        utils.merge_patch_object(statefulset["spec"]["template"], yaml.safe_load(patch))
+        mounts = [{"name": storage_mount_name, "mountPath": self.keyring_mount_path}]
+        utils.merge_patch_object(statefulset["spec"]["template"], mysql_volumes_patch(mounts))
 
         statefulset["spec"]["template"]["spec"]["volumes"].append({"name" : storage_mount_name, **self.storage})
 
@@ -698,56 +656,30 @@ class KeyringOciSpec(KeyringSpecBase):
 
     def add_to_sts_spec(self, statefulset: dict):
         cm_mount_name = "keyringfile-conf"
-        patch = f"""
-spec:
-  initContainers:
-  - name: initmysql
-    volumeMounts:
-    - name: ocikey
-      mountPath: /.oci
-    - name: {cm_mount_name}
-      mountPath: "/usr/lib64/mysql/plugin/{self.component_manifest_name}"
-      subPath: "{self.component_manifest_name}"     #should be the same as the volume.items.path
-  containers:
-  - name: mysql
-    volumeMounts:
-    - name: ocikey
-      mountPath: /.oci
-    - name: {cm_mount_name}
-      mountPath: "/usr/lib64/mysql/plugin/{self.component_manifest_name}"
-      subPath: "{self.component_manifest_name}"     #should be the same as the volume.items.path
-  volumes:
-  - name: ocikey
-    secret:
-      secretName: {self.keySecret}
-  - name: {cm_mount_name}
-    configMap:
-      name: {self.component_config_configmap_name}
-      items:
-      - key: "{self.component_manifest_name}"
-        path: "{self.component_manifest_name}"
-"""
-        utils.merge_patch_object(statefulset["spec"]["template"], yaml.safe_load(patch))
+        mounts = [
+            {"name": "ocikey", "mountPath": "/.oci"},
+            {
+                "name": cm_mount_name,
+                "mountPath": f"/usr/lib64/mysql/plugin/{self.component_manifest_name}",
+                "subPath": self.component_manifest_name  # should be the same as the volume.items.path
+            }
+        ]
+        volumes = [
+            {"name": "ocikey", "secret": {"secretName": self.keySecret}},
+            {
+                "name": cm_mount_name,
+                "configMap": {
+                    "name": self.component_config_configmap_name,
+                    "items": [{"key": self.component_manifest_name, "path": self.component_manifest_name}]
+                }
+            }
+        ]
+        utils.merge_patch_object(statefulset["spec"]["template"], mysql_volumes_patch(mounts, volumes))
 
         if self.caCertificate:
-            patch = f"""
-spec:
-  initContainers:
-  - name: initmysql
-    volumeMounts:
-    - name: oci-keyring-ca
-      mountPath: /etc/mysql-keyring-ca
-  containers:
-  - name: mysql
-    volumeMounts:
-    - name: oci-keyring-ca
-      mountPath: /etc/mysql-keyring-ca
-  volumes:
-  - name: oci-keyring-ca
-    secret:
-      secretName: {self.caCertificate}
-"""
-            utils.merge_patch_object(statefulset["spec"]["template"], yaml.safe_load(patch))
+            mounts = [{"name": "oci-keyring-ca", "mountPath": "/etc/mysql-keyring-ca"}]
+            volumes = [{"name": "oci-keyring-ca", "secret": {"secretName": self.caCertificate}}]
+            utils.merge_patch_object(statefulset["spec"]["template"], mysql_volumes_patch(mounts, volumes))
 
     def add_to_global_manifest(self, manifest: dict) -> dict:
         component_name = "file://component_keyring_oci"
@@ -936,35 +868,19 @@ class KeyringSpec:
             # this is slight misuse of a NullObject type ...
             return
 
-        mounts = f"""
-- name: globalcomponentconf
-  mountPath: /usr/sbin/{self.global_manifest_name}
-  subPath: {self.global_manifest_name}                #should be the same as the volume.items.path
-"""
-
-        volumes = f"""
-- name: globalcomponentconf
-  configMap:
-    name: {self.component_config_configmap_name}
-    items:
-    - key: {self.global_manifest_name}
-      path: {self.global_manifest_name}
-"""
-
-        patch = f"""
-spec:
-  initContainers:
-  - name: initmysql
-    volumeMounts:
-{utils.indent(mounts, 6)}
-  containers:
-  - name: mysql
-    volumeMounts:
-{utils.indent(mounts, 6)}
-  volumes:
-{utils.indent(volumes, 4)}
-"""
-        utils.merge_patch_object(statefulset["spec"]["template"], yaml.safe_load(patch))
+        mounts = [{
+            "name": "globalcomponentconf",
+            "mountPath": f"/usr/sbin/{self.global_manifest_name}",
+            "subPath": self.global_manifest_name  # should be the same as the volume.items.path
+        }]
+        volumes = [{
+            "name": "globalcomponentconf",
+            "configMap": {
+                "name": self.component_config_configmap_name,
+                "items": [{"key": self.global_manifest_name, "path": self.global_manifest_name}]
+            }
+        }]
+        utils.merge_patch_object(statefulset["spec"]["template"], mysql_volumes_patch(mounts, volumes))
 
 
     def add_to_sts_spec(self, statefulset: dict):
@@ -1362,57 +1278,39 @@ class AbstractServerSetSpec(abc.ABC):
         return self.imagePullPolicy.value
 
     @property
-    def extra_env(self) -> str:
+    def extra_env(self) -> List[dict]:
         if config.debug:
-            return f"""
-- name: MYSQL_OPERATOR_DEBUG
-  value: "{config.debug}"
-"""
+            return [{"name": "MYSQL_OPERATOR_DEBUG", "value": str(config.debug)}]
         else:
-            return ""
+            return []
 
     @property
-    def extra_volumes(self) -> str:
+    def extra_volumes(self) -> List[dict]:
         volumes = []
         same_secret = self.tlsCASecretName == self.tlsSecretName
 
         if not self.tlsUseSelfSigned:
-            volume = f"""
-- name: ssldata
-  projected:
-    sources:
-    - secret:
-        name: {self.tlsSecretName}
-"""
+            sources = [{"secret": {"name": self.tlsSecretName}}]
             if not same_secret:
-                volume += f"""
-    - secret:
-        name: {self.tlsCASecretName}
-"""
+                sources.append({"secret": {"name": self.tlsCASecretName}})
 
-            volumes.append(volume)
+            volumes.append({"name": "ssldata", "projected": {"sources": sources}})
 
-        return "\n".join(volumes)
+        return volumes
 
     @property
-    def extra_volume_mounts(self) -> str:
+    def extra_volume_mounts(self) -> List[dict]:
         mounts = []
         if not self.tlsUseSelfSigned:
-            mounts.append(f"""
-- mountPath: /etc/mysql-ssl
-  name: ssldata
-""")
-        return "\n".join(mounts)
+            mounts.append({"mountPath": "/etc/mysql-ssl", "name": "ssldata"})
+        return mounts
 
     @property
-    def extra_sidecar_volume_mounts(self) -> str:
+    def extra_sidecar_volume_mounts(self) -> List[dict]:
         mounts = []
         if not self.tlsUseSelfSigned:
-            mounts.append("""
-- mountPath: /etc/mysql-ssl
-  name: ssldata
-""")
-        return "\n".join(mounts)
+            mounts.append({"mountPath": "/etc/mysql-ssl", "name": "ssldata"})
+        return mounts
 
     @property
     def image_pull_secrets(self) -> str:
@@ -1544,64 +1442,41 @@ class InnoDBClusterSpec(AbstractServerSetSpec):
         return None
 
     @property
-    def extra_router_volumes_no_cert(self) -> str:
+    def extra_router_volumes_no_cert(self) -> List[dict]:
         volumes = []
 
         if not self.tlsUseSelfSigned:
-            volumes.append(f"""
-- name: ssl-ca-data
-  projected:
-    sources:
-    - secret:
-        name: {self.tlsCASecretName}
-""")
+            volumes.append({"name": "ssl-ca-data",
+                            "projected": {"sources": [{"secret": {"name": self.tlsCASecretName}}]}})
 
-        return "\n".join(volumes)
+        return volumes
 
     @property
-    def extra_router_volumes(self) -> str:
-        volumes = []
+    def extra_router_volumes(self) -> List[dict]:
+        volumes = self.extra_router_volumes_no_cert
 
         if not self.tlsUseSelfSigned:
-            volumes.append(f"""
-- name: ssl-ca-data
-  projected:
-    sources:
-    - secret:
-        name: {self.tlsCASecretName}
-- name: ssl-key-data
-  projected:
-    sources:
-    - secret:
-        name: {self.router.tlsSecretName}
-""")
-
-        return "\n".join(volumes)
+            volumes.append({"name": "ssl-key-data",
+                            "projected": {"sources": [{"secret": {"name": self.router.tlsSecretName}}]}})
+
+        return volumes
 
     @property
-    def extra_router_volume_mounts_no_cert(self) -> str:
+    def extra_router_volume_mounts_no_cert(self) -> List[dict]:
         mounts = []
         if not self.tlsUseSelfSigned:
-            mounts.append(f"""
-- mountPath: /router-ssl/ca/
-  name: ssl-ca-data
-""")
+            mounts.append({"mountPath": "/router-ssl/ca/", "name": "ssl-ca-data"})
 
-        return "\n".join(mounts)
+        return mounts
 
 
     @property
-    def extra_router_volume_mounts(self) -> str:
-        mounts = []
+    def extra_router_volume_mounts(self) -> List[dict]:
+        mounts = self.extra_router_volume_mounts_no_cert
         if not self.tlsUseSelfSigned:
-            mounts.append(f"""
-- mountPath: /router-ssl/ca/
-  name: ssl-ca-data
-- mountPath: /router-ssl/key/
-  name: ssl-key-data
-""")
+            mounts.append({"mountPath": "/router-ssl/key/", "name": "ssl-key-data"})
 
-        return "\n".join(mounts)
+        return mounts
 
     @property
     def router_image(self) -> str:
@@ -1626,6 +1501,70 @@ class InnoDBClusterSpec(AbstractServerSetSpec):
 
 
 
+def read_memoized(kind: str, namespace: str, name: str, read: Callable[[str, str], Any]) -> Any:
+    """
+    Calls read(name, namespace), memoized in the current reconcile context.
+    Returns None for objects that don't exist.
+    """
+    def read_or_none() -> Any:
+        try:
+            return read(name, namespace)
+        except ApiException as e:
+            if e.status == 404:
+                return None
+            raise
+
+    return reconcile_context.memoized(kind, namespace, name, read_or_none)
+
+
+class ParsedSpecCache:
+    """
+    LRU cache of the parsed InnoDBCluster specs, by uid and
+    metadata.generation, which the API server increments on every change of
+    the spec. Only the latest generation of each cluster is kept. The specs
+    are shared by all the InnoDBCluster objects of the same generation and
+    must not be modified.
+    """
+
+    def __init__(self, max_size: int = config.PARSED_SPEC_CACHE_SIZE) -> None:
+        self.lock = threading.Lock()
+        self.max_size = max_size
+        # uid -> (generation, spec)
+        self.specs: OrderedDict[str, Tuple[int, 'InnoDBClusterSpec']] = OrderedDict()
+
+    def get(self, uid: Optional[str], generation: Optional[int]) -> Optional['InnoDBClusterSpec']:
+        if not uid or generation is None:
+            return None
+        with self.lock:
+            entry = self.specs.get(uid)
+            if entry and entry[0] == generation:
+                self.specs.move_to_end(uid)
+                metrics.parsed_spec_cache.inc("hit")
+                return entry[1]
+        metrics.parsed_spec_cache.inc("miss")
+        return None
+
+    def put(self, uid: Optional[str], generation: Optional[int], spec: 'InnoDBClusterSpec') -> None:
+        if not uid or generation is None:
+            return
+        with self.lock:
+            entry = self.specs.get(uid)
+            # a slow handler may parse an older generation
+            if entry and entry[0] > generation:
+                return
+            self.specs[uid] = (generation, spec)
+            self.specs.move_to_end(uid)
+            while len(self.specs) > self.max_size:
+                self.specs.popitem(last=False)
+
+    def invalidate(self, uid: str) -> None:
+        with self.lock:
+            self.specs.pop(uid, None)
+
+
+g_parsed_spec_cache = ParsedSpecCache()
+
+
 class InnoDBCluster(K8sInterfaceObject):
     def __init__(self, cluster: Body) -> None:
         super().__init__()
@@ -1714,8 +1653,14 @@ class InnoDBCluster(K8sInterfaceObject):
             ref["fieldPath"] = field_path
         return ref
 
+    @property
+    def generation(self) -> Optional[int]:
+        return self.metadata.get("generation")
+
     @property
     def parsed_spec(self) -> InnoDBClusterSpec:
+        if not self._parsed_spec:
+            self._parsed_spec = g_parsed_spec_cache.get(self.metadata.get("uid"), self.generation)
         if not self._parsed_spec:
             self.parse_spec()
             assert self._parsed_spec
@@ -1724,6 +1669,7 @@ class InnoDBCluster(K8sInterfaceObject):
 
     def parse_spec(self) -> None:
         self._parsed_spec = InnoDBClusterSpec(self.namespace, self.name, self.spec)
+        g_parsed_spec_cache.put(self.metadata.get("uid"), self.generation, self._parsed_spec)
 
     def reload(self) -> None:
         self.obj = self._get(self.namespace, self.name)
@@ -1732,20 +1678,32 @@ class InnoDBCluster(K8sInterfaceObject):
         owner_sts = pod.owner_reference("apps/v1", "StatefulSet")
         return owner_sts.name == self.name
 
-    def get_pod(self, index) -> 'MySQLPod':
-        pod = cast(api_client.V1Pod, api_core.read_namespaced_pod(
-            "%s-%i" % (self.name, index), self.namespace))
+    def get_pod(self, index, fresh: bool = False) -> 'MySQLPod':
+        name = "%s-%i" % (self.name, index)
+        pod = None if fresh else g_pod_cache.get_pod(self.namespace, name)
+        if pod is None:
+            def read() -> PodView:
+                return PodView(read_json(api_core.read_namespaced_pod, name, self.namespace))
+
+            # a fresh read is never memoized
+            pod = read() if fresh else reconcile_context.memoized("Pod", self.namespace, name, read)
         return MySQLPod(pod)
 
-    def get_pods(self) -> typing.List['MySQLPod']:
-        # get all pods that belong to the same container
-        objects = cast(api_client.V1PodList, api_core.list_namespaced_pod(
-            self.namespace, label_selector="component=mysqld"))
+    def get_pods(self, fresh: bool = False) -> typing.List['MySQLPod']:
+        # get all pods that belong to the same container, from the pod cache
+        # unless it isn't synced yet or the caller needs a linearizable read
+        objects = None if fresh else g_pod_cache.get_pods(self.namespace, self.name)
+        if objects is None:
+            def read() -> typing.List[PodView]:
+                return [PodView(item) for item in read_json(api_core.list_namespaced_pod,
+                    self.namespace, label_selector="component=mysqld").get("items") or []]
+
+            objects = read() if fresh else reconcile_context.memoized("PodList", self.namespace, "component=mysqld", read)
 
         pods = []
 
         # Find the MySQLServer object corresponding to the server we're attached to
-        for o in objects.items:
+        for o in objects:
             pod = MySQLPod(o)
             if self.owns_pod(pod):
                 pods.append(pod)
@@ -1753,22 +1711,12 @@ class InnoDBCluster(K8sInterfaceObject):
         return pods
 
     def get_service(self) -> typing.Optional[api_client.V1Service]:
-        try:
-            return cast(api_client.V1Service,
-                        api_core.read_namespaced_service(self.name+"-instances", self.namespace))
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1Service,
+                    read_memoized("Service", self.namespace, self.name+"-instances", api_core.read_namespaced_service))
 
     def get_read_replica_service(self, name: str) -> typing.Optional[api_client.V1Service]:
-        try:
-            return cast(api_client.V1Service,
-                        api_core.read_namespaced_service(name+"-instances", self.namespace))
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1Service,
+                    read_memoized("Service", self.namespace, name+"-instances", api_core.read_namespaced_service))
 
     # As of K8s 1.21 this is no more beta.
     # Thus, eventually this needs to be upgraded to V1PodDisruptionBudget and api_policy to PolicyV1Api
@@ -1782,40 +1730,32 @@ class InnoDBCluster(K8sInterfaceObject):
             raise
 
     def get_stateful_set(self) -> typing.Optional[api_client.V1StatefulSet]:
-        try:
-            return cast(api_client.V1StatefulSet,
-                        api_apps.read_namespaced_stateful_set(self.name, self.namespace))
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1StatefulSet,
+                    read_memoized("StatefulSet", self.namespace, self.name, api_apps.read_namespaced_stateful_set))
 
     def get_read_replica_stateful_set(self, name: str) -> typing.Optional[api_client.V1StatefulSet]:
-        try:
-            return cast(api_client.V1StatefulSet,
-                        api_apps.read_namespaced_stateful_set(name, self.namespace))
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1StatefulSet,
+                    read_memoized("StatefulSet", self.namespace, name, api_apps.read_namespaced_stateful_set))
+
+    def get_stateful_set_view(self, name: Optional[str] = None) -> typing.Optional[StatefulSetView]:
+        """
+        Read-only variant of get_stateful_set() and of
+        get_read_replica_stateful_set(), for callers that only check for the
+        StatefulSet or read a few fields of it. The response is not
+        deserialized into model objects.
+        """
+        def read(name: str, namespace: str) -> StatefulSetView:
+            return StatefulSetView(read_json(api_apps.read_namespaced_stateful_set, name, namespace))
+
+        return read_memoized("StatefulSetView", self.namespace, name or self.name, read)
 
     def get_router_service(self) -> typing.Optional[api_client.V1Service]:
-        try:
-            return cast(api_client.V1Service,
-                        api_core.read_namespaced_service(self.name, self.namespace))
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1Service,
+                    read_memoized("Service", self.namespace, self.name, api_core.read_namespaced_service))
 
     def get_router_deployment(self) -> typing.Optional[api_client.V1Deployment]:
-        try:
-            return cast(api_client.V1Deployment,
-                        api_apps.read_namespaced_deployment(self.name+"-router", self.namespace))
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1Deployment,
+                    read_memoized("Deployment", self.namespace, self.name+"-router", api_apps.read_namespaced_deployment))
 
     def get_cron_job(self, schedule_name: str) -> typing.Callable:
         def get_cron_job_inner() -> typing.Optional[api_client.V1CronJob]:
@@ -1830,31 +1770,22 @@ class InnoDBCluster(K8sInterfaceObject):
         return get_cron_job_inner
 
     def get_router_account(self) -> Tuple[str, str]:
-        secret = cast(api_client.V1Secret, api_core.read_namespaced_secret(
-            f"{self.name}-router", self.namespace))
+        secret = g_secret_cache.get(self.namespace, f"{self.name}-router")
 
-        return utils.b64decode(secret.data["routerUsername"]), utils.b64decode(secret.data["routerPassword"])
+        return secret["routerUsername"], secret["routerPassword"]
 
     def get_backup_account(self) -> Tuple[str, str]:
-        secret = cast(api_client.V1Secret,
-                      api_core.read_namespaced_secret(
-                          f"{self.name}-backup", self.namespace))
+        secret = g_secret_cache.get(self.namespace, f"{self.name}-backup")
 
-        return utils.b64decode(secret.data["backupUsername"]), utils.b64decode(secret.data["backupPassword"])
+        return secret["backupUsername"], secret["backupPassword"]
 
     def get_private_secrets(self) -> api_client.V1Secret:
-        return cast(api_client.V1Secret,
-                    api_core.read_namespaced_secret(f"{self.name}-privsecrets", self.namespace))
+        return g_secret_cache.get(self.namespace, f"{self.name}-privsecrets").secret
 
     def get_user_secrets(self) -> typing.Optional[api_client.V1Secret]:
         name = self.spec.get("secretName")
-        try:
-            return cast(api_client.V1Secret,
-                        api_core.read_namespaced_secret(f"{name}", self.namespace))
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1Secret,
+                    read_memoized("Secret", self.namespace, f"{name}", api_core.read_namespaced_secret))
 
     def get_ca_and_tls(self) -> Dict:
         if self.parsed_spec.tlsUseSelfSigned:
@@ -1865,50 +1796,47 @@ class InnoDBCluster(K8sInterfaceObject):
         same_secret_for_ca_and_tls = False
         ret = {}
         try:
-            server_tls_secret = cast(api_client.V1Secret, api_core.read_namespaced_secret(
-                                     self.parsed_spec.tlsSecretName, self.namespace))
+            server_tls_secret = g_secret_cache.get(self.namespace, self.parsed_spec.tlsSecretName)
 
         except ApiException as e:
             if e.status == 404:
                 return {}
             raise
 
-        if "tls.crt" in server_tls_secret.data:
-            ret["tls.crt"] = utils.b64decode(server_tls_secret.data["tls.crt"])
-        if "tls.key" in server_tls_secret.data:
-            ret["tls.key"] = utils.b64decode(server_tls_secret.data["tls.key"])
+        if "tls.crt" in server_tls_secret:
+            ret["tls.crt"] = server_tls_secret["tls.crt"]
+        if "tls.key" in server_tls_secret:
+            ret["tls.key"] = server_tls_secret["tls.key"]
 
         if self.parsed_spec.tlsSecretName == self.parsed_spec.tlsCASecretName:
             ca_secret = server_tls_secret
             same_secret_for_ca_and_tls = True
         else:
             try:
-                ca_secret = cast(api_client.V1Secret, api_core.read_namespaced_secret(
-                                 self.parsed_spec.tlsCASecretName, self.namespace))
+                ca_secret = g_secret_cache.get(self.namespace, self.parsed_spec.tlsCASecretName)
             except ApiException as e:
                 if e.status == 404:
                     return ret
                 raise
 
         ca_file_name = None
-        if "ca.pem" in ca_secret.data:
+        if "ca.pem" in ca_secret:
             ca_file_name = "ca.pem"
-        elif "ca.crt" in ca_secret.data:
+        elif "ca.crt" in ca_secret:
             ca_file_name = "ca.crt"
 
         ret["CA"] = ca_file_name
         if ca_file_name:
-            ret[ca_file_name] = utils.b64decode(ca_secret.data[ca_file_name])
+            ret[ca_file_name] = ca_secret[ca_file_name]
             ret['same_secret_for_ca_and_tls'] = same_secret_for_ca_and_tls
 
         # When using HELM a secret should exist, when using bare manifests the secret might
         # not exist (not mentioned directly or using the default name) and so it is not mounted
         # in the router pod, thus not passed to the router.
         try:
-            router_tls_secret = cast(api_client.V1Secret, api_core.read_namespaced_secret(
-                                     self.parsed_spec.router.tlsSecretName, self.namespace))
-            ret["router_tls.crt"] = utils.b64decode(router_tls_secret.data["tls.crt"])
-            ret["router_tls.key"] = utils.b64decode(router_tls_secret.data["tls.key"])
+            router_tls_secret = g_secret_cache.get(self.namespace, self.parsed_spec.router.tlsSecretName)
+            ret["router_tls.crt"] = router_tls_secret["tls.crt"]
+            ret["router_tls.key"] = router_tls_secret["tls.key"]
         except ApiException as e:
             if e.status != 404:
                 raise
@@ -1916,8 +1844,8 @@ class InnoDBCluster(K8sInterfaceObject):
         return ret
 
     def get_tls_issuer_and_subject_rdns(self) -> Dict[str, str]:
-        ca_and_tls = self.get_ca_and_tls()
-        tls_cert = x509.load_pem_x509_certificate(ca_and_tls["tls.crt"].encode('ascii'))
+        # the parsed certificate is kept with the cached Secret
+        tls_cert = g_secret_cache.get(self.namespace, self.parsed_spec.tlsSecretName).certificate("tls.crt")
         # See RF 4514
         # 2.1.  Converting the RDNSequence
 
@@ -1942,10 +1870,19 @@ class InnoDBCluster(K8sInterfaceObject):
         }
 
     def get_admin_account(self) -> Tuple[str, str]:
-        secrets = self.get_private_secrets()
+        secrets = g_secret_cache.get(self.namespace, f"{self.name}-privsecrets")
+
+        return (secrets["clusterAdminUsername"], secrets["clusterAdminPassword"])
 
-        return (utils.b64decode(secrets.data["clusterAdminUsername"]),
-                utils.b64decode(secrets.data["clusterAdminPassword"]))
+    def invalidate_cached_secrets(self) -> None:
+        names = [f"{self.name}-router", f"{self.name}-backup", f"{self.name}-privsecrets"]
+        try:
+            spec = self.parsed_spec
+            names += [spec.tlsSecretName, spec.tlsCASecretName, spec.router.tlsSecretName]
+        except ApiSpecError:
+            pass
+        for name in names:
+            g_secret_cache.invalidate(self.namespace, name)
 
     @classmethod
     def get_service_account(cls, spec: AbstractServerSetSpec) -> api_client.V1ServiceAccount:
@@ -1962,50 +1899,30 @@ class InnoDBCluster(K8sInterfaceObject):
             body = api_client.V1DeleteOptions(grace_period_seconds=0)
             status = cast(api_client.V1Status,
                           api_core.delete_namespaced_config_map(cm_name, self.namespace, body=body))
+            reconcile_context.refresh("ConfigMap", self.namespace, cm_name, None)
             return status
         except ApiException as e:
             if e.status == 404:
+                reconcile_context.refresh("ConfigMap", self.namespace, cm_name, None)
                 return None
             raise
 
     def get_configmap(self, cm_name: str) -> typing.Optional[api_client.V1ConfigMap]:
-        try:
-            cm = cast(api_client.V1ConfigMap,
-                      api_core.read_namespaced_config_map(cm_name, self.namespace))
-            return cm
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1ConfigMap,
+                    read_memoized("ConfigMap", self.namespace, cm_name, api_core.read_namespaced_config_map))
 
     def get_secret(self, s_name: str) -> typing.Optional[api_client.V1Secret]:
-        try:
-            cm = cast(api_client.V1Secret,
-                      api_core.read_namespaced_secret(s_name, self.namespace))
-            return cm
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1Secret,
+                    read_memoized("Secret", self.namespace, s_name, api_core.read_namespaced_secret))
 
     @classmethod
     def get_initconf(cls, spec: AbstractServerSetSpec) -> typing.Optional[api_client.V1ConfigMap]:
-        try:
-            return cast(api_client.V1ConfigMap,
-                        api_core.read_namespaced_config_map(f"{spec.name}-initconf", spec.namespace))
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1ConfigMap,
+                    read_memoized("ConfigMap", spec.namespace, f"{spec.name}-initconf", api_core.read_namespaced_config_map))
 
     def get_initmysql(self) -> typing.Optional[api_client.V1ConfigMap]:
-        try:
-            return cast(api_client.V1ConfigMap,
-                        api_core.read_namespaced_config_map(f"{self.name}-initmysql", self.namespace))
-        except ApiException as e:
-            if e.status == 404:
-                return None
-            raise
+        return cast(api_client.V1ConfigMap,
+                    read_memoized("ConfigMap", self.namespace, f"{self.name}-initmysql", api_core.read_namespaced_config_map))
 
     def get_metrics_monitor(self) :#-> typing.Optional[api_customobj.___]:
         try:
@@ -2233,17 +2150,42 @@ def get_all_clusters(ns: str = None) -> typing.List[InnoDBCluster]:
 
 
 class MySQLPod(K8sInterfaceObject):
+    """
+    Values derived from the pod (index, connection options, conditions,
+    container statuses, membership info) are computed once and kept until
+    the pod object is replaced.
+    """
+
+    __slots__ = ("_pod", "port", "xport", "admin_account", "_index",
+                 "_endpoint_co", "_xendpoint_co", "_conditions",
+                 "_container_statuses", "_membership_info")
+
     logger: Optional[Logger] = None
 
-    def __init__(self, pod: client.V1Pod):
+    def __init__(self, pod: Union[client.V1Pod, PodView]):
         super().__init__()
 
-        self.pod: client.V1Pod = pod
+        self.pod = pod
 
         self.port = 3306
         self.xport = 33060
 
         self.admin_account = None
+        self._index: Optional[int] = None
+        self._endpoint_co: Optional[dict] = None
+        self._xendpoint_co: Optional[dict] = None
+
+    @property
+    def pod(self) -> Union[client.V1Pod, PodView]:
+        return self._pod
+
+    @pod.setter
+    def pod(self, pod: Union[client.V1Pod, PodView]) -> None:
+        self._pod = pod
+        self._conditions: Optional[Dict[str, str]] = None
+        self._container_statuses: Optional[Dict[str, Any]] = None
+        # (resourceVersion, parsed membership-info annotation)
+        self._membership_info: Optional[Tuple[Optional[str], Optional[dict]]] = None
 
     @overload
     @classmethod
@@ -2257,15 +2199,13 @@ class MySQLPod(K8sInterfaceObject):
 
     @classmethod
     def from_json(cls, pod) -> 'MySQLPod':
-        class Wrapper:
-            def __init__(self, data):
-                self.data = json.dumps(data)
-
-        if not isinstance(pod, str):
-            pod = eval(str(pod))
+        if isinstance(pod, str):
+            pod = json.loads(pod)
+        else:
+            # copy, the view must not change if the body is modified later
+            pod = json.loads(json.dumps(dict(pod)))
 
-        return MySQLPod(cast(client.V1Pod, api_core.api_client.deserialize(
-            Wrapper(pod), client.V1Pod)))
+        return MySQLPod(PodView(pod))
 
     def __str__(self) -> str:
         return self.name
@@ -2275,8 +2215,7 @@ class MySQLPod(K8sInterfaceObject):
 
     @classmethod
     def read(cls, name: str, ns: str) -> 'MySQLPod':
-        return MySQLPod(cast(client.V1Pod,
-                             api_core.read_namespaced_pod(name, ns)))
+        return MySQLPod(PodView(read_json(api_core.read_namespaced_pod, name, ns)))
 
     @property
     def metadata(self) -> api_client.V1ObjectMeta:
@@ -2317,7 +2256,9 @@ class MySQLPod(K8sInterfaceObject):
 
     @property
     def index(self) -> int:
-        return int(self.name.rpartition("-")[-1])
+        if self._index is None:
+            self._index = int(self.name.rpartition("-")[-1])
+        return self._index
 
     @property
     def namespace(self) -> str:
@@ -2361,14 +2302,17 @@ class MySQLPod(K8sInterfaceObject):
 
     @property
     def endpoint_co(self) -> dict:
-        if not self.admin_account:
-            self.admin_account = self.get_cluster().get_admin_account()
-
-        return {"scheme": "mysql",
-                "user": self.admin_account[0],
-                "password": self.admin_account[1],
-                "host": self.address_fqdn,
-                "port": self.port}
+        if not self._endpoint_co:
+            if not self.admin_account:
+                self.admin_account = self.get_cluster().get_admin_account()
+
+            self._endpoint_co = {"scheme": "mysql",
+                                 "user": self.admin_account[0],
+                                 "password": self.admin_account[1],
+                                 "host": self.address_fqdn,
+                                 "port": self.port}
+        # callers may add options (e.g. connect-timeout) to their copy
+        return dict(self._endpoint_co)
 
     @property
     def endpoint_url_safe(self) -> dict:
@@ -2383,18 +2327,19 @@ class MySQLPod(K8sInterfaceObject):
 
     @property
     def xendpoint_co(self) -> dict:
-        if not self.admin_account:
-            self.admin_account = self.get_cluster().get_admin_account()
+        if not self._xendpoint_co:
+            if not self.admin_account:
+                self.admin_account = self.get_cluster().get_admin_account()
 
-        return {"scheme": "mysqlx",
-                "user": self.admin_account[0],
-                "password": self.admin_account[1],
-                "host": self.address_fqdn,
-                "port": self.xport}
+            self._xendpoint_co = {"scheme": "mysqlx",
+                                  "user": self.admin_account[0],
+                                  "password": self.admin_account[1],
+                                  "host": self.address_fqdn,
+                                  "port": self.xport}
+        return dict(self._xendpoint_co)
 
     def reload(self) -> None:
-        self.pod = cast(api_client.V1Pod, api_core.read_namespaced_pod(
-            self.name, self.namespace))
+        self.pod = PodView(read_json(api_core.read_namespaced_pod, self.name, self.namespace))
 
     def owner_reference(self, api_version, kind) -> typing.Optional[api_client.V1OwnerReference]:
         for owner in self.metadata.owner_references:
@@ -2414,29 +2359,35 @@ class MySQLPod(K8sInterfaceObject):
             raise
 
     def check_condition(self, cond_type: str) -> typing.Optional[bool]:
-        if self.status and self.status.conditions:
-            for c in self.status.conditions:
-                if c.type == cond_type:
-                    return c.status == "True"
-
-        return None
+        if self._conditions is None:
+            self._conditions = {}
+            if self.status and self.status.conditions:
+                for c in self.status.conditions:
+                    self._conditions.setdefault(c.type, c.status)
+
+        status = self._conditions.get(cond_type)
+        if status is None:
+            return None
+        return status == "True"
 
     def check_containers_ready(self) -> typing.Optional[bool]:
         return self.check_condition("ContainersReady")
 
+    def _get_container_status(self, container_name: str) -> typing.Optional[api_client.V1ContainerStatus]:
+        if self._container_statuses is None:
+            self._container_statuses = {}
+            if self.status.container_statuses:
+                for cs in self.status.container_statuses:
+                    self._container_statuses.setdefault(cs.name, cs)
+        return self._container_statuses.get(container_name)
+
     def check_container_ready(self, container_name: str) -> typing.Optional[bool]:
-        if self.status.container_statuses:
-            for cs in self.status.container_statuses:
-                if cs.name == container_name:
-                    return cs.ready
-        return None
+        cs = self._get_container_status(container_name)
+        return cs.ready if cs else None
 
     def get_container_restarts(self, container_name: str) -> typing.Optional[int]:
-        if self.status.container_statuses:
-            for cs in self.status.container_statuses:
-                if cs.name == container_name:
-                    return cs.restart_count
-        return None
+        cs = self._get_container_status(container_name)
+        return cs.restart_count if cs else None
 
     def get_member_readiness_gate(self, gate: str) -> typing.Optional[bool]:
         return self.check_condition(f"mysql.oracle.com/{gate}")
@@ -2462,15 +2413,32 @@ class MySQLPod(K8sInterfaceObject):
 
     # TODO remove field
     def get_membership_info(self, field: str = None) -> typing.Optional[dict]:
-        if self.metadata.annotations:
-            info = self.metadata.annotations.get(
-                "mysql.oracle.com/membership-info", None)
-            if info:
-                info = json.loads(info)
-                if info and field:
-                    return info.get(field)
-                return info
-        return None
+        """
+        The annotation is parsed once per resourceVersion of the pod. The
+        returned dict is shared and must not be modified.
+        """
+        resource_version = self.metadata.resource_version
+        if self._membership_info is None or self._membership_info[0] != resource_version:
+            info = None
+            if self.metadata.annotations:
+                info = self.metadata.annotations.get(
+                    "mysql.oracle.com/membership-info", None)
+                info = json.loads(info) if info else None
+            self._membership_info = (resource_version, info)
+
+        info = self._membership_info[1]
+        if info and field:
+            return info.get(field)
+        return info
+
+    def membership_status_changed(self, member_id: str, role: str, status: str,
+                                  view_id: str, version: str) -> bool:
+        info = self.get_membership_info()
+        if not info or info.get("role") != role or info.get("status") != status or info.get("groupViewId") != view_id or info.get("memberId") != member_id or info.get("version") != version:
+            return True
+
+        labels = self.metadata.labels or {}
+        return labels.get("mysql.oracle.com/cluster-role") != (role if status == "ONLINE" else None)
 
     def update_membership_status(self, member_id: str, role: str, status: str,
                                  view_id: str, version: str,
@@ -2478,7 +2446,7 @@ class MySQLPod(K8sInterfaceObject):
         now = utils.isotime()
         last_probe_time = now
 
-        info = self.get_membership_info() or {}
+        info = dict(self.get_membership_info() or {})
         if not info or info.get("role") != role or info.get("status") != status or info.get("groupViewId") != view_id or info.get("memberId") != member_id:
             last_transition_time = now
         else:
@@ -2522,13 +2490,13 @@ class MySQLPod(K8sInterfaceObject):
         removed from the list (remove_finalizer).
         """
         patch = {"metadata": {"finalizers": [fin]}}
-        self.obj = api_core.patch_namespaced_pod(
-            self.name, self.namespace, body=patch)
+        self.pod = cast(api_client.V1Pod, api_core.patch_namespaced_pod(
+            self.name, self.namespace, body=patch))
 
     def _remove_finalizer(self, fin: str, pod_body: Body = None) -> None:
         patch = {"metadata": {"$deleteFromPrimitiveList/finalizers": [fin]}}
-        self.obj = api_core.patch_namespaced_pod(
-            self.name, self.namespace, body=patch)
+        self.pod = cast(api_client.V1Pod, api_core.patch_namespaced_pod(
+            self.name, self.namespace, body=patch))
 
         if pod_body:
             # modify the JSON data used internally by kopf to update its finalizer list
@@ -4,14 +4,15 @@
 #
 
 from kopf._cogs.structs.bodies import Body
-from .. import consts, errors, shellutils, utils, config, mysqlutils
+from .. import consts, errors, shellutils, utils, config, mysqlutils, metrics
 from .. import diagnose
 from ..backup import backup_objects
-from ..shellutils import DbaWrap
 from . import cluster_objects, router_objects
 from .cluster_api import MySQLPod, InnoDBCluster, client
+from ..group_monitor import g_group_monitor
+from ..session_pool import g_session_pool, PooledDba, SessionPoolKey
 import typing
-from typing import Optional, TYPE_CHECKING, Dict, cast, Callable
+from typing import Optional, TYPE_CHECKING, Dict, Tuple, cast, Callable, TypeVar
 from logging import Logger
 if TYPE_CHECKING:
     from mysqlsh.mysql import ClassicSession
@@ -21,8 +22,12 @@ import copy
 import mysqlsh
 import kopf
 import datetime
+import functools
+import threading
 import time
 
+T = TypeVar("T")
+
 common_gr_options = {
     # Abort the server if member is kicked out of the group, which would trigger
     # an event from the container restart, which we can catch and act upon.
@@ -43,15 +48,93 @@ class ClusterMutex:
         self.context = context
 
     def __enter__(self, *args):
-        owner_lock_creation_time: datetime.datetime
-        (owner, owner_context, owner_lock_creation_time) = utils.g_ephemeral_pod_state.testset(
-            self.cluster, "cluster-mutex", self.pod.name if self.pod else self.cluster.name, context=self.context)
-        if owner:
+        # Wait for our turn, as long as the handlers queued before us don't
+        # take too long. Otherwise let kopf retry the handler later.
+        with metrics.cluster_mutex_wait.time():
+            holder = utils.g_cluster_work_queue.acquire(
+                self.cluster, self.pod.name if self.pod else self.cluster.name, context=self.context,
+                timeout=config.CLUSTER_MUTEX_TIMEOUT, max_waiters=config.CLUSTER_MUTEX_MAX_WAITERS)
+        if holder:
+            metrics.cluster_mutex_busy.inc()
+            (owner, owner_context, owner_lock_creation_time) = holder
+            held_for = (datetime.datetime.now() - owner_lock_creation_time).total_seconds()
             raise kopf.TemporaryError(
-                f"{self.cluster.name} busy. lock_owner={owner} owner_context={owner_context} lock_created_at={owner_lock_creation_time.isoformat()}", delay=10)
+                f"{self.cluster.name} busy. lock_owner={owner} owner_context={owner_context} lock_created_at={owner_lock_creation_time.isoformat()} held_for={held_for:.0f}s", delay=10)
 
     def __exit__(self, *args):
-        utils.g_ephemeral_pod_state.set(self.cluster, "cluster-mutex", None, context=self.context)
+        utils.g_cluster_work_queue.release(self.cluster)
+
+
+class ClusterProbes:
+    """
+    Result of the last status probe of each cluster. Probes that don't change
+    the status are not written to the cluster object, so the latest probe
+    time is only known here and exported through the operator metrics.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # namespace/name -> (uid, lastProbeTime, status, onlineInstances)
+        self.probes: Dict[str, Tuple[str, str, str, int]] = {}
+
+    def set(self, cluster: InnoDBCluster, probe_time: str, status: str, online: int) -> None:
+        with self.lock:
+            old = self.probes.get(f"{cluster.namespace}/{cluster.name}")
+            self.probes[f"{cluster.namespace}/{cluster.name}"] = (cluster.uid, probe_time, status, online)
+
+        metrics.cluster_last_probe_time.set(cluster.namespace, cluster.name, value=time.time())
+        metrics.cluster_online_instances.set(cluster.namespace, cluster.name, value=online)
+        if old and old[2] != status:
+            metrics.cluster_status.remove(cluster.namespace, cluster.name, old[2])
+        metrics.cluster_status.set(cluster.namespace, cluster.name, status, value=1)
+
+    def get(self, cluster: InnoDBCluster) -> Optional[Tuple[str, str, int]]:
+        with self.lock:
+            probe = self.probes.get(f"{cluster.namespace}/{cluster.name}")
+        if probe and probe[0] == cluster.uid:
+            return probe[1:]
+        return None
+
+    def remove(self, namespace: str, name: str) -> None:
+        with self.lock:
+            self.probes.pop(f"{namespace}/{name}", None)
+        metrics.cluster_last_probe_time.remove(namespace, name)
+        metrics.cluster_online_instances.remove(namespace, name)
+        metrics.cluster_status.remove_matching(namespace=namespace, cluster=name)
+
+
+g_cluster_probes = ClusterProbes()
+
+
+def status_heartbeat_due(last_probe_time: Optional[str]) -> bool:
+    if not last_probe_time:
+        return True
+    try:
+        last = datetime.datetime.strptime(last_probe_time, "%Y-%m-%dT%H:%M:%SZ")
+    except ValueError:
+        return True
+    return (datetime.datetime.utcnow() - last).total_seconds() >= config.CLUSTER_STATUS_HEARTBEAT
+
+
+def releases_dba(f: Callable[..., T]) -> Callable[..., T]:
+    """
+    Return the session borrowed with borrow_dba(), e.g. by
+    connect_to_primary() or connect_to_cluster(), to the pool once the
+    outermost decorated method of the controller returns.
+    """
+    @functools.wraps(f)
+    def wrapper(self: 'ClusterController', *args, **kwargs) -> T:
+        self.dba_users += 1
+        ok = False
+        try:
+            result = f(self, *args, **kwargs)
+            ok = True
+            return result
+        finally:
+            self.dba_users -= 1
+            if not self.dba_users:
+                self.release_dba(reuse=ok)
+    return wrapper
 
 
 class ClusterController:
@@ -65,6 +148,9 @@ class ClusterController:
         self.cluster = cluster
         self.dba: Optional[Dba] = None
         self.dba_cluster: Optional[Cluster] = None
+        # session of self.dba, borrowed from g_session_pool
+        self.pooled_dba: Optional[Tuple[SessionPoolKey, PooledDba]] = None
+        self.dba_users = 0
 
     @property
     def dba_cluster_name(self) -> str:
@@ -73,8 +159,8 @@ class ClusterController:
         return self.cluster.name.replace("-", "_").replace(".", "_")
 
     def publish_status(self, diag: diagnose.ClusterStatus) -> None:
-        cluster_status = self.cluster.get_cluster_status()
-        if cluster_status and cluster_status["status"] != diag.status.name:
+        old_status = self.cluster.get_cluster_status()
+        if old_status and old_status["status"] != diag.status.name:
             self.cluster.info(action="ClusterStatus", reason="StatusChange",
                               message=f"Cluster status changed to {diag.status.name}. {len(diag.online_members)} member(s) ONLINE")
 
@@ -83,10 +169,29 @@ class ClusterController:
             "onlineInstances": len(diag.online_members),
             "lastProbeTime": utils.isotime()
         }
+        g_cluster_probes.set(self.cluster, cluster_status["lastProbeTime"],
+                             cluster_status["status"], cluster_status["onlineInstances"])
+
+        # Every write is a watch event for all watchers of the cluster, skip
+        # it unless the status changed or the heartbeat is due
+        if old_status and old_status.get("status") == cluster_status["status"] \
+                and old_status.get("onlineInstances") == cluster_status["onlineInstances"]:
+            if not status_heartbeat_due(old_status.get("lastProbeTime")):
+                metrics.cluster_status_writes.inc("unchanged")
+                return
+            metrics.cluster_status_writes.inc("heartbeat")
+        else:
+            metrics.cluster_status_writes.inc("changed")
         self.cluster.set_cluster_status(cluster_status)
 
     def probe_status(self, logger: Logger) -> diagnose.ClusterStatus:
-        diag = diagnose.diagnose_cluster(self.cluster, logger)
+        # the key is taken before diagnosing, so that changes seen meanwhile
+        # make the result stale
+        key = diagnose.g_diagnosis_cache.key(self.cluster, g_group_monitor.get_view(self.cluster))
+        diag = diagnose.g_diagnosis_cache.get(self.cluster, key)
+        if not diag:
+            diag = diagnose.diagnose_cluster(self.cluster, logger)
+            diagnose.g_diagnosis_cache.set(self.cluster, key, diag)
         if not self.cluster.deleting:
             self.publish_status(diag)
         logger.info(
@@ -94,10 +199,20 @@ class ClusterController:
         return diag
 
     def probe_status_if_needed(self, changed_pod: MySQLPod, logger: Logger) -> diagnose.ClusterDiagStatus:
+        # nothing changed since the last diagnosis
+        key = diagnose.g_diagnosis_cache.key(self.cluster, g_group_monitor.get_view(self.cluster))
+        diag = diagnose.g_diagnosis_cache.get(self.cluster, key)
+        if diag:
+            return diag.status
+
         cluster_probe_time = self.cluster.get_cluster_status("lastProbeTime")
+        last_status = self.cluster.get_cluster_status("status")
+        # probes that didn't change the status were only recorded in memory
+        last_probe = g_cluster_probes.get(self.cluster)
+        if last_probe and (not cluster_probe_time or last_probe[0] > cluster_probe_time):
+            cluster_probe_time, last_status, _ = last_probe
         member_transition_time = changed_pod.get_membership_info(
             "lastTransitionTime")
-        last_status = self.cluster.get_cluster_status("status")
         unreachable_states = (diagnose.ClusterDiagStatus.UNKNOWN,
                               diagnose.ClusterDiagStatus.ONLINE_UNCERTAIN,
                               diagnose.ClusterDiagStatus.OFFLINE_UNCERTAIN,
@@ -110,7 +225,8 @@ class ClusterController:
 
     def probe_member_status(self, pod: MySQLPod, session: 'ClassicSession', joined: bool, logger: Logger) -> None:
         # TODO use diagnose?
-        minfo = shellutils.query_membership_info(session)
+        with metrics.mysql_query_duration.time(shellutils.target_role(pod)):
+            minfo = shellutils.query_membership_info(session)
         member_id, role, status, view_id, version, mcount, rmcount = minfo
         logger.debug(
             f"instance probe: role={role} status={status} view_id={view_id} version={version} members={mcount} reachable_members={rmcount}")
@@ -124,10 +240,23 @@ class ClusterController:
 
         return minfo
 
+    def borrow_dba(self, pod: MySQLPod, logger: Logger, retry: bool = False, **kwargs) -> 'Dba':
+        self.release_dba()
+        self.pooled_dba = g_session_pool.acquire(pod, logger, retry, **kwargs)
+        self.dba = self.pooled_dba[1].dba
+        return self.dba
+
+    def release_dba(self, reuse: bool = True) -> None:
+        if self.pooled_dba:
+            key, entry = self.pooled_dba
+            self.pooled_dba = None
+            self.dba = None
+            self.dba_cluster = None
+            g_session_pool.release(key, entry, reuse)
+
     def connect_to_primary(self, primary_pod: MySQLPod, logger: Logger) -> 'Cluster':
         if primary_pod:
-            self.dba = shellutils.connect_dba(
-                primary_pod.endpoint_co, logger, max_tries=2)
+            self.borrow_dba(primary_pod, logger, retry=True, max_tries=2)
             self.dba_cluster = self.dba.get_cluster()
         else:
             # - check if we should consider pod marker for whether the instance joined
@@ -146,7 +275,7 @@ class ClusterController:
                     continue
 
                 try:
-                    self.dba = mysqlsh.connect_dba(pod.endpoint_co)
+                    self.borrow_dba(pod, logger)
 
                     if need_primary:
                         res = self.dba.session.run_sql(
@@ -157,11 +286,12 @@ class ClusterController:
                         r = res.fetch_one()
                         if r[0] != "PRIMARY":
                             logger.info(f"Primary requested, but {pod.name} is no primary")
-                            self.dba.session.close()
+                            self.release_dba()
                             continue
 
                 except Exception as e:
                     logger.debug(f"connect_dba: target={pod.name} error={e}")
+                    self.release_dba(reuse=False)
                     # Try another pod if we can't connect to it
                     last_exc = e
                     continue
@@ -173,6 +303,7 @@ class ClusterController:
                 except mysqlsh.Error as e:
                     logger.info(
                         f"get_cluster() from {pod.name} failed: {e}")
+                    self.release_dba()
 
                     if e.code == errors.SHERR_DBA_BADARG_INSTANCE_NOT_ONLINE:
                         # This member is not ONLINE, so there's no chance of
@@ -182,6 +313,7 @@ class ClusterController:
                 except Exception as e:
                     logger.info(
                         f"get_cluster() from {pod.name} failed: {e}")
+                    self.release_dba(reuse=False)
 
             # If all pods are connectable but OFFLINE, then we have complete outage and need a reboot
             if len(offline_pods) == len(all_pods):
@@ -211,6 +343,7 @@ class ClusterController:
             f"server_id={server_id} server_uuid={server_uuid}  report_host={report_host}  gtid_executed={gtid_executed}  gtid_purged={gtid_purged}")
 
     def create_cluster(self, seed_pod: MySQLPod, logger: Logger) -> None:
+        diagnose.g_diagnosis_cache.invalidate(self.cluster)
         logger.info("Creating cluster at %s" % seed_pod.name)
 
         assume_gtid_set_complete = False
@@ -266,7 +399,7 @@ class ClusterController:
                 return False
             return True
 
-        with DbaWrap(shellutils.connect_dba(seed_pod.endpoint_co, logger, is_retriable=should_retry)) as dba:
+        with g_session_pool.dba(seed_pod, logger, retry=True, is_retriable=should_retry) as dba:
             try:
                 self.dba_cluster = dba.get_cluster()
                 # maybe from a previous incomplete create attempt
@@ -357,13 +490,15 @@ class ClusterController:
             router_objects.update_size(self.cluster, n, False, logger)
 
 
+    @releases_dba
     def reboot_cluster(self, seed_pod_index: MySQLPod, logger: Logger) -> None:
-        pods = self.cluster.get_pods()
+        diagnose.g_diagnosis_cache.invalidate(self.cluster)
+        pods = self.cluster.get_pods(fresh=True)
         seed_pod = pods[seed_pod_index]
 
         logger.info(f"Rebooting cluster {self.cluster.name} from pod {seed_pod}...")
 
-        self.dba = shellutils.connect_dba(seed_pod.endpoint_co, logger)
+        self.borrow_dba(seed_pod, logger, retry=True)
 
         self.log_mysql_info(seed_pod, self.dba.session, logger)
 
@@ -385,7 +520,9 @@ class ClusterController:
         self.probe_member_status(seed_pod, self.dba.session, True, logger)
 
 
+    @releases_dba
     def force_quorum(self, seed_pod, logger: Logger) -> None:
+        diagnose.g_diagnosis_cache.invalidate(self.cluster)
         logger.info(
             f"Forcing quorum of cluster {self.cluster.name} using {seed_pod.name}...")
 
@@ -399,6 +536,7 @@ class ClusterController:
         # TODO Rejoin OFFLINE members
 
     def destroy_cluster(self, last_pod, logger: Logger) -> None:
+        diagnose.g_diagnosis_cache.invalidate(self.cluster)
         logger.info(f"Stopping GR for last cluster member {last_pod.name}")
 
         try:
@@ -417,8 +555,9 @@ class ClusterController:
 
         last_pod.remove_member_finalizer()
 
+    @releases_dba
     def reconcile_pod(self, primary_pod: MySQLPod, pod: MySQLPod, logger: Logger) -> None:
-        with DbaWrap(shellutils.connect_dba(pod.endpoint_co, logger)) as pod_dba_session:
+        with g_session_pool.dba(pod, logger, retry=True) as pod_dba_session:
             cluster = self.connect_to_primary(primary_pod, logger)
 
             status = diagnose.diagnose_cluster_candidate(
@@ -460,7 +599,9 @@ class ClusterController:
 
                 self.probe_member_status(pod, pod_dba_session.session, False, logger)
 
+    @releases_dba
     def join_instance(self, pod: MySQLPod, pod_dba_session: 'Dba', logger: Logger) -> None:
+        diagnose.g_diagnosis_cache.invalidate(self.cluster)
         logger.info(f"Adding {pod.endpoint} to cluster")
 
         peer_pod = self.connect_to_cluster(logger)
@@ -530,7 +671,9 @@ class ClusterController:
         if not router_objects.get_size(self.cluster) and member_count == self.cluster.parsed_spec.instances:
             self.post_create_actions(self.dba.session, self.dba_cluster, logger)
 
+    @releases_dba
     def rejoin_instance(self, pod: MySQLPod, pod_session, logger: Logger) -> None:
+        diagnose.g_diagnosis_cache.invalidate(self.cluster)
         logger.info(f"Rejoining {pod.endpoint} to cluster")
 
         if not self.dba_cluster:
@@ -553,7 +696,9 @@ class ClusterController:
 
         self.probe_member_status(pod, pod_session, False, logger)
 
+    @releases_dba
     def remove_instance(self, pod: MySQLPod, pod_body: Body, logger: Logger, force: bool = False) -> None:
+        diagnose.g_diagnosis_cache.invalidate(self.cluster)
         try:
             self.__remove_instance_aux(pod, logger, force)
         except Exception as e:
@@ -568,7 +713,7 @@ class ClusterController:
         print(f"Removing {pod.endpoint} from cluster FORCE={force}")
 
         # TODO improve this check
-        other_pods = self.cluster.get_pods()
+        other_pods = self.cluster.get_pods(fresh=True)
         if len(other_pods) == 1 and pod.instance_type == 'group-member':
             print("There is only one pod left in the cluster. Won't remove it, as this will dissolve the cluster. It will be removed only if the cluster is being deleted.")
 
@@ -659,7 +804,7 @@ class ClusterController:
 
         elif diagnostic.status == diagnose.ClusterDiagStatus.OFFLINE:
             # Reboot cluster if all pods are reachable
-            if len([g for g in diagnostic.gtid_executed.values() if g is not None]) == len(self.cluster.get_pods()):
+            if len([g for g in diagnostic.gtid_executed.values() if g is not None]) == len(self.cluster.get_pods(fresh=True)):
                 seed_pod = select_pod_with_most_gtids(diagnostic.gtid_executed)
 
                 self.cluster.info(action="RestoreCluster", reason="Rebooting",
@@ -773,6 +918,8 @@ class ClusterController:
             raise kopf.TemporaryError(f"Cluster repair from state {diag.status} attempted", delay=5)
 
     def on_pod_restarted(self, pod: MySQLPod, logger: Logger) -> None:
+        # a restart keeps the pod UID and may not have changed the view yet
+        diagnose.g_diagnosis_cache.invalidate(self.cluster)
         diag = self.probe_status(logger)
         logger.debug(
             f"on_pod_restarted: pod={pod.name}  primary={diag.primary}  cluster_state={diag.status}")
@@ -815,8 +962,13 @@ class ClusterController:
         annotations in each pod.
 
         This is for monitoring only and should not trigger any changes other
-        than in informational k8s fields.
+        than in informational k8s fields. Pods whose membership didn't change
+        are not patched. The readiness gate is part of the pod status, so it
+        needs a separate request, which is done only when its value flips.
         """
+        if view_id_changed:
+            diagnose.g_diagnosis_cache.invalidate(self.cluster)
+
         for pod in self.cluster.get_pods():
             info = pod.get_membership_info()
             if info:
@@ -831,12 +983,12 @@ class ClusterController:
                     pass
                 else:
                     continue
-                pod.update_membership_status(
-                    member_id, role, status, view_id, version)
-                if status == "ONLINE":
-                    pod.update_member_readiness_gate("ready", True)
-                else:
-                    pod.update_member_readiness_gate("ready", False)
+                if pod.membership_status_changed(member_id, role, status, view_id, version):
+                    pod.update_membership_status(
+                        member_id, role, status, view_id, version)
+                ready = status == "ONLINE"
+                if pod.get_member_readiness_gate("ready") != ready:
+                    pod.update_member_readiness_gate("ready", ready)
                 break
 
     def on_server_image_change(self, version: str) -> None:
@@ -856,23 +1008,25 @@ class ClusterController:
             raise kopf.TemporaryError(f"Cluster {self.cluster.namespace}/{self.cluster.name} unreachable", delay=5)
         router_objects.update_router_account(self.cluster, on_nonupdated, logger)
 
+    @releases_dba
     def on_change_metrics_user(self, logger: Logger) -> None:
-        metrics = self.cluster.parsed_spec.metrics
+        metrics_spec = self.cluster.parsed_spec.metrics
         self.connect_to_primary(None, logger)
 
-        if not metrics or not metrics.enable:
+        if not metrics_spec or not metrics_spec.enable:
             # This will use default name. needs to adapt when supporting custom
             # names
             mysqlutils.remove_metrics_user(self.dba.session)
             return
 
-        user = metrics.dbuser_name
-        grants = metrics.dbuser_grants
-        max_connections = metrics.dbuser_max_connections
+        user = metrics_spec.dbuser_name
+        grants = metrics_spec.dbuser_grants
+        max_connections = metrics_spec.dbuser_max_connections
 
         mysqlutils.setup_metrics_user(self.dba.session, user, grants,
                                       max_connections)
 
+    @releases_dba
     def on_router_pod_delete(self, name: str, logger: Logger) -> None:
         logger.info(f"Removing metadata for router {name} from {self.cluster.name}")
         self.connect_to_cluster(logger)
@@ -880,6 +1034,7 @@ class ClusterController:
         self.dba_cluster.remove_router_metadata(name + '::')
 
 
+    @releases_dba
     def on_router_routing_option_chahnge(self, old: dict, new: dict, logger: Logger) -> None:
         self.connect_to_primary(None, logger)
 
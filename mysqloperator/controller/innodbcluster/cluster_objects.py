@@ -5,16 +5,20 @@
 
 from logging import Logger, getLogger
 import kopf
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 from ..kubeutils import client as api_client
-from .. import utils, config, consts
+from ..kubeviews import StatefulSetView
+from .. import utils, config, consts, metrics, reconcile_context
 from .cluster_api import InnoDBCluster, AbstractServerSetSpec, InnoDBClusterSpec, ReadReplicaSpec, InnoDBClusterSpecProperties
 from .. import fqdn
 import yaml
 from ..kubeutils import api_core, api_apps, api_customobj, k8s_cluster_domain, ApiException
 from . import router_objects
 import base64
+import contextvars
+import copy
 import os
+import time
 
 # TODO replace app field with component (mysqld,router) and tier (mysql)
 
@@ -112,6 +116,51 @@ spec:
     return pdb
 
 
+def container_security_context() -> dict:
+    # These can't go to spec.template.spec.securityContext
+    # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodTemplateSpec / https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSpec
+    # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSecurityContext - for pods (top level)
+    # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#Container
+    # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#SecurityContext - for containers
+    return {
+        "allowPrivilegeEscalation": False,
+        "privileged": False,
+        "readOnlyRootFilesystem": True,
+        # The value is is inherited from the PodSecurityContext but dumb sec checkers might not know that
+        "runAsNonRoot": True,
+        "capabilities": {
+            "drop": ["ALL"]
+        }
+    }
+
+
+def env_from_field(name: str, field_path: str) -> dict:
+    return {"name": name, "valueFrom": {"fieldRef": {"fieldPath": field_path}}}
+
+
+def server_labels(spec: AbstractServerSetSpec, instance_type: str) -> dict:
+    labels = {
+        "tier": "mysql",
+        "mysql.oracle.com/cluster": spec.cluster_name,
+        "mysql.oracle.com/instance-type": instance_type
+    }
+    if type(spec) is ReadReplicaSpec:
+        labels["mysql.oracle.com/read-replica"] = spec.name
+    return labels
+
+
+def server_pod_labels(spec: AbstractServerSetSpec, instance_type: str) -> dict:
+    return {
+        "component": "mysqld",
+        **server_labels(spec, instance_type),
+        "app.kubernetes.io/name": "mysql-innodbcluster-mysql-server",
+        "app.kubernetes.io/instance": f"mysql-innodbcluster-{spec.name}-mysql-server",
+        "app.kubernetes.io/component": "database",
+        "app.kubernetes.io/managed-by": "mysql-operator",
+        "app.kubernetes.io/created-by": "mysql-operator"
+    }
+
+
 # TODO - check if we need to add a finalizer to the sts and svc (and if so, what's the condition to remove them)
 # TODO - check if we need to make readinessProbe take into account innodb recovery times
 
@@ -164,395 +213,261 @@ def prepare_cluster_stateful_set(spec: AbstractServerSetSpec, logger: Logger) ->
 
     fqdn_template = fqdn.idc_service_fqdn_template(spec)
 
-    extra_label = ""
     if type(spec) is InnoDBClusterSpec:
         instance_type = "group-member"
     elif type(spec) is ReadReplicaSpec:
         instance_type = "read-replica"
-        extra_label = f"mysql.oracle.com/read-replica: {spec.name}"
         # initial startup no replica, we scale up once the group is running
         # spec.instances therefore will be reduced by the caller!
     else:
         raise NotImplementedError(f"Unknown subtype {type(spec)} for creating StatefulSet")
 
-    fixdatadir_container = ""
+    init_containers = []
     if spec.dataDirPermissions.setRightsUsingInitContainer:
-        fixdatadir_container = f"""
-- name: fixdatadir
-  image: {spec.operator_image}
-  imagePullPolicy: {spec.sidecar_image_pull_policy}
-  command: ["bash", "-c", "chown 27:27 /var/lib/mysql && chmod 0700 /var/lib/mysql"]
-  securityContext:
-    # make an exception for this one
-    runAsNonRoot: false
-    runAsUser: 0
-    # These can't go to spec.template.spec.securityContext
-    # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodTemplateSpec / https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSpec
-    # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSecurityContext - for pods (top level)
-    # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#Container
-    # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#SecurityContext - for containers
-    allowPrivilegeEscalation: false
-    privileged: false
-    readOnlyRootFilesystem: true
-    capabilities:
-      add:
-      - CHOWN
-      - FOWNER
-      drop:
-      - ALL
-  volumeMounts:
-  - name: datadir
-    mountPath: /var/lib/mysql
-  env:
-  - name: MYSQL_OPERATOR_K8S_CLUSTER_DOMAIN
-    value: {cluster_domain}
-  - name: MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS
-    value: never
-"""
-    logger.info(f"Fix data container {'EN' if fixdatadir_container else 'DIS'}ABLED")
-
-    # TODO re-add "--log-file=",
-    tmpl = f"""
-apiVersion: apps/v1
-kind: StatefulSet
-metadata:
-  name: {spec.name}
-  annotations:
-      mysql.oracle.com/fqdn-template: '{fqdn_template}'
-  labels:
-    tier: mysql
-    mysql.oracle.com/cluster: {spec.cluster_name}
-    mysql.oracle.com/instance-type: {instance_type}
-    {extra_label}
-    app.kubernetes.io/name: mysql-innodbcluster
-    app.kubernetes.io/instance: mysql-innodbcluster-{spec.name}
-    app.kubernetes.io/component: database
-    app.kubernetes.io/managed-by: mysql-operator
-    app.kubernetes.io/created-by: mysql-operator
-spec:
-  serviceName: {spec.name}-instances
-  replicas: {spec.instances}
-  podManagementPolicy: Parallel
-  selector:
-    matchLabels:
-      component: mysqld
-      tier: mysql
-      mysql.oracle.com/cluster: {spec.cluster_name}
-      mysql.oracle.com/instance-type: {instance_type}
-      {extra_label}
-      app.kubernetes.io/name: mysql-innodbcluster-mysql-server
-      app.kubernetes.io/instance: mysql-innodbcluster-{spec.name}-mysql-server
-      app.kubernetes.io/component: database
-      app.kubernetes.io/managed-by: mysql-operator
-      app.kubernetes.io/created-by: mysql-operator
-  template:
-    metadata:
-      annotations:
-        mysql.oracle.com/fqdn-template: '{fqdn_template}'
-      labels:
-        component: mysqld
-        tier: mysql
-        mysql.oracle.com/cluster: {spec.cluster_name}
-        mysql.oracle.com/instance-type: {instance_type}
-        {extra_label}
-        app.kubernetes.io/name: mysql-innodbcluster-mysql-server
-        app.kubernetes.io/instance: mysql-innodbcluster-{spec.name}-mysql-server
-        app.kubernetes.io/component: database
-        app.kubernetes.io/managed-by: mysql-operator
-        app.kubernetes.io/created-by: mysql-operator
-    spec:
-      subdomain: {spec.name}
-      readinessGates:
-      - conditionType: "mysql.oracle.com/configured"
-      - conditionType: "mysql.oracle.com/ready"
-      serviceAccountName: {spec.serviceAccountName}
-      securityContext:
-        runAsUser: 27
-        runAsGroup: 27
-        fsGroup: 27
-{utils.indent("fsGroupChangePolicy: " + spec.dataDirPermissions.fsGroupChangePolicy, 8) if spec.dataDirPermissions.fsGroupChangePolicy else ""}
-        runAsNonRoot: true
-      terminationGracePeriodSeconds: 120
-      initContainers:
-{utils.indent(fixdatadir_container, 6)}
-      - name: initconf
-        image: {spec.operator_image}
-        imagePullPolicy: {spec.sidecar_image_pull_policy}
+        init_containers.append({
+            "name": "fixdatadir",
+            "image": spec.operator_image,
+            "imagePullPolicy": spec.sidecar_image_pull_policy,
+            "command": ["bash", "-c", "chown 27:27 /var/lib/mysql && chmod 0700 /var/lib/mysql"],
+            "securityContext": {
+                # make an exception for this one
+                "runAsNonRoot": False,
+                "runAsUser": 0,
+                "allowPrivilegeEscalation": False,
+                "privileged": False,
+                "readOnlyRootFilesystem": True,
+                "capabilities": {
+                    "add": ["CHOWN", "FOWNER"],
+                    "drop": ["ALL"]
+                }
+            },
+            "volumeMounts": [
+                {"name": "datadir", "mountPath": "/var/lib/mysql"}
+            ],
+            "env": [
+                {"name": "MYSQL_OPERATOR_K8S_CLUSTER_DOMAIN", "value": cluster_domain},
+                {"name": "MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS", "value": "never"}
+            ]
+        })
+    logger.info(f"Fix data container {'EN' if init_containers else 'DIS'}ABLED")
+
+    init_containers.append({
+        "name": "initconf",
+        "image": spec.operator_image,
+        "imagePullPolicy": spec.sidecar_image_pull_policy,
         # For datadir see the datadir volum mount
-        command: ["mysqlsh", "--log-level=@INFO", "--pym", "mysqloperator", "init",
-                  "--pod-name", "$(POD_NAME)",
-                  "--pod-namespace", "$(POD_NAMESPACE)",
-                  "--datadir", "/var/lib/mysql"
+        "command": ["mysqlsh", "--log-level=@INFO", "--pym", "mysqloperator", "init",
+                    "--pod-name", "$(POD_NAME)",
+                    "--pod-namespace", "$(POD_NAMESPACE)",
+                    "--datadir", "/var/lib/mysql"],
+        "securityContext": container_security_context(),
+        "env": [
+            env_from_field("POD_NAME", "metadata.name"),
+            env_from_field("POD_NAMESPACE", "metadata.namespace"),
+            {"name": "MYSQL_OPERATOR_K8S_CLUSTER_DOMAIN", "value": cluster_domain},
+            {"name": "MYSQLSH_USER_CONFIG_HOME", "value": "/tmp"},
+            {"name": "MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS", "value": "never"}
+        ],
+        "volumeMounts": [
+            {"name": "initconfdir", "mountPath": "/mnt/initconf", "readOnly": True},
+            {"name": "datadir", "mountPath": "/var/lib/mysql"},
+            {"name": "mycnfdata", "mountPath": "/mnt/mycnfdata"},
+            {"name": "initconf-tmp", "mountPath": "/tmp"},
+            # rootHost is not obligatory and thus might not exist in the secret
+            # Nevertheless K8s won't complain and instead of mounting an empty file
+            # will create a directory (/rootcreds/rootHost will be an empty directory)
+            # For more information see below the comment regarding rootcreds.
+            {"name": "rootcreds", "readOnly": True, "subPath": "rootHost", "mountPath": "/rootcreds/rootHost"}
         ]
-        securityContext:
-          # These can't go to spec.template.spec.securityContext
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodTemplateSpec / https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSpec
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSecurityContext - for pods (top level)
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#Container
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#SecurityContext - for containers
-          allowPrivilegeEscalation: false
-          privileged: false
-          readOnlyRootFilesystem: true
-          # The value is is inherited from the PodSecurityContext but dumb sec checkers might not know that
-          runAsNonRoot: true
-          capabilities:
-            drop:
-            - ALL
-        env:
-        - name: POD_NAME
-          valueFrom:
-            fieldRef:
-              fieldPath: metadata.name
-        - name: POD_NAMESPACE
-          valueFrom:
-            fieldRef:
-              fieldPath: metadata.namespace
-        - name: MYSQL_OPERATOR_K8S_CLUSTER_DOMAIN
-          value: {cluster_domain}
-        - name: MYSQLSH_USER_CONFIG_HOME
-          value: /tmp
-        - name: MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS
-          value: never
-        volumeMounts:
-        - name: initconfdir
-          mountPath: /mnt/initconf
-          readOnly: true
-        - name: datadir
-          mountPath: /var/lib/mysql
-        - name: mycnfdata
-          mountPath: /mnt/mycnfdata
-        - name: initconf-tmp
-          mountPath: /tmp
-        - name: rootcreds
-          readOnly: true
-          # rootHost is not obligatory and thus might not exist in the secret
-          # Nevertheless K8s won't complain and instead of mounting an empty file
-          # will create a directory (/rootcreds/rootHost will be an empty directory)
-          # For more information see below the comment regarding rootcreds.
-          subPath: rootHost
-          mountPath: /rootcreds/rootHost
-      - name: initmysql
-        image: {spec.mysql_image}
-        imagePullPolicy: {spec.mysql_image_pull_policy}
-        args: {init_mysql_argv}
-        securityContext:
-          # These can't go to spec.template.spec.securityContext
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodTemplateSpec / https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSpec
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSecurityContext - for pods (top level)
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#Container
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#SecurityContext - for containers
-          allowPrivilegeEscalation: false
-          privileged: false
-          readOnlyRootFilesystem: true
-          # The value is is inherited from the PodSecurityContext but dumb sec checkers might not know that
-          runAsNonRoot: true
-          capabilities:
-            drop:
-            - ALL
-        env:
-        - name: MYSQL_INITIALIZE_ONLY
-          value: "1"
-        - name: MYSQL_RANDOM_ROOT_PASSWORD
-          value: "1"
-        - name: MYSQLSH_USER_CONFIG_HOME
-          value: /tmp
-        volumeMounts:
-        - name: datadir
-          mountPath: /var/lib/mysql
-        - name: rundir
-          mountPath: /var/run/mysqld
-        - name: mycnfdata
-          mountPath: /etc/my.cnf.d
-          subPath: my.cnf.d
-        - name: mycnfdata
-          mountPath: /docker-entrypoint-initdb.d
-          subPath: docker-entrypoint-initdb.d
-        - name: mycnfdata
-          mountPath: /etc/my.cnf
-          subPath: my.cnf
-        - name: initmysql-tmp
-          mountPath: /tmp
-        - name: varlibmysqlfiles # The entrypoint of the container `touch`-es 2 files there
-          mountPath: /var/lib/mysql-files
-      containers:
-      - name: sidecar
-        image: {spec.operator_image}
-        imagePullPolicy: {spec.sidecar_image_pull_policy}
-        command: ["mysqlsh", "--pym", "mysqloperator", "sidecar",
-                  "--pod-name", "$(POD_NAME)",
-                  "--pod-namespace", "$(POD_NAMESPACE)",
-                  "--datadir", "/var/lib/mysql"
+    })
+    init_containers.append({
+        "name": "initmysql",
+        "image": spec.mysql_image,
+        "imagePullPolicy": spec.mysql_image_pull_policy,
+        "args": list(init_mysql_argv),
+        "securityContext": container_security_context(),
+        "env": [
+            {"name": "MYSQL_INITIALIZE_ONLY", "value": "1"},
+            {"name": "MYSQL_RANDOM_ROOT_PASSWORD", "value": "1"},
+            {"name": "MYSQLSH_USER_CONFIG_HOME", "value": "/tmp"}
+        ],
+        "volumeMounts": [
+            {"name": "datadir", "mountPath": "/var/lib/mysql"},
+            {"name": "rundir", "mountPath": "/var/run/mysqld"},
+            {"name": "mycnfdata", "mountPath": "/etc/my.cnf.d", "subPath": "my.cnf.d"},
+            {"name": "mycnfdata", "mountPath": "/docker-entrypoint-initdb.d", "subPath": "docker-entrypoint-initdb.d"},
+            {"name": "mycnfdata", "mountPath": "/etc/my.cnf", "subPath": "my.cnf"},
+            {"name": "initmysql-tmp", "mountPath": "/tmp"},
+            # The entrypoint of the container `touch`-es 2 files there
+            {"name": "varlibmysqlfiles", "mountPath": "/var/lib/mysql-files"}
         ]
-        securityContext:
-          # These can't go to spec.template.spec.securityContext
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodTemplateSpec / https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSpec
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSecurityContext - for pods (top level)
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#Container
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#SecurityContext - for containers
-          allowPrivilegeEscalation: false
-          privileged: false
-          readOnlyRootFilesystem: true
-          # The value is is inherited from the PodSecurityContext but dumb sec checkers might not know that
-          runAsNonRoot: true
-          capabilities:
-            drop:
-            - ALL
-        env:
-        - name: POD_NAME
-          valueFrom:
-            fieldRef:
-              fieldPath: metadata.name
-        - name: POD_NAMESPACE
-          valueFrom:
-            fieldRef:
-              fieldPath: metadata.namespace
-        - name: MYSQL_UNIX_PORT
-          value: /var/run/mysqld/mysql.sock
-        - name: MYSQLSH_USER_CONFIG_HOME
-          value: /mysqlsh
-        - name: MYSQL_OPERATOR_K8S_CLUSTER_DOMAIN
-          value: {cluster_domain}
-        - name: MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS
-          value: never
-        volumeMounts:
-        - name: rundir
-          mountPath: /var/run/mysqld
-        - name: mycnfdata
-          mountPath: /etc/my.cnf.d
-          subPath: my.cnf.d
-        - name: mycnfdata
-          mountPath: /etc/my.cnf
-          subPath: my.cnf
-        - name: shellhome
-          mountPath: /mysqlsh
-        - name: sidecar-tmp
-          mountPath: /tmp
-{utils.indent(spec.extra_sidecar_volume_mounts, 8)}
-      - name: mysql
-        image: {spec.mysql_image}
-        imagePullPolicy: {spec.mysql_image_pull_policy}
-        args: {mysql_argv}
-        securityContext:
-          # These can't go to spec.template.spec.securityContext
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodTemplateSpec / https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSpec
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSecurityContext - for pods (top level)
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#Container
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#SecurityContext - for containers
-          allowPrivilegeEscalation: false
-          privileged: false
-          readOnlyRootFilesystem: true
-          # The value is is inherited from the PodSecurityContext but dumb sec checkers might not know that
-          runAsNonRoot: true
-          capabilities:
-            drop:
-            - ALL
-        lifecycle:
-          preStop:
-            exec:
-              # 60 is the default value for dba.gtidWaitTimeout
-              # see https://dev.mysql.com/doc/mysql-shell/8.0/en/mysql-innodb-cluster-working-with-cluster.html
-              command: ["sh", "-c", "sleep 60 && mysqladmin -ulocalroot shutdown"]
-        startupProbe:
-          exec:
-            command: ["/livenessprobe.sh", "8"]
-          initialDelaySeconds: 5
-          periodSeconds: 3
-          failureThreshold: 10000
-          successThreshold: 1
-          timeout: 2
-        readinessProbe:
-          exec:
-            command: ["/readinessprobe.sh"]
-          periodSeconds: 5
-          initialDelaySeconds: 10
-          failureThreshold: 10000
-        livenessProbe:
-          exec:
-            command: ["/livenessprobe.sh"]
-          initialDelaySeconds: 15
-          periodSeconds: 15
-          failureThreshold: 10
-          successThreshold: 1
-          timeout: 5
-        env:
-        - name: MYSQL_UNIX_PORT
-          value: /var/run/mysqld/mysql.sock
-        - name: MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS
-          value: never
-{utils.indent(spec.extra_env, 8)}
-        ports:
-        - containerPort: {spec.mysql_port}
-          name: mysql
-        - containerPort: {spec.mysql_xport}
-          name: mysqlx
-        - containerPort: {spec.mysql_grport}
-          name: gr-xcom
-        volumeMounts:
-        - name: datadir
-          mountPath: /var/lib/mysql
-        - name: rundir
-          mountPath: /var/run/mysqld
-        - name: mycnfdata
-          mountPath: /etc/my.cnf.d
-          subPath: my.cnf.d
-        - name: mycnfdata
-          mountPath: /etc/my.cnf
-          subPath: my.cnf
-        - name: initconfdir
-          mountPath: /livenessprobe.sh
-          subPath: livenessprobe.sh
-        - name: initconfdir
-          mountPath: /readinessprobe.sh
-          subPath: readinessprobe.sh
-        - name: varlibmysqlfiles # The entrypoint of the container `touch`-es 2 files there
-          mountPath: /var/lib/mysql-files
-        - name: mysql-tmp
-          mountPath: /tmp
-{utils.indent(spec.extra_volume_mounts, 8)}
-      volumes:
-      - name: mycnfdata
-        emptyDir: {{}}
-      - name: rundir
-        emptyDir: {{}}
-      - name: varlibmysqlfiles
-        emptyDir: {{}}
-      - name: initconfdir
-        configMap:
-          name: {spec.name}-initconf
-          defaultMode: 0755
-      - name: shellhome
-        emptyDir: {{}}
-      - name: initconf-tmp
-        emptyDir: {{}}
-      - name: initmysql-tmp
-        emptyDir: {{}}
-      - name: mysql-tmp
-        emptyDir: {{}}
-      - name: sidecar-tmp
-        emptyDir: {{}}
-      # If we declare it and not use it anywhere as backing for a volumeMount K8s won't check
-      # if the volume exists. K8s seems to be lazy in that regard. We don't need the information
-      # from this secret directly, as the sidecar of pod 0 will fetch the information using the K8s API
-      # However, we won't not to be lazy in checking if the secret exists and make it easier for the
-      # administrator to find out if the secret is missing. If we mount it in a init or normal container,
-      # the pod # will get stuck into "Ready:0/2 Init:0/3" with
-      # Warning  FailedMount  XXs (....)  kubelet  "MountVolume.SetUp failed for volume "rootcreds" : secret ".........." not found" error to be seen in describe.
-      - name: rootcreds
-        secret:
-          secretName: {spec.secretName}
-          defaultMode: 0400
-{utils.indent(spec.extra_volumes, 6)}
-  volumeClaimTemplates:
-  - metadata:
-      name: datadir
-    spec:
-      accessModes: [ "ReadWriteOnce" ]
-      resources:
-        requests:
-          storage: 2Gi
-"""
+    })
+
+    sidecar = {
+        "name": "sidecar",
+        "image": spec.operator_image,
+        "imagePullPolicy": spec.sidecar_image_pull_policy,
+        "command": ["mysqlsh", "--pym", "mysqloperator", "sidecar",
+                    "--pod-name", "$(POD_NAME)",
+                    "--pod-namespace", "$(POD_NAMESPACE)",
+                    "--datadir", "/var/lib/mysql"],
+        "securityContext": container_security_context(),
+        "env": [
+            env_from_field("POD_NAME", "metadata.name"),
+            env_from_field("POD_NAMESPACE", "metadata.namespace"),
+            {"name": "MYSQL_UNIX_PORT", "value": "/var/run/mysqld/mysql.sock"},
+            {"name": "MYSQLSH_USER_CONFIG_HOME", "value": "/mysqlsh"},
+            {"name": "MYSQL_OPERATOR_K8S_CLUSTER_DOMAIN", "value": cluster_domain},
+            {"name": "MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS", "value": "never"}
+        ],
+        "volumeMounts": [
+            {"name": "rundir", "mountPath": "/var/run/mysqld"},
+            {"name": "mycnfdata", "mountPath": "/etc/my.cnf.d", "subPath": "my.cnf.d"},
+            {"name": "mycnfdata", "mountPath": "/etc/my.cnf", "subPath": "my.cnf"},
+            {"name": "shellhome", "mountPath": "/mysqlsh"},
+            {"name": "sidecar-tmp", "mountPath": "/tmp"},
+            *spec.extra_sidecar_volume_mounts
+        ]
+    }
 
-    statefulset = yaml.safe_load(tmpl.replace("\n\n", "\n"))
+    mysql = {
+        "name": "mysql",
+        "image": spec.mysql_image,
+        "imagePullPolicy": spec.mysql_image_pull_policy,
+        "args": list(mysql_argv),
+        "securityContext": container_security_context(),
+        "lifecycle": {
+            "preStop": {
+                "exec": {
+                    # 60 is the default value for dba.gtidWaitTimeout
+                    # see https://dev.mysql.com/doc/mysql-shell/8.0/en/mysql-innodb-cluster-working-with-cluster.html
+                    "command": ["sh", "-c", "sleep 60 && mysqladmin -ulocalroot shutdown"]
+                }
+            }
+        },
+        "startupProbe": {
+            "exec": {"command": ["/livenessprobe.sh", "8"]},
+            "initialDelaySeconds": 5,
+            "periodSeconds": 3,
+            "failureThreshold": 10000,
+            "successThreshold": 1,
+            "timeout": 2
+        },
+        "readinessProbe": {
+            "exec": {"command": ["/readinessprobe.sh"]},
+            "periodSeconds": 5,
+            "initialDelaySeconds": 10,
+            "failureThreshold": 10000
+        },
+        "livenessProbe": {
+            "exec": {"command": ["/livenessprobe.sh"]},
+            "initialDelaySeconds": 15,
+            "periodSeconds": 15,
+            "failureThreshold": 10,
+            "successThreshold": 1,
+            "timeout": 5
+        },
+        "env": [
+            {"name": "MYSQL_UNIX_PORT", "value": "/var/run/mysqld/mysql.sock"},
+            {"name": "MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS", "value": "never"},
+            *spec.extra_env
+        ],
+        "ports": [
+            {"containerPort": spec.mysql_port, "name": "mysql"},
+            {"containerPort": spec.mysql_xport, "name": "mysqlx"},
+            {"containerPort": spec.mysql_grport, "name": "gr-xcom"}
+        ],
+        "volumeMounts": [
+            {"name": "datadir", "mountPath": "/var/lib/mysql"},
+            {"name": "rundir", "mountPath": "/var/run/mysqld"},
+            {"name": "mycnfdata", "mountPath": "/etc/my.cnf.d", "subPath": "my.cnf.d"},
+            {"name": "mycnfdata", "mountPath": "/etc/my.cnf", "subPath": "my.cnf"},
+            {"name": "initconfdir", "mountPath": "/livenessprobe.sh", "subPath": "livenessprobe.sh"},
+            {"name": "initconfdir", "mountPath": "/readinessprobe.sh", "subPath": "readinessprobe.sh"},
+            # The entrypoint of the container `touch`-es 2 files there
+            {"name": "varlibmysqlfiles", "mountPath": "/var/lib/mysql-files"},
+            {"name": "mysql-tmp", "mountPath": "/tmp"},
+            *spec.extra_volume_mounts
+        ]
+    }
+
+    volumes = [
+        {"name": "mycnfdata", "emptyDir": {}},
+        {"name": "rundir", "emptyDir": {}},
+        {"name": "varlibmysqlfiles", "emptyDir": {}},
+        {"name": "initconfdir", "configMap": {"name": f"{spec.name}-initconf", "defaultMode": 0o755}},
+        {"name": "shellhome", "emptyDir": {}},
+        {"name": "initconf-tmp", "emptyDir": {}},
+        {"name": "initmysql-tmp", "emptyDir": {}},
+        {"name": "mysql-tmp", "emptyDir": {}},
+        {"name": "sidecar-tmp", "emptyDir": {}},
+        # If we declare it and not use it anywhere as backing for a volumeMount K8s won't check
+        # if the volume exists. K8s seems to be lazy in that regard. We don't need the information
+        # from this secret directly, as the sidecar of pod 0 will fetch the information using the K8s API
+        # However, we won't not to be lazy in checking if the secret exists and make it easier for the
+        # administrator to find out if the secret is missing. If we mount it in a init or normal container,
+        # the pod # will get stuck into "Ready:0/2 Init:0/3" with
+        # Warning  FailedMount  XXs (....)  kubelet  "MountVolume.SetUp failed for volume "rootcreds" : secret ".........." not found" error to be seen in describe.
+        {"name": "rootcreds", "secret": {"secretName": spec.secretName, "defaultMode": 0o400}},
+        *spec.extra_volumes
+    ]
+
+    pod_security_context = {"runAsUser": 27, "runAsGroup": 27, "fsGroup": 27}
+    if spec.dataDirPermissions.fsGroupChangePolicy:
+        pod_security_context["fsGroupChangePolicy"] = spec.dataDirPermissions.fsGroupChangePolicy
+    pod_security_context["runAsNonRoot"] = True
+
+    # TODO re-add "--log-file=",
+    statefulset = {
+        "apiVersion": "apps/v1",
+        "kind": "StatefulSet",
+        "metadata": {
+            "name": spec.name,
+            "annotations": {"mysql.oracle.com/fqdn-template": fqdn_template},
+            "labels": {
+                **server_labels(spec, instance_type),
+                "app.kubernetes.io/name": "mysql-innodbcluster",
+                "app.kubernetes.io/instance": f"mysql-innodbcluster-{spec.name}",
+                "app.kubernetes.io/component": "database",
+                "app.kubernetes.io/managed-by": "mysql-operator",
+                "app.kubernetes.io/created-by": "mysql-operator"
+            }
+        },
+        "spec": {
+            "serviceName": f"{spec.name}-instances",
+            "replicas": spec.instances,
+            "podManagementPolicy": "Parallel",
+            "selector": {
+                "matchLabels": server_pod_labels(spec, instance_type)
+            },
+            "template": {
+                "metadata": {
+                    "annotations": {"mysql.oracle.com/fqdn-template": fqdn_template},
+                    "labels": server_pod_labels(spec, instance_type)
+                },
+                "spec": {
+                    "subdomain": spec.name,
+                    "readinessGates": [
+                        {"conditionType": "mysql.oracle.com/configured"},
+                        {"conditionType": "mysql.oracle.com/ready"}
+                    ],
+                    "serviceAccountName": spec.serviceAccountName,
+                    "securityContext": pod_security_context,
+                    "terminationGracePeriodSeconds": 120,
+                    "initContainers": init_containers,
+                    "containers": [sidecar, mysql],
+                    "volumes": volumes
+                }
+            },
+            "volumeClaimTemplates": [{
+                "metadata": {"name": "datadir"},
+                "spec": {
+                    "accessModes": ["ReadWriteOnce"],
+                    "resources": {"requests": {"storage": "2Gi"}}
+                }
+            }]
+        }
+    }
 
     metadata = {}
     if spec.podAnnotations:
@@ -587,7 +502,7 @@ spec:
     return statefulset
 
 def update_stateful_set_size(cluster: InnoDBCluster, rr_spec: ReadReplicaSpec, logger: Logger) -> None:
-    sts = cluster.get_read_replica_stateful_set(rr_spec.name)
+    sts = cluster.get_stateful_set_view(rr_spec.name)
     if sts:
         patch = {"spec": {"replicas": rr_spec.instances}}
         api_apps.patch_namespaced_stateful_set(
@@ -738,98 +653,95 @@ fi
     else:
         ca_file_name = ""
 
-    tmpl = f"""
-apiVersion: v1
-kind: ConfigMap
-metadata:
-  name: {spec.name}-initconf
-data:
-  initdb-localroot.sql: |
-    set sql_log_bin=0;
-    # Create socket authenticated localroot@localhost account
-    CREATE USER localroot@localhost IDENTIFIED WITH auth_socket AS 'mysql';
-    GRANT ALL ON *.* TO localroot@localhost WITH GRANT OPTION;
-    GRANT PROXY ON ''@'' TO localroot@localhost WITH GRANT OPTION;
-    # Drop the default account created by the docker image
-    DROP USER IF EXISTS healthchecker@localhost;
-    # Create account for liveness probe
-    CREATE USER mysqlhealthchecker@localhost IDENTIFIED WITH auth_socket AS 'mysql';
-    set sql_log_bin=1;
-
-
-  readinessprobe.sh: |
-{utils.indent(readiness_probe, 4)}
-
-
-  livenessprobe.sh: |
-{utils.indent(liveness_probe, 4)}
-
-  router-entrypoint-run.sh.tpl: |
-{utils.indent(router_entrypoint, 4)}
-
-
-  my.cnf.in: |
-    # Server identity related options (not shared across instances).
-    # Do not edit.
-    [mysqld]
-    server_id=@@SERVER_ID@@
-    report_host=@@HOSTNAME@@
-    datadir=/var/lib/mysql
-    loose_mysqlx_socket=/var/run/mysqld/mysqlx.sock
-    socket=/var/run/mysqld/mysql.sock
-    local-infile=1
-
-    [mysql]
-    socket=/var/run/mysqld/mysql.sock
-
-    [mysqladmin]
-    socket=/var/run/mysqld/mysql.sock
-
-    !includedir /etc/my.cnf.d
-
-
-  00-basic.cnf: |
-    # Basic configuration.
-    # Do not edit.
-    [mysqld]
-    plugin_load_add=auth_socket.so
-    loose_auth_socket=FORCE_PLUS_PERMANENT
-    skip_log_error
-    log_error_verbosity=3
-
-  01-group_replication.cnf: |
-    # GR and replication related options
-    # Do not edit.
-    [mysqld]
-    log_bin={spec.name}
-    enforce_gtid_consistency=ON
-    gtid_mode=ON
-    skip_replica_start=1
-
-  02-ssl.cnf: |
-    # SSL configurations
-    # Do not edit.
-    [mysqld]
-    {"# " if spec.tlsUseSelfSigned else ""}ssl-ca=/etc/mysql-ssl/{ca_file_name}
-    {"# " if not has_crl else ""}ssl-crl=/etc/mysql-ssl/crl.pem
-    {"# " if spec.tlsUseSelfSigned else ""}ssl-cert=/etc/mysql-ssl/tls.crt
-    {"# " if spec.tlsUseSelfSigned else ""}ssl-key=/etc/mysql-ssl/tls.key
-
-    loose_group_replication_recovery_use_ssl=1
-    {"# " if spec.tlsUseSelfSigned else ""}loose_group_replication_recovery_ssl_verify_server_cert=1
-
-    {"# " if spec.tlsUseSelfSigned else ""}loose_group_replication_recovery_ssl_ca=/etc/mysql-ssl/{ca_file_name}
-    #{"# " if not has_crl else ""}loose_group_replication_recovery_ssl_crl=/etc/mysql-ssl/crl.pem
-    {"# " if spec.tlsUseSelfSigned else ""}loose_group_replication_recovery_ssl_cert=/etc/mysql-ssl/tls.crt
-    {"# " if spec.tlsUseSelfSigned else ""}loose_group_replication_recovery_ssl_key=/etc/mysql-ssl/tls.key
-
-  99-extra.cnf: |
-    # Additional user configurations taken from spec.mycnf in InnoDBCluster.
-    # Do not edit directly.
-{utils.indent(spec.mycnf, 4) if spec.mycnf else ""}
+    initdb_localroot = """set sql_log_bin=0;
+# Create socket authenticated localroot@localhost account
+CREATE USER localroot@localhost IDENTIFIED WITH auth_socket AS 'mysql';
+GRANT ALL ON *.* TO localroot@localhost WITH GRANT OPTION;
+GRANT PROXY ON ''@'' TO localroot@localhost WITH GRANT OPTION;
+# Drop the default account created by the docker image
+DROP USER IF EXISTS healthchecker@localhost;
+# Create account for liveness probe
+CREATE USER mysqlhealthchecker@localhost IDENTIFIED WITH auth_socket AS 'mysql';
+set sql_log_bin=1;
+"""
+
+    mycnf_in = """# Server identity related options (not shared across instances).
+# Do not edit.
+[mysqld]
+server_id=@@SERVER_ID@@
+report_host=@@HOSTNAME@@
+datadir=/var/lib/mysql
+loose_mysqlx_socket=/var/run/mysqld/mysqlx.sock
+socket=/var/run/mysqld/mysql.sock
+local-infile=1
+
+[mysql]
+socket=/var/run/mysqld/mysql.sock
+
+[mysqladmin]
+socket=/var/run/mysqld/mysql.sock
+
+!includedir /etc/my.cnf.d
 """
 
-    cm = yaml.safe_load(tmpl)
+    basic_cnf = """# Basic configuration.
+# Do not edit.
+[mysqld]
+plugin_load_add=auth_socket.so
+loose_auth_socket=FORCE_PLUS_PERMANENT
+skip_log_error
+log_error_verbosity=3
+"""
+
+    group_replication_cnf = f"""# GR and replication related options
+# Do not edit.
+[mysqld]
+log_bin={spec.name}
+enforce_gtid_consistency=ON
+gtid_mode=ON
+skip_replica_start=1
+"""
+
+    ssl_cnf = f"""# SSL configurations
+# Do not edit.
+[mysqld]
+{"# " if spec.tlsUseSelfSigned else ""}ssl-ca=/etc/mysql-ssl/{ca_file_name}
+{"# " if not has_crl else ""}ssl-crl=/etc/mysql-ssl/crl.pem
+{"# " if spec.tlsUseSelfSigned else ""}ssl-cert=/etc/mysql-ssl/tls.crt
+{"# " if spec.tlsUseSelfSigned else ""}ssl-key=/etc/mysql-ssl/tls.key
+
+loose_group_replication_recovery_use_ssl=1
+{"# " if spec.tlsUseSelfSigned else ""}loose_group_replication_recovery_ssl_verify_server_cert=1
+
+{"# " if spec.tlsUseSelfSigned else ""}loose_group_replication_recovery_ssl_ca=/etc/mysql-ssl/{ca_file_name}
+#{"# " if not has_crl else ""}loose_group_replication_recovery_ssl_crl=/etc/mysql-ssl/crl.pem
+{"# " if spec.tlsUseSelfSigned else ""}loose_group_replication_recovery_ssl_cert=/etc/mysql-ssl/tls.crt
+{"# " if spec.tlsUseSelfSigned else ""}loose_group_replication_recovery_ssl_key=/etc/mysql-ssl/tls.key
+"""
+
+    extra_cnf = """# Additional user configurations taken from spec.mycnf in InnoDBCluster.
+# Do not edit directly.
+"""
+    if spec.mycnf:
+        # a single trailing newline, like the other entries
+        extra_cnf += spec.mycnf.rstrip("\n") + "\n"
+
+    cm = {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {"name": f"{spec.name}-initconf"},
+        "data": {
+            "initdb-localroot.sql": initdb_localroot,
+            "readinessprobe.sh": readiness_probe,
+            "livenessprobe.sh": liveness_probe,
+            "router-entrypoint-run.sh.tpl": router_entrypoint.rstrip("\n") + "\n",
+            "my.cnf.in": mycnf_in,
+            "00-basic.cnf": basic_cnf,
+            "01-group_replication.cnf": group_replication_cnf,
+            "02-ssl.cnf": ssl_cnf,
+            "99-extra.cnf": extra_cnf
+        }
+    }
 
     prefix = 5
     for subsystem in spec.add_to_initconf_cbs:
@@ -851,9 +763,11 @@ def prepare_metrics_service_monitors(spec: AbstractServerSetSpec, logger: Logger
     return monitors
 
 
-def update_stateful_set_spec(sts : api_client.V1StatefulSet, patch: dict) -> None:
-    api_apps.patch_namespaced_stateful_set(
+def update_stateful_set_spec(sts : Union[api_client.V1StatefulSet, StatefulSetView], patch: dict) -> None:
+    sts = api_apps.patch_namespaced_stateful_set(
         sts.metadata.name, sts.metadata.namespace, body=patch)
+    reconcile_context.refresh("StatefulSet", sts.metadata.namespace, sts.metadata.name, sts)
+    reconcile_context.forget("StatefulSetView", sts.metadata.namespace, sts.metadata.name)
 
 def update_mysql_image(sts: api_client.V1StatefulSet, cluster: InnoDBCluster,
                        spec: AbstractServerSetSpec,
@@ -1000,12 +914,14 @@ def update_objects_for_subsystem(subsystem: InnoDBClusterSpecProperties,
                         print(f"\t\t\tReplacing CM {cluster.namespace}/{cm_name}")
                         current_cm.data = new_cm["data"]
                         #patcher.replace_configmap(cluster.namespace, cm_name, current_cm, on_apiexception_404_handler)
-                        api_core.replace_namespaced_config_map(cm_name, cluster.namespace, body=current_cm)
+                        current_cm = api_core.replace_namespaced_config_map(cm_name, cluster.namespace, body=current_cm)
+                        reconcile_context.refresh("ConfigMap", cluster.namespace, cm_name, current_cm)
                 else:
                     print(f"\t\t\tNo such cm exists. Creating {cluster.namespace}/{new_cm}")
                     kopf.adopt(new_cm)
                     #patcher.create_configmap(cluster.namespace, new_cm['metadata']['name'], new_cm, on_apiexception_generic_handler)
-                    api_core.create_namespaced_config_map(cluster.namespace, new_cm)
+                    current_cm = api_core.create_namespaced_config_map(cluster.namespace, new_cm)
+                    reconcile_context.refresh("ConfigMap", cluster.namespace, cm_name, current_cm)
 
     if subsystem in spec.add_to_sts_cbs:
         print(f"\t\tCurrent container count: {len(sts.spec.template.spec.containers)}")
@@ -1041,7 +957,8 @@ def update_objects_for_subsystem(subsystem: InnoDBClusterSpecProperties,
             print("\t\t\tPatching SVC")
             add_to_svc_cb(svc, logger)
         if changed:
-            api_core.replace_namespaced_service(svc.metadata.name, svc.metadata.namespace, svc)
+            svc = api_core.replace_namespaced_service(svc.metadata.name, svc.metadata.namespace, svc)
+            reconcile_context.refresh("Service", svc.metadata.namespace, svc.metadata.name, svc)
 
         print(f"\t\t\tSVC {'patched' if changed else 'unchanged'}")
 
@@ -1114,8 +1031,9 @@ def on_last_cluster_pod_removed(cluster: InnoDBCluster, logger: Logger) -> None:
     cluster.remove_cluster_finalizer()
 
 
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
-from typing import Callable, cast
+from typing import Callable, Tuple, cast
 from .. import kubeutils
 
 class PatchTarget(Enum):
@@ -1156,7 +1074,12 @@ class ApiCommand:
         self.body = body
         self.on_api_exception = on_api_exception
 
+    def __str__(self) -> str:
+        return f"{self.type.value} {self.namespace}/{self.name}"
+
     def run(self, logger: Logger) -> Optional[api_client.V1Status]:
+        status = None
+        start = time.monotonic()
         try:
             if self.type == ApiCommandType.CREATE_CM:
                 status = cast(api_client.V1Status,
@@ -1165,22 +1088,73 @@ class ApiCommand:
                 delete_body = api_client.V1DeleteOptions(grace_period_seconds=0)
                 status = cast(api_client.V1Status,
                               api_core.delete_namespaced_config_map(self.name, self.namespace, body=delete_body))
-                return status
             elif self.type == ApiCommandType.REPLACE_CM:
                 status = cast(api_client.V1Status,
                               api_core.replace_namespaced_config_map(self.name, self.namespace, body=self.body))
             elif self.type == ApiCommandType.PATCH_CM:
                 status = cast(api_client.V1Status,
                               api_core.patch_namespaced_config_map(self.name, self.namespace, self.body))
+            # the ConfigMap as written, or None when deleted
+            reconcile_context.refresh("ConfigMap", self.namespace, self.name,
+                                      None if self.type == ApiCommandType.DELETE_CM else status)
         except kubeutils.ApiException as exc:
+            reconcile_context.forget("ConfigMap", self.namespace, self.name)
             if self.on_api_exception is not None:
                 self.on_api_exception(exc, logger)
             else:
                 raise
+        finally:
+            duration = time.monotonic() - start
+            metrics.api_command_duration.observe(self.type.value, value=duration)
+            logger.info(f"{self} took {duration:.3f}s")
 
         return status
 
 
+class ApiCommandsError(Exception):
+    def __init__(self, errors: List[Tuple[ApiCommand, Exception]]):
+        super().__init__(f"{len(errors)} of the API commands failed: " +
+                         "; ".join(f"{command}: {exc}" for command, exc in errors))
+        self.errors = errors
+
+
+def run_api_commands(commands: List[ApiCommand], logger: Logger) -> None:
+    """
+    Runs the commands in a pool of config.API_COMMAND_WORKERS threads. The
+    commands on the same object run one after another in the order they
+    were queued, so that e.g. a delete and a create of a ConfigMap don't
+    race. All the commands are run even if some fail, the errors are then
+    raised together as one ApiCommandsError.
+    """
+    by_object: Dict[Tuple[str, str], List[ApiCommand]] = {}
+    for command in commands:
+        by_object.setdefault((command.namespace, command.name), []).append(command)
+
+    def run_all(object_commands: List[ApiCommand]) -> Optional[Tuple[ApiCommand, Exception]]:
+        for command in object_commands:
+            try:
+                command.run(logger)
+            except Exception as exc:
+                # the commands queued after it for the same object are not run
+                return (command, exc)
+        return None
+
+    start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(len(by_object), config.API_COMMAND_WORKERS)),
+                                  thread_name_prefix="api-command")
+    try:
+        # each with a copy of the context, for the reconcile context
+        futures = [executor.submit(contextvars.copy_context().run, run_all, object_commands)
+                   for object_commands in by_object.values()]
+        errors = [error for future in futures if (error := future.result())]
+    finally:
+        executor.shutdown(wait=True)
+    logger.info(f"Ran {len(commands)} API commands on {len(by_object)} objects in {time.monotonic() - start:.3f}s")
+
+    if errors:
+        raise ApiCommandsError(errors)
+
+
 def snail_to_camel(s: str) -> str:
     if s.find("_") == -1:
         return s
@@ -1227,11 +1201,15 @@ def merge_dicts(original, patch):
     return original
 
 
+# Field manager of the changes made with server-side apply
+k_field_manager = "mysql-operator"
+k_restarted_at_annotation = "kubectl.kubernetes.io/restartedAt"
+
+
 class InnoDBClusterObjectModifier:
     def __init__(self, cluster: InnoDBCluster, logger: Logger):
         self.server_sts_patch = {}
         self.sts_changed = False
-        self.sts_template_changed = False
         self.deploy_changed = False
         self.router_deploy_patch = {}
         self.cluster = cluster
@@ -1240,6 +1218,14 @@ class InnoDBClusterObjectModifier:
         self.sts = self.cluster.get_stateful_set()
         self.sts.spec = spec_to_dict(self.sts.spec)
         self.sts_spec_changed = False
+        # what the changes are compared to, before submitting them
+        self.sts_live = {
+            "metadata": {
+                "labels": dict(self.sts.metadata.labels or {}),
+                "annotations": dict(self.sts.metadata.annotations or {})
+            },
+            "spec": copy.deepcopy(self.sts.spec)
+        }
 
     def _apply_server_sts_patch_to_sts_spec_if_needed(self):
         if len(self.server_sts_patch):
@@ -1271,8 +1257,6 @@ class InnoDBClusterObjectModifier:
 
     def patch_sts(self, patch: dict) -> None:
         self.sts_changed = True
-        if "template" in patch:
-            self.sts_template_changed = True
         self.logger.info(f"Accumulating patch={patch}\n")
         # cache the patches without merging into self.sts.spec
         # in case there is no call to patch_sts_overwrite then we won't "replace"
@@ -1282,9 +1266,6 @@ class InnoDBClusterObjectModifier:
 
     def patch_sts_overwrite(self, patch: dict, patch_path: str) -> None:
         self.sts_changed = True
-        if "template" in patch:
-            self.sts_template_changed = True
-
         self.sts_spec_changed = True
         self._get_or_patch_sts_path(patch_path, patch)
         return
@@ -1330,39 +1311,112 @@ class InnoDBClusterObjectModifier:
     def patch_configmap(self, namespace: str, name: str, patch: dict, on_api_exception: Optional[OnApiExceptionHandler]) -> None:
         self.commands.append(ApiCommand(ApiCommandType.PATCH_CM, namespace, name, patch, on_api_exception))
 
+    def _owned_sts_fields(self) -> dict:
+        for entry in self.sts.metadata.managed_fields or []:
+            if entry.manager == k_field_manager and entry.operation == "Apply" and not entry.subresource:
+                return entry.fields_v1 or {}
+        return {}
+
+    def _apply_sts(self, body: dict, dry_run: bool = False) -> api_client.V1StatefulSet:
+        body = {
+            "apiVersion": "apps/v1",
+            "kind": "StatefulSet",
+            "metadata": {
+                "name": self.sts.metadata.name,
+                "namespace": self.sts.metadata.namespace,
+                **body.get("metadata", {})
+            },
+            "spec": body.get("spec", {})
+        }
+        sts = kubeutils.apply_object(api_apps, "/apis/apps/v1/namespaces/{namespace}/statefulsets/{name}",
+                                     {"namespace": self.sts.metadata.namespace, "name": self.sts.metadata.name},
+                                     body, "V1StatefulSet", k_field_manager, dry_run=dry_run)
+        if not dry_run:
+            self._refresh_sts(sts)
+        return sts
+
+    def _replace_sts(self, spec: dict, template_changed: bool) -> None:
+        self.logger.info(f"Replacing STS.spec with {spec}")
+        self.sts.spec = spec
+        if template_changed:
+            if not "annotations" in spec["template"]["metadata"] or spec["template"]["metadata"]["annotations"] is None:
+                spec["template"]["metadata"]["annotations"] = {}
+            spec["template"]["metadata"]["annotations"][k_restarted_at_annotation] = utils.isotime()
+        self._refresh_sts(api_apps.replace_namespaced_stateful_set(self.sts.metadata.name, self.sts.metadata.namespace,
+                                                                   body=self.sts))
+
+    def _refresh_sts(self, sts: api_client.V1StatefulSet) -> None:
+        # the rest of the reconcile reads the StatefulSet as written
+        reconcile_context.refresh("StatefulSet", sts.metadata.namespace, sts.metadata.name, sts)
+        reconcile_context.forget("StatefulSetView", sts.metadata.namespace, sts.metadata.name)
+
+    def _submit_sts(self) -> None:
+        """
+        Submit the changes to the StatefulSet as a single server-side apply,
+        with only the fields that changed plus those already owned by the
+        operator (which would be removed otherwise).
+
+        Only a real change of the pod template triggers a rolling restart,
+        e.g. a patch that sets a field to the value it already has doesn't.
+        Replica count changes only add or remove pods.
+        """
+        if self.sts_spec_changed:
+            # parts of the spec were overwritten, fold the patches into it
+            self._apply_server_sts_patch_to_sts_spec_if_needed()
+            desired = {"metadata": self.sts_live["metadata"], "spec": self.sts.spec}
+        else:
+            # the API server merges the patches (strategic merge) as before,
+            # but only in a dry-run to find out what actually changes
+            result = api_apps.patch_namespaced_stateful_set(self.sts.metadata.name, self.sts.metadata.namespace,
+                                                            body=self.server_sts_patch, dry_run="All")
+            desired = {
+                "metadata": {
+                    "labels": dict(result.metadata.labels or {}),
+                    "annotations": dict(result.metadata.annotations or {})
+                },
+                "spec": spec_to_dict(result.spec)
+            }
+            self.server_sts_patch = {}
+
+        changed, removed = utils.diff_objects(self.sts_live, desired)
+        if not changed and not removed:
+            self.logger.info("StatefulSet is unchanged, nothing to submit")
+            return
+
+        owned = self._owned_sts_fields()
+        body = utils.managed_fields_subset(desired, owned) if owned else {}
+        utils.merge_objects(body, changed)
+
+        template_changed = "template" in changed.get("spec", {}) or any(p[:2] == ("spec", "template") for p in removed)
+        if removed or (template_changed and self.sts_spec_changed):
+            # Check what the apply results in. Fields and list items owned by
+            # others (e.g. set when the StatefulSet was created) can't be
+            # removed with it, and an overwritten spec may be the same as the
+            # current one once the defaults are set
+            result = self._apply_sts(body, dry_run=True)
+            result = {"metadata": {"labels": result.metadata.labels or {},
+                                   "annotations": result.metadata.annotations or {}},
+                      "spec": spec_to_dict(result.spec)}
+            if not utils.object_contains(result, desired) or any(utils.has_path(result, path) for path in removed):
+                self.logger.info(f"StatefulSet changes can't be done with an apply, replacing it. removed={removed}")
+                self._replace_sts(desired["spec"], template_changed)
+                return
+            template_changed = result["spec"].get("template") != self.sts_live["spec"].get("template")
+
+        if template_changed:
+            utils.merge_objects(body, {"spec": {"template": {"metadata": {"annotations": {
+                k_restarted_at_annotation: utils.isotime()}}}}})
+        self.logger.info(f"Applying to STS {body} template_changed={template_changed}")
+        self._apply_sts(body)
+
     def submit_patches(self) -> None:
         self.logger.info(f"InnoDBClusterObjectModifier::submit_patches sts_changed={self.sts_changed} sts_spec_changed={self.sts_spec_changed} len(router_deploy_patch)={len(self.router_deploy_patch)} len(commands)={len(self.commands)}")
         if (self.sts_changed or len(self.router_deploy_patch) or len(self.commands)):
               if len(self.commands):
-                  for command in self.commands:
-                      command.run(self.logger)
+                  # the ConfigMaps must be there before the StatefulSet rolls
+                  run_api_commands(self.commands, self.logger)
               if self.sts_changed:
-                  if self.sts_spec_changed:
-                      # this should apply server_sts_patch over self.sts.spec and empty self.server_sts_patch
-                      # in the next step we will `replace` the STS and not `patch` it
-                      # Only if the self.sts.spec is not touched should be server_sts_patch be applied, as otherwise
-                      # changes to self.sts.spec will be skipped/forgotten
-                      self._apply_server_sts_patch_to_sts_spec_if_needed()
-
-                  if len(self.server_sts_patch):
-                      self.logger.info(f"Patching STS.spec with {self.server_sts_patch}")
-                      if self.sts_template_changed:
-                          restart_patch = {"spec":{"template":{"metadata":{"annotations":{"kubectl.kubernetes.io/restartedAt":utils.isotime()}}}}}
-                          utils.merge_patch_object(self.server_sts_patch, restart_patch)
-                      api_apps.patch_namespaced_stateful_set(self.sts.metadata.name, self.sts.metadata.namespace, body=self.server_sts_patch)
-                      self.server_sts_patch = {}
-                  else:
-                      self.logger.info(f"Replacing STS.spec with {self.sts.spec}")
-                      # only if template has been changed. It could be that only scale up/down (spec['replica'] changed) has happened
-                      # in that case if we set an annotation in the template the whole STS will be rolled over and this is not
-                      # what is wanted. If replica count is increased only new pods are needed, respectively when replica is decreased.
-                      # if replica is up and we set the annotation actually what will happen is rollover update and then scale up - we disturb the cluster
-                      # (and tests will fail)
-                      if self.sts_template_changed:
-                          if not "annotations" in self.sts.spec["template"]["metadata"] or self.sts.spec["template"]["metadata"]["annotations"] is None:
-                              self.sts.spec["template"]["metadata"]["annotations"] = {}
-                          self.sts.spec["template"]["metadata"]["annotations"]["kubectl.kubernetes.io/restartedAt"] = utils.isotime()
-                      api_apps.replace_namespaced_stateful_set(self.sts.metadata.name, self.sts.metadata.namespace, body=self.sts)
+                  self._submit_sts()
               if len(self.router_deploy_patch) and (deploy:= self.cluster.get_router_deployment()):
                   self.logger.info(f"Patching Deployment with {self.router_deploy_patch}")
                   router_objects.update_deployment_spec(deploy, self.router_deploy_patch)
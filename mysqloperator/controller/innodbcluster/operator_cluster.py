@@ -3,32 +3,44 @@
 # Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
 #
 
-from typing import Any, List, Optional, Callable
+from typing import Any, Dict, List, Optional, Callable
 from kopf._cogs.structs.bodies import Body
 from kubernetes.client.rest import ApiException
 
 from mysqloperator.controller.api_utils import ApiSpecError
-from .. import consts, kubeutils, config, utils, errors, diagnose
+from .. import consts, kubeutils, config, utils, errors, diagnose, metrics, sharding, executors, reconcile_context
 from .. import shellutils
 from ..group_monitor import g_group_monitor
-from ..utils import g_ephemeral_pod_state
+from ..session_pool import g_session_pool
+from ..utils import g_ephemeral_pod_state, TimerWheel
 from ..kubeutils import api_core, api_apps, api_policy, api_rbac, api_customobj, api_cron_job, k8s_version
 from ..backup import backup_objects
 from ..config import DEFAULT_OPERATOR_VERSION_TAG
-from .cluster_controller import ClusterController, ClusterMutex
+from .cluster_controller import ClusterController, ClusterMutex, g_cluster_probes
 from . import cluster_objects, router_objects, cluster_api
-from .cluster_api import InnoDBCluster, InnoDBClusterSpec, MySQLPod, get_all_clusters
+from .cluster_api import InnoDBCluster, InnoDBClusterSpec, MySQLPod, get_all_clusters, g_parsed_spec_cache
 import kopf
-from logging import Logger
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from logging import Logger, getLogger
+import threading
 import time
 import traceback
 
 
+# Delayed retries of pod events, at most one per pod
+g_pod_event_retries = TimerWheel("pod-event-retry", workers=config.POD_EVENT_RETRY_WORKERS)
+
+# Whether a scan of the clusters after a shards rebalance is waiting to run
+g_shards_rebalance_lock = threading.Lock()
+g_shards_rebalance_queued = False
+
+
 # TODO check whether we should store versions in status to make upgrade easier
 
 
 
 
+@metrics.timed_handler()
 def on_group_view_change(cluster: InnoDBCluster, members: list[tuple], view_id_changed: bool) -> None:
     """
     Triggered from the GroupMonitor whenever the membership view changes.
@@ -48,6 +60,43 @@ def monitor_existing_clusters(clusters: List[InnoDBCluster], logger: Logger) ->
                 cluster, on_group_view_change, logger)
 
 
+def on_shards_rebalanced(old_members: List[str], new_members: List[str]) -> None:
+    """
+    Called by the shard coordinator, from the thread renewing its Lease,
+    which must not wait for the API server. The clusters are scanned in the
+    Kubernetes I/O pool instead, once for all the rebalances that happened
+    while a scan was queued.
+    """
+    global g_shards_rebalance_queued
+    with g_shards_rebalance_lock:
+        if g_shards_rebalance_queued:
+            return
+        g_shards_rebalance_queued = True
+    executors.g_kubernetes_io.submit(rebalance_monitored_clusters)
+
+
+def rebalance_monitored_clusters() -> None:
+    """
+    Monitor the clusters that were moved to this operator replica and stop
+    monitoring the ones moved to others. The kopf handlers pick up the
+    moved objects by themselves, with their next event.
+    """
+    global g_shards_rebalance_queued
+    with g_shards_rebalance_lock:
+        g_shards_rebalance_queued = False
+
+    logger = getLogger("sharding")
+    try:
+        for cluster in get_all_clusters():
+            if sharding.owns_cluster(cluster.namespace, cluster.name):
+                if cluster.get_create_time():
+                    g_group_monitor.monitor_cluster(cluster, on_group_view_change, logger)
+            else:
+                g_group_monitor.remove_cluster(cluster)
+    except Exception as e:
+        logger.error(f"Error handling shards rebalance: {e}")
+
+
 def ensure_backup_schedules_use_current_image(clusters: List[InnoDBCluster], logger: Logger) -> None:
     for cluster in clusters:
         try:
@@ -64,6 +113,61 @@ def ensure_router_accounts_are_uptodate(clusters: List[InnoDBCluster], logger: L
                                              logger)
 
 
+def startup_cluster(cluster: InnoDBCluster, logger: Logger) -> None:
+    ensure_backup_schedules_use_current_image([cluster], logger)
+    monitor_existing_clusters([cluster], logger)
+    ensure_router_accounts_are_uptodate([cluster], logger)
+
+
+def run_startup_housekeeping(clusters: List[InnoDBCluster], logger: Logger) -> None:
+    """
+    Bring the existing clusters up to date after the operator started, with
+    up to config.STARTUP_WORKERS clusters at a time. A cluster that takes
+    longer than config.STARTUP_CLUSTER_TIMEOUT seconds is reported and not
+    waited for any more.
+    """
+    start = time.time()
+    started: Dict[str, float] = {}
+
+    def run(cluster: InnoDBCluster) -> None:
+        started[f"{cluster.namespace}/{cluster.name}"] = time.time()
+        startup_cluster(cluster, logger)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, config.STARTUP_WORKERS),
+                                  thread_name_prefix="startup")
+    try:
+        pending = {executor.submit(run, cluster): f"{cluster.namespace}/{cluster.name}" for cluster in clusters}
+        done_count = 0
+        failed = []
+        timed_out = []
+        last_progress = start
+        while pending:
+            done, _ = wait(pending.keys(), timeout=5, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                done_count += 1
+                try:
+                    future.result()
+                except Exception as exc:
+                    logger.warning(f"Startup housekeeping of {name} failed: {exc}")
+                    failed.append(name)
+
+            now = time.time()
+            for future, name in list(pending.items()):
+                if name in started and now - started[name] > config.STARTUP_CLUSTER_TIMEOUT:
+                    logger.warning(f"Startup housekeeping of {name} did not finish within {config.STARTUP_CLUSTER_TIMEOUT}s, not waiting for it")
+                    del pending[future]
+                    timed_out.append(name)
+
+            if pending and now - last_progress >= 30:
+                logger.info(f"Startup housekeeping: {done_count}/{len(clusters)} clusters done, {len(started) - done_count - len(timed_out)} in progress")
+                last_progress = now
+
+        logger.info(f"Startup housekeeping of {len(clusters)} clusters finished in {time.time() - start:.0f}s: failed={failed} timed_out={timed_out}")
+    finally:
+        executor.shutdown(wait=False)
+
+
 def ignore_404(f) -> Any:
     try:
         return f()
@@ -129,7 +233,7 @@ def do_create_read_replica(cluster: InnoDBCluster, rr: cluster_objects.ReadRepli
         api_core.create_namespaced_service(namespace=namespace, body=service)
 
     print(f"{indention}RR STS")
-    if not ignore_404(lambda: cluster.get_read_replica_stateful_set(rr.name)):
+    if not ignore_404(lambda: cluster.get_stateful_set_view(rr.name)):
         print(f"{indention}\tPreparing {rr.name} StatefulSet")
         statefulset = cluster_objects.prepare_cluster_stateful_set(rr, logger)
         if set_replicas_to_zero:
@@ -154,8 +258,11 @@ def do_reconcile_read_replica(cluster: InnoDBCluster,
 
 @kopf.on.create(consts.GROUP, consts.VERSION,
                 consts.INNODBCLUSTER_PLURAL)  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_kubernetes_io)
 def on_innodbcluster_create(name: str, namespace: Optional[str], body: Body,
                             logger: Logger, **kwargs) -> None:
+    sharding.ensure_owned(namespace, name)
     logger.info(
         f"Initializing InnoDB Cluster name={name} namespace={namespace} on K8s {k8s_version()}")
 
@@ -270,7 +377,7 @@ def on_innodbcluster_create(name: str, namespace: Optional[str], body: Body,
                 api_rbac.create_namespaced_role_binding(namespace=namespace, body=rb)
 
             print("7. Cluster StatefulSet")
-            if not ignore_404(cluster.get_stateful_set):
+            if not ignore_404(cluster.get_stateful_set_view):
                 print("\tPreparing...")
                 statefulset = cluster_objects.prepare_cluster_stateful_set(icspec, logger)
                 print(f"\tCreating...{statefulset}")
@@ -362,20 +469,28 @@ def on_innodbcluster_create(name: str, namespace: Optional[str], body: Body,
 
 @kopf.on.delete(consts.GROUP, consts.VERSION,
                 consts.INNODBCLUSTER_PLURAL)  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_kubernetes_io)
 def on_innodbcluster_delete(name: str, namespace: str, body: Body,
                             logger: Logger, **kwargs):
+    sharding.ensure_owned(namespace, name)
     cluster = InnoDBCluster(body)
 
     logger.info(f"Deleting cluster {name}")
 
     g_group_monitor.remove_cluster(cluster)
+    g_session_pool.invalidate(namespace, name)
+    g_cluster_probes.remove(namespace, name)
+    diagnose.g_diagnosis_cache.invalidate(cluster)
+    cluster.invalidate_cached_secrets()
+    g_parsed_spec_cache.invalidate(cluster.uid)
 
     # Scale down routers to 0
     logger.info(f"Updating Router Deployment.replicas to 0")
     router_objects.update_size(cluster, 0, False, logger)
 
     # Scale down the cluster to 0
-    sts = cluster.get_stateful_set()
+    sts = cluster.get_stateful_set_view()
     if sts:
         # First we need to check if there is only one pod there and whether it is being deleted
         # In case it is being deleted on_pod_delete() won't be called when we scale down the STS to 0
@@ -385,7 +500,7 @@ def on_innodbcluster_delete(name: str, namespace: str, body: Body,
         # state and we won't know whether it was in Terminating beforehand. If it wasn't then
         # on_pod_delete() will be called and we will try to remove the finalizer again663/385000on_spec
         # then len(pods) == maxUnavailable and all pods should be inspected whether they are terminating
-        pods = cluster.get_pods()
+        pods = cluster.get_pods(fresh=True)
         if len(pods) == 1 and pods[0].deleting:
             # if there is only one pod and it is deleting then on_pod_delete() won't be called
             # in this case the IC finalizer won't be removed and the IC will hang
@@ -526,8 +641,11 @@ def on_innodbcluster_field_router_container_options(old: dict, new: dict, body:
 # on_innodbcluster_field_router_options is safe to no go thru on_spec() as this method neither touches the STS nor the Deploy
 @kopf.on.field(consts.GROUP, consts.VERSION, consts.INNODBCLUSTER_PLURAL,
                field="spec.router.routingOptions")  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_kubernetes_io)
 def on_innodbcluster_field_router_options(old: dict, new: dict, body: Body,
                                           logger: Logger, **kwargs):
+    sharding.ensure_owned(body["metadata"]["namespace"], body["metadata"]["name"])
     if old == new:
         return
 
@@ -552,8 +670,11 @@ def on_innodbcluster_field_router_options(old: dict, new: dict, body: Body,
 # on_innodbcluster_field_backup_schedules is safe to no go thru on_spec() as this method neither touches the STS nor the Deploy
 @kopf.on.field(consts.GROUP, consts.VERSION, consts.INNODBCLUSTER_PLURAL,
                field="spec.backupSchedules")  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_kubernetes_io)
 def on_innodbcluster_field_backup_schedules(old: str, new: str, body: Body,
                                           logger: Logger, **kwargs):
+    sharding.ensure_owned(body["metadata"]["namespace"], body["metadata"]["name"])
     if old == new:
         return
 
@@ -608,8 +729,11 @@ def on_innodbcluster_field_tls_ca_secret_name(old: dict, new: dict, body: Body,
 
 @kopf.on.field(consts.GROUP, consts.VERSION, consts.INNODBCLUSTER_PLURAL,
                field="spec.readReplicas")  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_kubernetes_io)
 def on_innodbcluster_read_replicas_changed(old: dict, new: dict, body: Body,
                                            logger: Logger, **kwargs):
+    sharding.ensure_owned(body["metadata"]["namespace"], body["metadata"]["name"])
     logger.info("on_innodbcluster_read_replicas_changed")
 
     if old == new:
@@ -658,12 +782,16 @@ def on_innodbcluster_read_replicas_changed(old: dict, new: dict, body: Body,
 
 @kopf.on.create("", "v1", "pods",
                 labels={"component": "mysqld"})  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_mysql_admin)
 def on_pod_create(body: Body, logger: Logger, **kwargs):
     """
     Handle MySQL server Pod creation, which can happen when:
     - cluster is being first created
     - cluster is being scaled up (more members added)
     """
+    sharding.ensure_owned(body["metadata"]["namespace"],
+                          body["metadata"].get("labels", {}).get("mysql.oracle.com/cluster"))
 
     # TODO ensure that the pod is owned by us
     pod = MySQLPod.from_json(body)
@@ -705,69 +833,97 @@ def on_pod_create(body: Body, logger: Logger, **kwargs):
 
 
 @kopf.on.event("", "v1", "pods",
-               labels={"component": "mysqld"})  # type: ignore
-def on_pod_event(event, body: Body, logger: Logger, **kwargs):
+               labels={"component": "mysqld"},
+               when=sharding.is_owned_pod)  # type: ignore
+@metrics.timed_handler()
+async def on_pod_event(event, body: Body, logger: Logger, **kwargs):
     """
     Handle low-level MySQL server pod events. The events we're interested in are:
     - when a container restarts in a Pod (e.g. because of mysqld crash)
     """
     # TODO ensure that the pod is owned by us
+    pod = MySQLPod.from_json(body)
+    # A restart is handled with a rejoin or a reboot of the cluster, anything
+    # else only probes the status of the cluster
+    if g_ephemeral_pod_state.get(pod, "mysql-restarts") != pod.get_container_restarts("mysql"):
+        await executors.g_mysql_admin.run(dispatch_pod_event, pod, logger)
+    else:
+        await executors.g_kubernetes_io.run(dispatch_pod_event, pod, logger)
+
+
+def dispatch_pod_event(pod: MySQLPod, logger: Logger) -> None:
+    try:
+        handle_pod_event(pod, logger)
+    except kopf.TemporaryError as e:
+        # kopf doesn't call event handlers again on errors, so retry ourselves
+        schedule_pod_event_retry(pod, e, logger)
 
-    while True:
-        try:
-            pod = MySQLPod.from_json(body)
 
-            member_info = pod.get_membership_info()
-            ready = pod.check_containers_ready()
-            if pod.phase != "Running" or pod.deleting or not member_info:
-                logger.debug(
-                    f"ignored pod event: pod={pod.name} containers_ready={ready} deleting={pod.deleting} phase={pod.phase} member_info={member_info}")
+def schedule_pod_event_retry(pod: MySQLPod, error: kopf.TemporaryError, logger: Logger) -> None:
+    def retry() -> None:
+        try:
+            handle_pod_event(MySQLPod.read(pod.name, pod.namespace), logger)
+        except ApiException as e:
+            if e.status == 404:
+                logger.info(f"Pod {pod.namespace}/{pod.name} is gone, dropping event retry")
                 return
+            logger.error(f"Error retrying event of pod {pod.namespace}/{pod.name}: {e}")
+        except kopf.TemporaryError as e:
+            schedule_pod_event_retry(pod, e, logger)
+        except Exception as e:
+            logger.error(f"Error retrying event of pod {pod.namespace}/{pod.name}: {e}")
 
-            mysql_restarts = pod.get_container_restarts("mysql")
+    if g_pod_event_retries.schedule(f"{pod.namespace}/{pod.name}", error.delay or 1, retry):
+        logger.info(f"{error}: retrying after {error.delay} seconds. pending_retries={g_pod_event_retries.pending()}")
+    else:
+        logger.info(f"{error}: retry already pending. pending_retries={g_pod_event_retries.pending()}")
 
-            event = ""
-            if g_ephemeral_pod_state.get(pod, "mysql-restarts") != mysql_restarts:
-                event = "mysql-restarted"
 
-            containers = [
-                f"{c.name}={'ready' if c.ready else 'not-ready'}" for c in pod.status.container_statuses]
-            conditions = [
-                f"{c.type}={c.status}" for c in pod.status.conditions]
-            logger.debug(f"POD EVENT {event}: pod={pod.name} containers_ready={ready} deleting={pod.deleting} phase={pod.phase} member_info={member_info} restarts={mysql_restarts} containers={containers} conditions={conditions}")
+def handle_pod_event(pod: MySQLPod, logger: Logger) -> None:
+    member_info = pod.get_membership_info()
+    ready = pod.check_containers_ready()
+    if pod.phase != "Running" or pod.deleting or not member_info:
+        logger.debug(
+            f"ignored pod event: pod={pod.name} containers_ready={ready} deleting={pod.deleting} phase={pod.phase} member_info={member_info}")
+        return
 
-            cluster = pod.get_cluster()
-            if not cluster:
-                logger.info(
-                    f"Ignoring event for pod {pod.name} belonging to a deleted cluster")
-                return
-            with ClusterMutex(cluster, pod):
-                cluster_ctl = ClusterController(cluster)
+    mysql_restarts = pod.get_container_restarts("mysql")
 
-                # Check if a container in the pod restarted
-                if ready and event == "mysql-restarted":
-                    cluster_ctl.on_pod_restarted(pod, logger)
+    event = ""
+    if g_ephemeral_pod_state.get(pod, "mysql-restarts") != mysql_restarts:
+        event = "mysql-restarted"
 
-                    g_ephemeral_pod_state.set(pod, "mysql-restarts", mysql_restarts, context="on_pod_event")
+    containers = [
+        f"{c.name}={'ready' if c.ready else 'not-ready'}" for c in pod.status.container_statuses]
+    conditions = [
+        f"{c.type}={c.status}" for c in pod.status.conditions]
+    logger.debug(f"POD EVENT {event}: pod={pod.name} containers_ready={ready} deleting={pod.deleting} phase={pod.phase} member_info={member_info} restarts={mysql_restarts} containers={containers} conditions={conditions}")
 
-                # Check if we should refresh the cluster status
-                status = cluster_ctl.probe_status_if_needed(pod, logger)
-                if status == diagnose.ClusterDiagStatus.UNKNOWN:
-                    raise kopf.TemporaryError(
-                        f"Cluster has unreachable members. status={status}", delay=15)
-                break
-        except kopf.TemporaryError as e:
-            # TODO review this
-            # Manually handle retries, the event handler isn't getting called again
-            # by kopf (maybe a bug or maybe we're using it wrong)
-            logger.info(f"{e}: retrying after {e.delay} seconds")
-            if e.delay:
-                time.sleep(e.delay)
-            continue
+    cluster = pod.get_cluster()
+    if not cluster:
+        logger.info(
+            f"Ignoring event for pod {pod.name} belonging to a deleted cluster")
+        return
+    with ClusterMutex(cluster, pod):
+        cluster_ctl = ClusterController(cluster)
+
+        # Check if a container in the pod restarted
+        if ready and event == "mysql-restarted":
+            cluster_ctl.on_pod_restarted(pod, logger)
+
+            g_ephemeral_pod_state.set(pod, "mysql-restarts", mysql_restarts, context="on_pod_event")
+
+        # Check if we should refresh the cluster status
+        status = cluster_ctl.probe_status_if_needed(pod, logger)
+        if status == diagnose.ClusterDiagStatus.UNKNOWN:
+            raise kopf.TemporaryError(
+                f"Cluster has unreachable members. status={status}", delay=15)
 
 
 @kopf.on.delete("", "v1", "pods",
                 labels={"component": "mysqld"})  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_mysql_admin)
 def on_pod_delete(body: Body, logger: Logger, **kwargs):
     """
     Handle MySQL server Pod deletion, which can happen when:
@@ -775,6 +931,8 @@ def on_pod_delete(body: Body, logger: Logger, **kwargs):
     - cluster is being deleted
     - user deletes a pod by hand
     """
+    sharding.ensure_owned(body["metadata"]["namespace"],
+                          body["metadata"].get("labels", {}).get("mysql.oracle.com/cluster"))
     print("on_pod_delete")
     # TODO ensure that the pod is owned by us
     pod = MySQLPod.from_json(body)
@@ -791,6 +949,8 @@ def on_pod_delete(body: Body, logger: Logger, **kwargs):
 
             cluster_ctl.on_pod_deleted(pod, body, logger)
 
+            g_session_pool.invalidate(pod.namespace, pod.cluster_name, pod.endpoint)
+
             if pod.index == 0 and cluster.deleting:
                 print("Last cluster removed being removed!")
                 cluster_objects.on_last_cluster_pod_removed(cluster, logger)
@@ -941,7 +1101,10 @@ def handle_fields(old, new, body: Body,
 
 @kopf.on.field(consts.GROUP, consts.VERSION, consts.INNODBCLUSTER_PLURAL,
                field="spec")  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_kubernetes_io)
 def on_spec(body: Body, diff, old, new, logger: Logger, **kwargs):
+    sharding.ensure_owned(body["metadata"]["namespace"], body["metadata"]["name"])
     logger.info("on_spec")
     logger.info(f"old={old}")
     logger.info(f"new={new}")
@@ -951,36 +1114,43 @@ def on_spec(body: Body, diff, old, new, logger: Logger, **kwargs):
         logger.debug(f"on_spec: Old is empty")
         return
 
-    cluster = InnoDBCluster(body)
+    # all the Kubernetes objects read while handling the change are read once
+    with reconcile_context.reconcile() as context:
+        cluster = InnoDBCluster(body)
 
-    if not cluster.ready:
-        # ignore spec changes if the cluster is still being initialized
-        logger.debug(f"on_spec: Ignoring on_spec change for unready cluster")
-        return
+        if not cluster.ready:
+            # ignore spec changes if the cluster is still being initialized
+            logger.debug(f"on_spec: Ignoring on_spec change for unready cluster")
+            return
 
-    if not (sts:= cluster.get_stateful_set()):
-        logger.warning("STS doesn't exist yet. If this is a change during cluster start it might race and be lost")
-        return
+        if not (sts:= cluster.get_stateful_set_view()):
+            logger.warning("STS doesn't exist yet. If this is a change during cluster start it might race and be lost")
+            return
 
-    patcher = cluster_objects.InnoDBClusterObjectModifier(cluster, logger)
+        patcher = cluster_objects.InnoDBClusterObjectModifier(cluster, logger)
 
-    # TODOA: Enable and test this
-    #cluster.parsed_spec.validate(logger)
-    handle_fields(old, new, body, cluster, patcher, spec_tld_handlers, "spec.", logger)
+        # TODOA: Enable and test this
+        #cluster.parsed_spec.validate(logger)
+        handle_fields(old, new, body, cluster, patcher, spec_tld_handlers, "spec.", logger)
 
-    old_router, new_router = change_between_old_and_new(old, new, "router", lambda: {})
-    handle_fields(old_router, new_router, body, cluster, patcher, spec_router_handlers, "spec.router.", logger)
-    logger.info("Fields handled. Time to submit the patches to K8s API!")
+        old_router, new_router = change_between_old_and_new(old, new, "router", lambda: {})
+        handle_fields(old_router, new_router, body, cluster, patcher, spec_router_handlers, "spec.router.", logger)
+        logger.info("Fields handled. Time to submit the patches to K8s API!")
 
-    # It's time to patch
-    with ClusterMutex(cluster):
-        patcher.submit_patches()
+        # It's time to patch
+        with ClusterMutex(cluster):
+            patcher.submit_patches()
+
+        logger.info(f"on_spec: {context.misses} objects read from the API server, {context.hits} reads memoized")
 
 
 @kopf.on.field(consts.GROUP, consts.VERSION, consts.INNODBCLUSTER_PLURAL,
                field="spec.service")  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_kubernetes_io)
 def on_innodbcluster_field_service_type(old: str, new: str, body: Body,
                                        logger: Logger, **kwargs):
+    sharding.ensure_owned(body["metadata"]["namespace"], body["metadata"]["name"])
     if old == new:
         return
 
@@ -992,7 +1162,10 @@ def on_innodbcluster_field_service_type(old: str, new: str, body: Body,
 
 @kopf.on.delete("", "v1", "pods",
                 labels={"component": "mysqlrouter"})  # type: ignore
+@metrics.timed_handler()
+@executors.run_in(executors.g_kubernetes_io)
 def on_router_pod_delete(body: Body, logger: Logger, namespace: str, **kwargs):
+    sharding.ensure_owned(namespace, body["metadata"].get("labels", {}).get("mysql.oracle.com/cluster"))
     router_name = body["metadata"]["name"]
     try:
         cluster_name = body["metadata"]["labels"]["mysql.oracle.com/cluster"]
@@ -0,0 +1,167 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from typing import Dict, List, Optional, Tuple, Union
+from kubernetes import watch
+from ..kubeutils import api_core, ApiException, read_json
+from ..kubeutils import client as api_client
+from ..kubeviews import PodView
+import threading
+import time
+
+k_pod_label_selector = "component=mysqld"
+k_watch_timeout = 300
+k_retry_interval = 5
+k_max_retry_interval = 60
+
+# (namespace, cluster name, instance type, read replica name)
+PodCacheKey = Tuple[str, str, str, Optional[str]]
+
+Pod = Union[api_client.V1Pod, PodView]
+
+
+def pod_cache_key(pod: Pod) -> Optional[PodCacheKey]:
+    labels = pod.metadata.labels or {}
+    cluster_name = labels.get("mysql.oracle.com/cluster")
+    if not cluster_name:
+        return None
+    # With old clusters the instance-type label may be missing
+    instance_type = labels.get("mysql.oracle.com/instance-type", "group-member")
+    return (pod.metadata.namespace, cluster_name, instance_type,
+            labels.get("mysql.oracle.com/read-replica"))
+
+
+class RawWatch(watch.Watch):
+    """
+    Watch that leaves the objects of the events as the JSON received from the
+    API server, instead of deserializing them into models.
+    """
+
+    def get_return_type(self, func) -> None:
+        return None
+
+
+class PodCache(threading.Thread):
+    """
+    Informer-like cache of the mysqld pods of all clusters, fed by a single
+    LIST followed by a WATCH. Lookups return None while the cache is not in
+    sync with the API server, so that callers can fall back to a direct read.
+
+    Pods are kept as the JSON received from the API server, behind PodView
+    objects, which are shared and must not be modified.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(daemon=True, name="pod-cache")
+
+        self.lock = threading.Lock()
+        self.pods: Dict[PodCacheKey, Dict[str, Pod]] = {}
+        self.pod_keys: Dict[Tuple[str, str], PodCacheKey] = {}
+        self.resource_version: Optional[str] = None
+        self.synced = threading.Event()
+        self.watch: Optional[RawWatch] = None
+        self.stopped = False
+
+    def stop(self) -> None:
+        self.stopped = True
+        self.synced.clear()
+        if self.watch:
+            self.watch.stop()
+
+    def wait_synced(self, timeout: Optional[float] = None) -> bool:
+        return self.synced.wait(timeout)
+
+    def get_pods(self, ns: str, cluster_name: str,
+                 instance_type: str = "group-member",
+                 read_replica_name: Optional[str] = None) -> Optional[List[Pod]]:
+        if not self.synced.is_set():
+            return None
+        with self.lock:
+            pods = self.pods.get((ns, cluster_name, instance_type, read_replica_name))
+            return list(pods.values()) if pods else []
+
+    def get_pod(self, ns: str, name: str) -> Optional[Pod]:
+        if not self.synced.is_set():
+            return None
+        with self.lock:
+            key = self.pod_keys.get((ns, name))
+            if key is None:
+                return None
+            return self.pods[key].get(name)
+
+    def _store(self, pod: Pod) -> None:
+        key = pod_cache_key(pod)
+        self._forget(pod)
+        if key is None:
+            return
+        self.pods.setdefault(key, {})[pod.metadata.name] = pod
+        self.pod_keys[(pod.metadata.namespace, pod.metadata.name)] = key
+
+    def _forget(self, pod: Pod) -> None:
+        old_key = self.pod_keys.pop((pod.metadata.namespace, pod.metadata.name), None)
+        if old_key is not None:
+            pods = self.pods.get(old_key)
+            if pods is not None:
+                pods.pop(pod.metadata.name, None)
+                if not pods:
+                    del self.pods[old_key]
+
+    def _relist(self) -> None:
+        objects = read_json(api_core.list_pod_for_all_namespaces,
+                            label_selector=k_pod_label_selector)
+        items = objects.get("items") or []
+        with self.lock:
+            self.pods = {}
+            self.pod_keys = {}
+            for item in items:
+                self._store(PodView(item))
+            self.resource_version = objects["metadata"]["resourceVersion"]
+        self.synced.set()
+        print(f"PodCache: Synced {len(items)} pods at resourceVersion {self.resource_version}")
+
+    def _watch(self) -> None:
+        self.watch = RawWatch()
+        for event in self.watch.stream(api_core.list_pod_for_all_namespaces,
+                                       label_selector=k_pod_label_selector,
+                                       resource_version=self.resource_version,
+                                       timeout_seconds=k_watch_timeout):
+            if self.stopped:
+                break
+            pod = PodView(event["raw_object"])
+            with self.lock:
+                if event["type"] == "DELETED":
+                    self._forget(pod)
+                else:
+                    self._store(pod)
+                self.resource_version = pod.metadata.resource_version
+
+    def run(self) -> None:
+        delay = k_retry_interval
+        while not self.stopped:
+            try:
+                if not self.synced.is_set():
+                    self._relist()
+                self._watch()
+                delay = k_retry_interval
+                continue
+            except ApiException as e:
+                if self.stopped:
+                    break
+                if e.status == 410:
+                    # resourceVersion too old, only a new LIST can resync
+                    print(f"PodCache: Watch expired, relisting: {e}")
+                    self.synced.clear()
+                    continue
+                # Keep the pods and resume the watch from the last
+                # resourceVersion, a LIST of all pods won't help here
+                print(f"PodCache: Watch failed, retrying in {delay}s: {e}")
+            except Exception as e:
+                if self.stopped:
+                    break
+                print(f"PodCache: Unexpected error, retrying in {delay}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, k_max_retry_interval)
+
+g_pod_cache = PodCache()
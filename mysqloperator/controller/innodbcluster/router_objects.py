@@ -6,7 +6,8 @@
 from shlex import quote
 from .cluster_api import InnoDBCluster, InnoDBClusterSpec
 from ..kubeutils import client as api_client, ApiException
-from .. import config, fqdn, utils, shellutils
+from .. import config, fqdn, utils, reconcile_context
+from ..session_pool import g_session_pool
 import mysqlsh
 import yaml
 from ..kubeutils import api_apps, api_core, k8s_cluster_domain
@@ -16,56 +17,32 @@ from typing import Optional, Callable
 
 
 def prepare_router_service(spec: InnoDBClusterSpec) -> dict:
-    tmpl = f"""
-apiVersion: v1
-kind: Service
-metadata:
-  name: {spec.name}
-  namespace: {spec.namespace}
-  labels:
-    tier: mysql
-    mysql.oracle.com/cluster: {spec.name}
-spec:
-  ports:
-  - name: mysql
-    port: {spec.mysql_port}
-    protocol: TCP
-    targetPort: {spec.service.get_default_port_number(spec)}
-  - name: mysqlx
-    port: {spec.mysql_xport}
-    protocol: TCP
-    targetPort: {spec.router_rwxport}
-  - name: mysql-alternate
-    port: {spec.router_rwport}
-    protocol: TCP
-    targetPort: {spec.router_rwport}
-  - name: mysqlx-alternate
-    port: {spec.router_rwxport}
-    protocol: TCP
-    targetPort: {spec.router_rwxport}
-  - name: mysql-ro
-    port: {spec.router_roport}
-    protocol: TCP
-    targetPort: {spec.router_roport}
-  - name: mysqlx-ro
-    port: {spec.router_roxport}
-    protocol: TCP
-    targetPort: {spec.router_roxport}
-  - name: mysql-rw-split
-    port: {spec.router_rwsplitport}
-    protocol: TCP
-    targetPort: {spec.router_rwsplitport}
-  - name: router-rest
-    port: {spec.router_httpport}
-    protocol: TCP
-    targetPort: {spec.router_httpport}
-  selector:
-    component: mysqlrouter
-    tier: mysql
-    mysql.oracle.com/cluster: {spec.name}
-  type: {spec.service.type}
-"""
-    service = yaml.safe_load(tmpl)
+    def port(name: str, port: int, target_port: int) -> dict:
+        return {"name": name, "port": port, "protocol": "TCP", "targetPort": target_port}
+
+    service = {
+        "apiVersion": "v1",
+        "kind": "Service",
+        "metadata": {
+            "name": spec.name,
+            "namespace": spec.namespace,
+            "labels": {"tier": "mysql", "mysql.oracle.com/cluster": spec.name}
+        },
+        "spec": {
+            "ports": [
+                port("mysql", spec.mysql_port, spec.service.get_default_port_number(spec)),
+                port("mysqlx", spec.mysql_xport, spec.router_rwxport),
+                port("mysql-alternate", spec.router_rwport, spec.router_rwport),
+                port("mysqlx-alternate", spec.router_rwxport, spec.router_rwxport),
+                port("mysql-ro", spec.router_roport, spec.router_roport),
+                port("mysqlx-ro", spec.router_roxport, spec.router_roxport),
+                port("mysql-rw-split", spec.router_rwsplitport, spec.router_rwsplitport),
+                port("router-rest", spec.router_httpport, spec.router_httpport)
+            ],
+            "selector": {"component": "mysqlrouter", "tier": "mysql", "mysql.oracle.com/cluster": spec.name},
+            "type": spec.service.type
+        }
+    }
 
     if spec.service.annotations:
         service['metadata']['annotations'] = spec.service.annotations
@@ -127,145 +104,113 @@ def prepare_router_deployment(cluster: InnoDBCluster, logger, *,
     router_command = ['mysqlrouter', *spec.router.options]
     router_target = fqdn.idc_service_fqdn(cluster, logger)
 
-    tmpl = f"""
-apiVersion: apps/v1
-kind: Deployment
-metadata:
-  name: {spec.name}-router
-  label:
-    tier: mysql
-    mysql.oracle.com/cluster: {spec.name}
-    app.kubernetes.io/name: mysql-innodbcluster
-    app.kubernetes.io/instance: mysql-innodbcluster-{spec.name}-router
-    app.kubernetes.io/component: router
-    app.kubernetes.io/managed-by: mysql-operator
-    app.kubernetes.io/created-by: mysql-operator
-spec:
-  replicas: {spec.router.instances or 1 if not init_only else 0}
-  selector:
-    matchLabels:
-      component: mysqlrouter
-      tier: mysql
-      mysql.oracle.com/cluster: {spec.name}
-      app.kubernetes.io/name: mysql-router
-      app.kubernetes.io/instance: mysql-innodbcluster-{spec.name}-router
-      app.kubernetes.io/component: router
-      app.kubernetes.io/managed-by: mysql-operator
-      app.kubernetes.io/created-by: mysql-operator
-  template:
-    metadata:
-      labels:
-        component: mysqlrouter
-        tier: mysql
-        mysql.oracle.com/cluster: {spec.name}
-        app.kubernetes.io/name: mysql-router
-        app.kubernetes.io/instance: mysql-innodbcluster-{spec.name}-router
-        app.kubernetes.io/component: router
-        app.kubernetes.io/managed-by: mysql-operator
-        app.kubernetes.io/created-by: mysql-operator
-    spec:
-      serviceAccountName: {spec.serviceAccountName}
-      securityContext:
-        runAsUser: 999
-        runAsGroup: 999
-        fsGroup: 999
-        runAsNonRoot: true
-      containers:
-      - name: router
-        image: {spec.router_image}
-        imagePullPolicy: {spec.router_image_pull_policy}
-        securityContext:
-          # These can't go to spec.template.spec.securityContext
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodTemplateSpec / https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSpec
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSecurityContext - for pods (top level)
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#Container
-          # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#SecurityContext - for containers
-          allowPrivilegeEscalation: false
-          privileged: false
-          readOnlyRootFilesystem: true
-          capabilities:
-            drop:
-            - ALL
-        env:
-        - name: MYSQL_HOST
-          value: {router_target}
-        - name: MYSQL_PORT
-          value: "3306"
-        - name: MYSQL_USER_FILE
-          value: /.routeruser
-        - name: MYSQL_PASSWORD_FILE
-          value: /.routerpw
-        - name: MYSQL_CREATE_ROUTER_USER
-          value: "0"
-        volumeMounts:
-        - name: tmpdir
-          mountPath: /tmp
-        - name: initconfdir
-          subPath: router-entrypoint-run.sh.tpl
-          mountPath: /run.sh
-          readOnly: true
-        - name:  routercredentials
-          subPath: routerUsername
-          mountPath: /.routeruser
-          readOnly: true
-        - name:  routercredentials
-          subPath: routerPassword
-          mountPath: /.routerpw
-          readOnly: true
-
-{utils.indent(spec.extra_router_volume_mounts if router_tls_exists else spec.extra_router_volume_mounts_no_cert, 8)}
-        ports:
-        - containerPort: {spec.router_rwport}
-          name: mysqlrw
-        - containerPort: {spec.router_rwxport}
-          name: mysqlxrw
-        - containerPort: {spec.router_rwsplitport}
-          name: mysqlrwsplit
-        - containerPort: {spec.router_roport}
-          name: mysqlro
-        - containerPort: {spec.router_roxport}
-          name: mysqlxro
-        - containerPort: {spec.router_httpport}
-          name: http
-        readinessProbe:
-          exec:
-            command:
-            - cat
-            - /tmp/mysqlrouter/mysqlrouter.conf
-        livenessProbe:
-          failureThreshold: 3
-          httpGet:
-            path: /api/20190715/swagger.json
-            port: http
-            scheme: HTTPS
-          periodSeconds: 10
-          successThreshold: 1
-          timeoutSeconds: 1
-      volumes:
-      - name: tmpdir
-        emptyDir: {{}}
-      - name: initconfdir
-        configMap:
-          name: {spec.name}-initconf
-          defaultMode: 0755
-      - name: routercredentials
-        secret:
-          secretName: {spec.name}-router
-          # the files are created by root but belonging to mysqlrouter group,
-          # thus we need read access for the group
-          defaultMode: 0440
-{utils.indent(spec.extra_router_volumes if router_tls_exists else spec.extra_router_volumes_no_cert, 6)}
-"""
-    deployment = yaml.safe_load(tmpl)
-
-    container = deployment["spec"]["template"]["spec"]["containers"][0]
-
-    container["args"] = router_command
-
-    container["env"].append({
-        "name": "MYSQL_ROUTER_BOOTSTRAP_EXTRA_OPTIONS",
-        "value": router_bootstrap_options
-    })
+    def router_labels(name: str) -> dict:
+        return {
+            "component": "mysqlrouter",
+            "tier": "mysql",
+            "mysql.oracle.com/cluster": spec.name,
+            "app.kubernetes.io/name": name,
+            "app.kubernetes.io/instance": f"mysql-innodbcluster-{spec.name}-router",
+            "app.kubernetes.io/component": "router",
+            "app.kubernetes.io/managed-by": "mysql-operator",
+            "app.kubernetes.io/created-by": "mysql-operator"
+        }
+
+    metadata_labels = router_labels("mysql-innodbcluster")
+    del metadata_labels["component"]
+
+    if router_tls_exists:
+        extra_volume_mounts = spec.extra_router_volume_mounts
+        extra_volumes = spec.extra_router_volumes
+    else:
+        extra_volume_mounts = spec.extra_router_volume_mounts_no_cert
+        extra_volumes = spec.extra_router_volumes_no_cert
+
+    container = {
+        "name": "router",
+        "image": spec.router_image,
+        "imagePullPolicy": spec.router_image_pull_policy,
+        "securityContext": {
+            # These can't go to spec.template.spec.securityContext
+            # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodTemplateSpec / https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSpec
+            # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#PodSecurityContext - for pods (top level)
+            # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#Container
+            # See: https://pkg.go.dev/k8s.io/api@v0.26.1/core/v1#SecurityContext - for containers
+            "allowPrivilegeEscalation": False,
+            "privileged": False,
+            "readOnlyRootFilesystem": True,
+            "capabilities": {"drop": ["ALL"]}
+        },
+        "env": [
+            {"name": "MYSQL_HOST", "value": router_target},
+            {"name": "MYSQL_PORT", "value": "3306"},
+            {"name": "MYSQL_USER_FILE", "value": "/.routeruser"},
+            {"name": "MYSQL_PASSWORD_FILE", "value": "/.routerpw"},
+            {"name": "MYSQL_CREATE_ROUTER_USER", "value": "0"},
+            {"name": "MYSQL_ROUTER_BOOTSTRAP_EXTRA_OPTIONS", "value": router_bootstrap_options}
+        ],
+        "volumeMounts": [
+            {"name": "tmpdir", "mountPath": "/tmp"},
+            {"name": "initconfdir", "subPath": "router-entrypoint-run.sh.tpl", "mountPath": "/run.sh", "readOnly": True},
+            {"name": "routercredentials", "subPath": "routerUsername", "mountPath": "/.routeruser", "readOnly": True},
+            {"name": "routercredentials", "subPath": "routerPassword", "mountPath": "/.routerpw", "readOnly": True},
+            *extra_volume_mounts
+        ],
+        "ports": [
+            {"containerPort": spec.router_rwport, "name": "mysqlrw"},
+            {"containerPort": spec.router_rwxport, "name": "mysqlxrw"},
+            {"containerPort": spec.router_rwsplitport, "name": "mysqlrwsplit"},
+            {"containerPort": spec.router_roport, "name": "mysqlro"},
+            {"containerPort": spec.router_roxport, "name": "mysqlxro"},
+            {"containerPort": spec.router_httpport, "name": "http"}
+        ],
+        "readinessProbe": {
+            "exec": {"command": ["cat", "/tmp/mysqlrouter/mysqlrouter.conf"]}
+        },
+        "livenessProbe": {
+            "failureThreshold": 3,
+            "httpGet": {"path": "/api/20190715/swagger.json", "port": "http", "scheme": "HTTPS"},
+            "periodSeconds": 10,
+            "successThreshold": 1,
+            "timeoutSeconds": 1
+        },
+        "args": router_command
+    }
+
+    deployment = {
+        "apiVersion": "apps/v1",
+        "kind": "Deployment",
+        "metadata": {
+            "name": f"{spec.name}-router",
+            "label": metadata_labels
+        },
+        "spec": {
+            "replicas": (spec.router.instances or 1) if not init_only else 0,
+            "selector": {"matchLabels": router_labels("mysql-router")},
+            "template": {
+                "metadata": {"labels": router_labels("mysql-router")},
+                "spec": {
+                    "serviceAccountName": spec.serviceAccountName,
+                    "securityContext": {"runAsUser": 999, "runAsGroup": 999, "fsGroup": 999, "runAsNonRoot": True},
+                    "containers": [container],
+                    "volumes": [
+                        {"name": "tmpdir", "emptyDir": {}},
+                        {"name": "initconfdir", "configMap": {"name": f"{spec.name}-initconf", "defaultMode": 0o755}},
+                        {
+                            "name": "routercredentials",
+                            "secret": {
+                                "secretName": f"{spec.name}-router",
+                                # the files are created by root but belonging to mysqlrouter group,
+                                # thus we need read access for the group
+                                "defaultMode": 0o440
+                            }
+                        },
+                        *extra_volumes
+                    ]
+                }
+            }
+        }
+    }
 
     metadata = {}
     if spec.router.podAnnotations:
@@ -318,7 +263,7 @@ def patch_metadata(cluster: InnoDBCluster, value: dict, logger: Logger) -> None:
     # if the size is 0 it might not exist. In this case the proper labels and annotations will be set when eventually created
     if deploy:
         patch = {"spec": {"template": { "metadata" : value }}}
-        api_apps.patch_namespaced_deployment(deploy.metadata.name, deploy.metadata.namespace, body=patch)
+        update_deployment_spec(deploy, patch)
 
 
 def get_size(cluster: InnoDBCluster) -> int:
@@ -335,19 +280,20 @@ def update_size(cluster: InnoDBCluster, size: int, return_patch: bool, logger: L
         if size:
             patch = {"spec": {"replicas": size}}
             if return_patch == False:
-              api_apps.patch_namespaced_deployment(
-                  deploy.metadata.name, deploy.metadata.namespace, body=patch)
+              update_deployment_spec(deploy, patch)
         else:
           logger.info(f"Deleting Router Deployment")
           api_apps.delete_namespaced_deployment(f"{cluster.name}-router", cluster.namespace)
+          reconcile_context.refresh("Deployment", cluster.namespace, f"{cluster.name}-router", None)
     else:
         if size:
             logger.info(f"Creating Router Deployment with replicas={size}")
 
             router_deployment = prepare_router_deployment(cluster, logger)
             kopf.adopt(router_deployment)
-            api_apps.create_namespaced_deployment(
+            deploy = api_apps.create_namespaced_deployment(
                 namespace=cluster.namespace, body=router_deployment)
+            reconcile_context.refresh("Deployment", cluster.namespace, f"{cluster.name}-router", deploy)
 
     if return_patch == True:
       return patch
@@ -355,8 +301,9 @@ def update_size(cluster: InnoDBCluster, size: int, return_patch: bool, logger: L
 
 
 def update_deployment_spec(dpl: api_client.V1Deployment, patch: dict) -> None:
-    api_apps.patch_namespaced_deployment(
+    dpl = api_apps.patch_namespaced_deployment(
         dpl.metadata.name, dpl.metadata.namespace, body=patch)
+    reconcile_context.refresh("Deployment", dpl.metadata.namespace, dpl.metadata.name, dpl)
 
 
 def update_router_container_template_property(dpl: api_client.V1Deployment,
@@ -477,7 +424,7 @@ def update_router_account(cluster: InnoDBCluster, on_nonupdated: Optional[Callab
           if pod.deleting:
               continue
           try:
-              with shellutils.DbaWrap(shellutils.connect_dba(pod.endpoint_co, logger, max_tries=3)) as dba:
+              with g_session_pool.dba(pod, logger, retry=True, max_tries=3) as dba:
                   dba.get_cluster().setup_router_account(user, {"update": True})
                   updated = True
                   break
@@ -52,6 +52,8 @@ class K8sInterfaceObject:
     Base class for objects meant to interface with Kubernetes.
     """
 
+    __slots__ = ()
+
     def __init__(self) -> None:
         pass
 
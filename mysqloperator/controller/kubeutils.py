@@ -1,17 +1,21 @@
-# Copyright (c) 2020, 2022, Oracle and/or its affiliates.
+# Copyright (c) 2020, 2024, Oracle and/or its affiliates.
 #
 # Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
 #
 
+import functools
+import json
 import os
 import socket
 import sys
 import time
 from logging import Logger
 
-from typing import Callable, Optional, TypeVar
-from kubernetes.client.rest import ApiException
+from typing import Any, Callable, Optional, Tuple, TypeVar
+from urllib.parse import parse_qs, urlsplit
+from kubernetes.client.rest import ApiException, RESTClientObject
 from kubernetes import client, config
+from . import metrics
 
 try:
     # outside k8s
@@ -24,12 +28,64 @@ except config.config_exception.ConfigException:
         raise Exception(
             "Could not configure kubernetes python client")
 
+
+
+def api_request_labels(method: str, url: str, query_params=None) -> Tuple[str, str]:
+    """
+    Get the verb and the resource (with subresource) of an API server
+    request, e.g. ("list", "pods") or ("patch", "pods/status").
+    """
+    parts = urlsplit(url)
+    path = [p for p in parts.path.split("/") if p]
+    # /api/v1/... or /apis/<group>/<version>/...
+    path = path[2:] if path[:1] == ["api"] else path[3:]
+    if len(path) > 2 and path[0] == "namespaces":
+        path = path[2:]
+
+    query = parse_qs(parts.query)
+    if query_params:
+        query.update({k: [str(v)] for k, v in query_params})
+    watch = query.get("watch", [""])[0].lower() == "true"
+
+    resource = "/".join([path[0]] + path[2:]) if path else ""
+    method = method.upper()
+    if method == "GET":
+        if watch:
+            verb = "watch"
+        else:
+            verb = "list" if len(path) == 1 else "get"
+    else:
+        verb = {"POST": "create", "PUT": "replace", "PATCH": "patch",
+                "DELETE": "delete"}.get(method, method.lower())
+    return verb, resource
+
+
+def _count_api_requests(request: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(request)
+    def wrapper(self, method, url, *args, **kwargs):
+        verb, resource = api_request_labels(method, url, kwargs.get("query_params"))
+        try:
+            resp = request(self, method, url, *args, **kwargs)
+        except ApiException as e:
+            metrics.kubernetes_api_requests.inc(verb, resource, e.status)
+            raise
+        metrics.kubernetes_api_requests.inc(verb, resource, getattr(resp, "status", ""))
+        return resp
+    return wrapper
+
+
+# Count the requests done by all client.*Api objects. Requests done by kopf
+# use its own client and are not counted.
+if not hasattr(RESTClientObject.request, "__wrapped__"):
+    RESTClientObject.request = _count_api_requests(RESTClientObject.request)
+
 api_core: client.CoreV1Api = client.CoreV1Api()
 api_customobj: client.CustomObjectsApi = client.CustomObjectsApi()
 api_apps: client.AppsV1Api = client.AppsV1Api()
 api_batch: client.BatchV1Api = client.BatchV1Api()
 api_cron_job: client.BatchV1Api = client.BatchV1Api()
 api_policy: client.PolicyV1Api = client.PolicyV1Api()
+api_coordination: client.CoordinationV1Api = client.CoordinationV1Api()
 api_rbac: client.RbacAuthorizationV1Api = client.RbacAuthorizationV1Api()
 api_client: client.ApiClient = client.ApiClient()
 api_apis: client.ApisApi() = client.ApisApi()
@@ -46,6 +102,33 @@ def catch_404(f: Callable[..., T]) -> Optional[T]:
         raise
 
 
+def read_json(f: Callable[..., Any], *args, **kwargs) -> dict:
+    """Call a client API method and return the decoded JSON of the response,
+    without deserializing it into model objects. Errors are raised as
+    ApiException, like with the regular call.
+    """
+    resp = f(*args, _preload_content=False, **kwargs)
+    return json.loads(resp.data)
+
+
+def apply_object(api: Any, path: str, path_params: dict, body: dict, response_type: str,
+                 field_manager: str, dry_run: bool = False) -> Any:
+    """Server-side apply of body to the object at path, taking over the
+    fields owned by other managers. The generated patch_*() methods of the
+    pinned client can't set the apply-patch content type, so the request is
+    made through the ApiClient, which serializes the body as JSON (JSON is
+    valid YAML).
+    """
+    query_params = [("fieldManager", field_manager), ("force", True)]
+    if dry_run:
+        query_params.append(("dryRun", "All"))
+    return api.api_client.call_api(
+        path, "PATCH", path_params, query_params,
+        {"Accept": "application/json", "Content-Type": "application/apply-patch+yaml"},
+        body=body, response_type=response_type, auth_settings=["BearerToken"],
+        _return_http_data_only=True)
+
+
 def available_apis():
     return api_apis.get_api_versions()
 
@@ -0,0 +1,97 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+import re
+from typing import Any
+from dateutil.parser import parse as parse_datetime
+from kubernetes.client import models
+from .kubeutils import client as api_client
+
+# older clients use list[T] and dict(str, T), newer ones List[T] and Dict[str, T]
+k_list_type = re.compile(r"[lL]ist\[(.*)\]$")
+k_dict_type = re.compile(r"(?:dict\(|Dict\[)([^,]*), (.*)[)\]]$")
+k_primitive_types = ("str", "int", "float", "bool", "object")
+
+
+def _convert(value: Any, openapi_type: str) -> Any:
+    if value is None or openapi_type in k_primitive_types:
+        return value
+
+    m = k_list_type.match(openapi_type)
+    if m:
+        item_type = m.group(1)
+        if item_type in k_primitive_types:
+            return value
+        return [_convert(v, item_type) for v in value]
+
+    m = k_dict_type.match(openapi_type)
+    if m:
+        value_type = m.group(2)
+        if value_type in k_primitive_types:
+            return value
+        return {k: _convert(v, value_type) for k, v in value.items()}
+
+    if openapi_type == "datetime":
+        return parse_datetime(value)
+    if openapi_type == "date":
+        return parse_datetime(value).date()
+
+    return ModelView(value, getattr(models, openapi_type))
+
+
+class ModelView:
+    """
+    Read-only view of the JSON of a Kubernetes object, with the attributes of
+    the corresponding kubernetes.client model (e.g. metadata.owner_references
+    for metadata.ownerReferences). Nested objects are wrapped when accessed,
+    so that only what is used gets converted.
+
+    Views are meant for objects that are only read. Objects that are patched
+    or checked with isinstance() must be read with the regular client calls.
+    """
+
+    __slots__ = ("_data", "_model")
+
+    def __init__(self, data: dict, model: type) -> None:
+        self._data = data
+        self._model = model
+
+    def __getattr__(self, name: str) -> Any:
+        # slots are resolved before __getattr__ is called, anything private
+        # that gets here is missing (e.g. while copying)
+        if name.startswith("_"):
+            raise AttributeError(name)
+        key = self._model.attribute_map.get(name)
+        if key is None:
+            raise AttributeError(f"'{self._model.__name__}' view has no attribute '{name}'")
+        return _convert(self._data.get(key), self._model.openapi_types[name])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ModelView):
+            return NotImplemented
+        return self._model is other._model and self._data == other._data
+
+    def __repr__(self) -> str:
+        return f"<{self._model.__name__} view {self._data}>"
+
+    @property
+    def raw(self) -> dict:
+        """The JSON object, with the field names used by the API server."""
+        return self._data
+
+
+class PodView(ModelView):
+    __slots__ = ()
+
+    def __init__(self, data: dict) -> None:
+        super().__init__(data, api_client.V1Pod)
+
+
+class StatefulSetView(ModelView):
+    __slots__ = ()
+
+    def __init__(self, data: dict) -> None:
+        super().__init__(data, api_client.V1StatefulSet)
+
@@ -0,0 +1,350 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import functools
+import inspect
+import threading
+import time
+
+# Operator metrics, in the Prometheus text exposition format. Only what the
+# operator needs is implemented: counters, gauges and histograms with labels.
+
+k_default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.metrics: Dict[str, 'Metric'] = {}
+        # called before rendering, to update gauges of values sampled on demand
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: 'Metric') -> None:
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self.metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        with self.lock:
+            self.collectors.append(collector)
+
+    def render(self) -> str:
+        with self.lock:
+            metrics = list(self.metrics.values())
+            collectors = list(self.collectors)
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrics: Error collecting metrics: {e}")
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, names, values, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+g_registry = Registry()
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = g_registry) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values: Dict[Tuple[str, ...], object] = {}
+        if registry:
+            registry.register(self)
+
+    def _key(self, labelvalues: Sequence[object]) -> Tuple[str, ...]:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labelvalues}")
+        return tuple(str(v) for v in labelvalues)
+
+    def remove(self, *labelvalues: object) -> None:
+        with self.lock:
+            self.values.pop(self._key(labelvalues), None)
+
+    def remove_matching(self, **labels: str) -> None:
+        """Remove the series whose labels include the given ones."""
+        positions = [(self.labelnames.index(n), v) for n, v in labels.items()]
+        with self.lock:
+            for key in [k for k in self.values if all(k[i] == v for i, v in positions)]:
+                del self.values[key]
+
+    def samples(self) -> List[Tuple[str, Sequence[str], Sequence[str], float]]:
+        with self.lock:
+            return [("", self.labelnames, key, value) for key, value in sorted(self.values.items())]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labelvalues: object, amount: float = 1) -> None:
+        key = self._key(labelvalues)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, *labelvalues: object) -> float:
+        with self.lock:
+            return self.values.get(self._key(labelvalues), 0)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, *labelvalues: object, value: float) -> None:
+        key = self._key(labelvalues)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, *labelvalues: object, amount: float = 1) -> None:
+        key = self._key(labelvalues)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, *labelvalues: object, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def get(self, *labelvalues: object) -> Optional[float]:
+        with self.lock:
+            return self.values.get(self._key(labelvalues))
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = k_default_buckets,
+                 registry: Optional[Registry] = g_registry) -> None:
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, *labelvalues: object, value: float) -> None:
+        key = self._key(labelvalues)
+        with self.lock:
+            counts, total = self.values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self.values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, *labelvalues: object) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(*labelvalues, value=time.monotonic() - start)
+
+    def get_count(self, *labelvalues: object) -> int:
+        with self.lock:
+            value = self.values.get(self._key(labelvalues))
+            return sum(value[0]) if value else 0
+
+    def samples(self) -> List[Tuple[str, Sequence[str], Sequence[str], float]]:
+        names = self.labelnames + ("le",)
+        samples = []
+        with self.lock:
+            for key, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    samples.append(("_bucket", names, key + (_format_value(float(bound)),), cumulative))
+                samples.append(("_sum", self.labelnames, key, total))
+                samples.append(("_count", self.labelnames, key, cumulative))
+        return samples
+
+
+class MetricsServer(threading.Thread):
+    """
+    Serves the metrics of a registry at /metrics over HTTP.
+    """
+
+    def __init__(self, port: int, registry: Registry = g_registry) -> None:
+        super().__init__(daemon=True, name="metrics-server")
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("", port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def run(self) -> None:
+        self.server.serve_forever()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def timed_handler(name: Optional[str] = None) -> Callable:
+    """
+    Decorator recording the duration and the errors of a handler. It keeps
+    the name of the function, so that kopf handler ids don't change.
+    """
+    def decorator(f: Callable) -> Callable:
+        handler = name or f.__name__
+
+        if inspect.iscoroutinefunction(f):
+            @functools.wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                start = time.monotonic()
+                try:
+                    return await f(*args, **kwargs)
+                except Exception:
+                    handler_errors.inc(handler)
+                    raise
+                finally:
+                    handler_duration.observe(handler, value=time.monotonic() - start)
+            return async_wrapper
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            start = time.monotonic()
+            try:
+                return f(*args, **kwargs)
+            except Exception:
+                handler_errors.inc(handler)
+                raise
+            finally:
+                handler_duration.observe(handler, value=time.monotonic() - start)
+        return wrapper
+    return decorator
+
+
+# Handlers
+handler_duration = Histogram(
+    "mysql_operator_handler_duration_seconds",
+    "Duration of the operator handlers", ("handler",))
+handler_errors = Counter(
+    "mysql_operator_handler_errors_total",
+    "Operator handlers that raised an error (including retries requested from kopf)", ("handler",))
+cluster_mutex_wait = Histogram(
+    "mysql_operator_cluster_mutex_wait_seconds",
+    "Time handlers waited for their turn to work on a cluster")
+cluster_mutex_busy = Counter(
+    "mysql_operator_cluster_mutex_busy_total",
+    "Handlers that gave up waiting for their turn to work on a cluster and were retried later")
+diagnose_cluster_duration = Histogram(
+    "mysql_operator_diagnose_cluster_duration_seconds",
+    "Duration of the diagnosis of a cluster")
+handler_executor_workers = Gauge(
+    "mysql_operator_handler_executor_workers",
+    "Number of threads of the pools running the handlers", ("pool",))
+handler_executor_active = Gauge(
+    "mysql_operator_handler_executor_active",
+    "Handlers running in a pool", ("pool",))
+handler_executor_queued = Gauge(
+    "mysql_operator_handler_executor_queued",
+    "Handlers waiting for a thread of a pool", ("pool",))
+handler_executor_wait = Histogram(
+    "mysql_operator_handler_executor_wait_seconds",
+    "Time handlers waited for a thread of a pool", ("pool",))
+api_command_duration = Histogram(
+    "mysql_operator_api_command_duration_seconds",
+    "Duration of the ConfigMap commands submitted for a spec change, by command type", ("command",))
+diagnose_instances = Counter(
+    "mysql_operator_diagnose_instances_total",
+    "Instances diagnosed, by mode (fast from performance_schema, full with the AdminAPI status)", ("mode",))
+parsed_spec_cache = Counter(
+    "mysql_operator_parsed_spec_cache_total",
+    "InnoDBCluster specs reused from (hit) or not found in (miss) the parsed spec cache", ("result",))
+diagnose_cache = Counter(
+    "mysql_operator_diagnose_cache_total",
+    "Cluster diagnoses reused from (hit) or not found in (miss) the diagnosis cache", ("result",))
+
+# Kubernetes API server and MySQL
+kubernetes_api_requests = Counter(
+    "mysql_operator_kubernetes_api_requests_total",
+    "Requests to the Kubernetes API server", ("verb", "resource", "code"))
+mysql_connect_duration = Histogram(
+    "mysql_operator_mysql_connect_duration_seconds",
+    "Time to connect to a MySQL instance, by role of the instance (primary, secondary, unknown)", ("role",))
+mysql_query_duration = Histogram(
+    "mysql_operator_mysql_query_duration_seconds",
+    "Duration of the queries run by the operator, by role of the instance (primary, secondary, unknown)", ("role",))
+retries = Counter(
+    "mysql_operator_retries_total",
+    "Retries done by RetryLoop, by retried function", ("function",))
+session_pool_overflow = Counter(
+    "mysql_operator_session_pool_overflow_total",
+    "Sessions opened past the per target limit of the session pool, by role of the instance", ("role",))
+
+# GroupMonitor
+group_monitor_connects = Counter(
+    "mysql_operator_group_monitor_connects_total",
+    "(Re)connection attempts of the group monitor to clusters", ("result",))
+group_monitor_handler_lag = Histogram(
+    "mysql_operator_group_monitor_handler_lag_seconds",
+    "Time between a group view change notice and the start of its handler")
+group_monitor_queue_depth = Gauge(
+    "mysql_operator_group_monitor_queue_depth",
+    "View changes waiting for their handler", ("shard",))
+group_monitor_connected_clusters = Gauge(
+    "mysql_operator_group_monitor_connected_clusters",
+    "Monitored clusters with a connected session", ("shard",))
+
+# Cluster status probes
+cluster_last_probe_time = Gauge(
+    "mysql_operator_cluster_last_probe_timestamp_seconds",
+    "Time of the last status probe of the cluster", ("namespace", "cluster"))
+cluster_online_instances = Gauge(
+    "mysql_operator_cluster_online_instances",
+    "Number of ONLINE instances found by the last status probe", ("namespace", "cluster"))
+cluster_status = Gauge(
+    "mysql_operator_cluster_status",
+    "Status found by the last probe of the cluster, the series of the current status is 1",
+    ("namespace", "cluster", "status"))
+cluster_status_writes = Counter(
+    "mysql_operator_cluster_status_writes_total",
+    "Probe results written to (changed, heartbeat) or skipped for (unchanged) status.cluster",
+    ("result",))
@@ -6,14 +6,23 @@
 from pathlib import Path
 
 from logging import Logger
+from typing import Optional
+import threading
 from .innodbcluster import cluster_api
 
-from . import config, utils
+from . import config, utils, metrics, sharding, executors
 from .group_monitor import g_group_monitor
+from .innodbcluster.pod_cache import g_pod_cache
+from .secret_cache import g_secret_cache
 import kopf
 import logging
+import os
 
 
+g_metrics_server: Optional[metrics.MetricsServer] = None
+
+k_cache_sync_timeout = 30
+
 # These have to be imported so that kopf sees the annotations in those files
 from .innodbcluster import operator_cluster
 from .backup import operator_backup
@@ -39,16 +48,45 @@ def on_startup(settings: kopf.OperatorSettings, logger: Logger, *args, **_):
     #     name='operator.mysql.oracle.com/last-handled-configuration'
     # )
 
-    clusters = cluster_api.get_all_clusters()
-    operator_cluster.ensure_backup_schedules_use_current_image(clusters, logger)
-    operator_cluster.monitor_existing_clusters(clusters, logger)
-    operator_cluster.ensure_router_accounts_are_uptodate(clusters, logger)
+    global g_metrics_server
+    if config.METRICS_PORT:
+        g_metrics_server = metrics.MetricsServer(config.METRICS_PORT)
+        g_metrics_server.start()
+        logger.info(f"Serving metrics on port {g_metrics_server.port}")
+
+    g_pod_cache.start()
+    g_secret_cache.start()
 
     g_group_monitor.start()
 
+    if config.SHARDING:
+        coordinator = sharding.start(os.getenv("HOSTNAME", "mysql-operator"), sharding.operator_namespace(),
+                                     k_cache_sync_timeout, operator_cluster.on_shards_rebalanced)
+        logger.info(f"Sharding enabled: identity={coordinator.identity} members={coordinator.members}")
+
+    # The housekeeping of existing clusters is done in the background, so
+    # that kopf starts watching (and we report being ready) right away
+    clusters = [cluster for cluster in cluster_api.get_all_clusters()
+                if sharding.owns_cluster(cluster.namespace, cluster.name)]
+    logger.info(f"Starting housekeeping of {len(clusters)} existing clusters")
+    threading.Thread(target=operator_cluster.run_startup_housekeeping,
+                     args=(clusters, logger), daemon=True,
+                     name="startup-housekeeping").start()
+
+    if not g_pod_cache.wait_synced(k_cache_sync_timeout):
+        logger.warning(f"Pod cache not synced after {k_cache_sync_timeout}s, pods will be read from the API server until it is")
+
     Path('/tmp/mysql-operator-ready').touch()
 
 
 @kopf.on.cleanup()  # type: ignore
 def on_shutdown(logger: Logger, *args, **kwargs):
     g_group_monitor.stop()
+    operator_cluster.g_pod_event_retries.stop()
+    g_pod_cache.stop()
+    g_secret_cache.stop()
+    if g_metrics_server:
+        g_metrics_server.stop()
+    if sharding.g_shard_coordinator:
+        sharding.g_shard_coordinator.stop()
+    executors.shutdown()
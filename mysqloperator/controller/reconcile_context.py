@@ -0,0 +1,88 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+import contextvars
+import copy
+import threading
+
+T = TypeVar("T")
+
+
+class ReconcileContext:
+    """
+    Memoizes the Kubernetes objects read while handling one event, so that
+    the handler and everything it calls read each object only once. Not
+    found objects are memoized as None. The objects are copied in and out,
+    as the callers modify them to build their patches.
+
+    Writes must refresh (or forget) the objects they change, so that the
+    rest of the handler sees them.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.objects: Dict[Tuple[str, str, str], Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, kind: str, namespace: str, name: str, read: Callable[[], T]) -> T:
+        key = (kind, namespace, name)
+        with self.lock:
+            if key in self.objects:
+                self.hits += 1
+                return copy.deepcopy(self.objects[key])
+            self.misses += 1
+        obj = read()
+        with self.lock:
+            self.objects[key] = copy.deepcopy(obj)
+        return obj
+
+    def refresh(self, kind: str, namespace: str, name: str, obj: Any) -> None:
+        with self.lock:
+            self.objects[(kind, namespace, name)] = copy.deepcopy(obj)
+
+    def forget(self, kind: str, namespace: str, name: str) -> None:
+        with self.lock:
+            self.objects.pop((kind, namespace, name), None)
+
+
+g_reconcile_context: contextvars.ContextVar[Optional[ReconcileContext]] = \
+    contextvars.ContextVar("reconcile_context", default=None)
+
+
+@contextmanager
+def reconcile() -> Iterator[ReconcileContext]:
+    """
+    Memoize the reads done in the block. The context is a contextvar, so
+    threads running code of the block need a copy of the current context
+    (contextvars.copy_context().run) to use it.
+    """
+    context = ReconcileContext()
+    token = g_reconcile_context.set(context)
+    try:
+        yield context
+    finally:
+        g_reconcile_context.reset(token)
+
+
+def memoized(kind: str, namespace: str, name: str, read: Callable[[], T]) -> T:
+    context = g_reconcile_context.get()
+    if context is None:
+        return read()
+    return context.get(kind, namespace, name, read)
+
+
+def refresh(kind: str, namespace: str, name: str, obj: Any) -> None:
+    context = g_reconcile_context.get()
+    if context is not None:
+        context.refresh(kind, namespace, name, obj)
+
+
+def forget(kind: str, namespace: str, name: str) -> None:
+    context = g_reconcile_context.get()
+    if context is not None:
+        context.forget(kind, namespace, name)
@@ -0,0 +1,182 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from typing import Dict, Optional, Tuple, cast
+from cryptography import x509
+from kubernetes import watch
+from .kubeutils import api_core, ApiException
+from .kubeutils import client as api_client
+from . import utils
+import threading
+import time
+
+k_watch_timeout = 300
+k_rewatch_retry_interval = 5
+
+
+class CachedSecret:
+    """
+    A Secret as of one resourceVersion, with its values decoded once and
+    certificates parsed on first use.
+    """
+
+    def __init__(self, secret: api_client.V1Secret) -> None:
+        self.secret = secret
+        self.resource_version: str = secret.metadata.resource_version
+        self.data: Dict[str, str] = {k: utils.b64decode(v) for k, v in (secret.data or {}).items()}
+        self._certificates: Dict[str, x509.Certificate] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.data
+
+    def __getitem__(self, key: str) -> str:
+        return self.data[key]
+
+    def certificate(self, key: str) -> x509.Certificate:
+        cert = self._certificates.get(key)
+        if cert is None:
+            cert = x509.load_pem_x509_certificate(self.data[key].encode('ascii'))
+            self._certificates[key] = cert
+        return cert
+
+
+class SecretWatch(threading.Thread):
+    """
+    LIST and WATCH of a single Secret, with a field selector on its name, so
+    that no other Secret is ever sent to the operator. The Secret is live in
+    the cache once the LIST was loaded, until the WATCH fails.
+    """
+
+    def __init__(self, cache: 'SecretCache', ns: str, name: str) -> None:
+        super().__init__(daemon=True, name=f"secret-watch-{ns}/{name}")
+        self.cache = cache
+        self.key = (ns, name)
+        self.resource_version: Optional[str] = None
+        self.watch: Optional[watch.Watch] = None
+        self.stopped = False
+
+    @property
+    def field_selector(self) -> str:
+        return f"metadata.name={self.key[1]}"
+
+    def stop(self) -> None:
+        self.stopped = True
+        if self.watch:
+            self.watch.stop()
+
+    def load(self) -> None:
+        objects = cast(api_client.V1SecretList,
+                       api_core.list_namespaced_secret(self.key[0], field_selector=self.field_selector))
+        self.resource_version = objects.metadata.resource_version
+        self.cache._loaded(self, objects.items[0] if objects.items else None)
+
+    def handle(self, event: dict) -> None:
+        if event["type"] == "ERROR":
+            raw = event.get("raw_object") or {}
+            raise ApiException(status=raw.get("code"), reason=raw.get("message"))
+
+        secret = cast(api_client.V1Secret, event["object"])
+        self.resource_version = secret.metadata.resource_version
+        self.cache._loaded(self, None if event["type"] == "DELETED" else secret)
+
+    def _watch(self) -> None:
+        if not self.resource_version:
+            self.load()
+
+        self.watch = watch.Watch()
+        for event in self.watch.stream(api_core.list_namespaced_secret, self.key[0],
+                                       field_selector=self.field_selector,
+                                       resource_version=self.resource_version,
+                                       timeout_seconds=k_watch_timeout):
+            if self.stopped:
+                break
+            self.handle(event)
+
+    def run(self) -> None:
+        while not self.stopped:
+            try:
+                self._watch()
+            except Exception as e:
+                if self.stopped:
+                    break
+                # we may have missed changes, so start over with a new LIST
+                self.cache._unloaded(self)
+                self.resource_version = None
+                if not isinstance(e, ApiException) or e.status != 410:
+                    print(f"SecretCache: Watch of {self.key[0]}/{self.key[1]} failed, retrying in {k_rewatch_retry_interval}s: {e}")
+                    time.sleep(k_rewatch_retry_interval)
+
+
+class SecretCache:
+    """
+    Read-through cache of the Secrets used by the operator (accounts,
+    private secrets, CA and TLS). The first read of a Secret starts a
+    SecretWatch for it, so only the Secrets referenced by the clusters are
+    watched and kept, and reads go to the API server until its LIST is
+    loaded. Secrets that don't exist are cached as such, reads of them raise
+    a 404 like read_namespaced_secret(). Nothing is watched before start(),
+    e.g. in the sidecar.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # None for Secrets which don't exist
+        self.secrets: Dict[Tuple[str, str], Optional[CachedSecret]] = {}
+        self.watches: Dict[Tuple[str, str], SecretWatch] = {}
+        self.started = False
+
+    def start(self) -> None:
+        self.started = True
+
+    def stop(self) -> None:
+        with self.lock:
+            self.started = False
+            watches = list(self.watches.values())
+            self.watches = {}
+            self.secrets = {}
+        for w in watches:
+            w.stop()
+
+    def get(self, ns: str, name: str) -> CachedSecret:
+        """
+        Raises ApiException like read_namespaced_secret() if the Secret can't
+        be read.
+        """
+        key = (ns, name)
+        with self.lock:
+            if key in self.secrets:
+                cached = self.secrets[key]
+                if cached is None:
+                    raise ApiException(status=404, reason="Not Found")
+                return cached
+            if self.started and key not in self.watches:
+                self.watches[key] = SecretWatch(self, ns, name)
+                self.watches[key].start()
+
+        return CachedSecret(cast(api_client.V1Secret, api_core.read_namespaced_secret(name, ns)))
+
+    def invalidate(self, ns: str, name: str) -> None:
+        """
+        Stop watching the Secret, e.g. once its cluster is deleted. It's
+        watched again with the next read.
+        """
+        with self.lock:
+            self.secrets.pop((ns, name), None)
+            w = self.watches.pop((ns, name), None)
+        if w:
+            w.stop()
+
+    def _loaded(self, w: SecretWatch, secret: Optional[api_client.V1Secret]) -> None:
+        with self.lock:
+            if self.watches.get(w.key) is w:
+                self.secrets[w.key] = CachedSecret(secret) if secret else None
+
+    def _unloaded(self, w: SecretWatch) -> None:
+        with self.lock:
+            if self.watches.get(w.key) is w:
+                self.secrets.pop(w.key, None)
+
+
+g_secret_cache = SecretCache()
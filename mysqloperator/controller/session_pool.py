@@ -0,0 +1,203 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from contextlib import contextmanager
+from logging import Logger
+from typing import Dict, Iterator, List, Optional, Set, Tuple, TYPE_CHECKING
+from .innodbcluster.cluster_api import MySQLPod
+from . import config, metrics, shellutils
+import threading
+import time
+import mysqlsh
+if TYPE_CHECKING:
+    from mysqlsh import Dba
+
+# (cluster namespace/name, pod endpoint, account user)
+SessionPoolKey = Tuple[str, str, str]
+
+
+class PooledDba:
+    def __init__(self, dba: 'Dba', pod_ip: Optional[str]):
+        self.dba = dba
+        self.pod_ip = pod_ip
+        self.created = time.time()
+        self.last_used = self.created
+
+    def close(self) -> None:
+        try:
+            self.dba.session.close()
+        except mysqlsh.Error:
+            pass
+
+
+class SessionPool:
+    """
+    Process wide pool of Dba objects (admin sessions) to cluster members.
+
+    Idle sessions are health checked before being handed out and closed
+    after config.SESSION_POOL_IDLE_TIMEOUT seconds. At most
+    config.SESSION_POOL_MAX_PER_TARGET sessions are kept open per target.
+    The limit is soft: a caller that waited config.SESSION_POOL_ACQUIRE_TIMEOUT
+    seconds for a session gets an extra one, counted in
+    metrics.session_pool_overflow, and the sessions past the limit are
+    closed when released.
+    Sessions are dropped when the pod IP address changes or when the
+    cluster is deleted.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Condition()
+        self.idle: Dict[SessionPoolKey, List[PooledDba]] = {}
+        self.in_use: Dict[SessionPoolKey, int] = {}
+        self.lent: Set[Tuple[SessionPoolKey, PooledDba]] = set()
+        # time of the last invalidation of a cluster or of a member endpoint,
+        # kept while sessions opened before it are still around
+        self.invalidated: Dict[str, float] = {}
+
+    @staticmethod
+    def key(pod: MySQLPod) -> SessionPoolKey:
+        return (f"{pod.namespace}/{pod.cluster_name}", pod.endpoint, pod.endpoint_co["user"])
+
+    def acquire(self, pod: MySQLPod, logger: Logger,
+                retry: bool = False, **kwargs) -> Tuple[SessionPoolKey, PooledDba]:
+        """
+        With retry, opening a new session is retried in a
+        shellutils.RetryLoop(logger, **kwargs). Otherwise it is tried once.
+        """
+        key = self.key(pod)
+        pod_ip = pod.pod_ip_address
+        stale = []
+        entry = None
+        with self.lock:
+            self._evict_idle(stale)
+            deadline = time.time() + config.SESSION_POOL_ACQUIRE_TIMEOUT
+            while True:
+                idle = self.idle.get(key, [])
+                while idle:
+                    candidate = idle.pop()
+                    if candidate.pod_ip != pod_ip:
+                        # the pod was recreated, the session is to the old one
+                        stale.append(candidate)
+                    else:
+                        entry = candidate
+                        break
+                if entry or len(idle) + self.in_use.get(key, 0) < config.SESSION_POOL_MAX_PER_TARGET:
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    logger.warning(f"Session pool limit for {pod.endpoint} reached, opening an extra session")
+                    metrics.session_pool_overflow.inc(shellutils.target_role(pod))
+                    break
+                self.lock.wait(remaining)
+            self.in_use[key] = self.in_use.get(key, 0) + 1
+
+        for s in stale:
+            s.close()
+
+        try:
+            if entry and time.time() - entry.last_used > config.SESSION_POOL_HEALTH_CHECK_INTERVAL:
+                try:
+                    with metrics.mysql_query_duration.time(shellutils.target_role(pod)):
+                        entry.dba.session.run_sql("select 1")
+                except mysqlsh.Error as e:
+                    logger.debug(f"Pooled session to {pod.endpoint} is gone: {e}")
+                    entry.close()
+                    entry = None
+
+            if not entry:
+                def connect(target: dict) -> 'Dba':
+                    with metrics.mysql_connect_duration.time(shellutils.target_role(pod)):
+                        return mysqlsh.connect_dba(target)
+
+                if retry:
+                    entry = PooledDba(shellutils.RetryLoop(logger, **kwargs).call(connect, pod.endpoint_co), pod_ip)
+                else:
+                    entry = PooledDba(connect(pod.endpoint_co), pod_ip)
+        except:
+            self._done(key)
+            raise
+
+        with self.lock:
+            self.lent.add((key, entry))
+        return key, entry
+
+    def release(self, key: SessionPoolKey, entry: PooledDba, reuse: bool = True) -> None:
+        close = not reuse
+        with self.lock:
+            self.in_use[key] -= 1
+            if not self.in_use[key]:
+                del self.in_use[key]
+            self.lent.discard((key, entry))
+            idle = self.idle.setdefault(key, [])
+            if entry.created <= max(self.invalidated.get(key[0], 0), self.invalidated.get(key[1], 0)):
+                close = True
+            elif reuse and len(idle) + self.in_use.get(key, 0) < config.SESSION_POOL_MAX_PER_TARGET:
+                entry.last_used = time.time()
+                idle.append(entry)
+            else:
+                close = True
+            if not idle:
+                del self.idle[key]
+            self._prune_invalidated()
+            self.lock.notify_all()
+        if close:
+            entry.close()
+
+    def _done(self, key: SessionPoolKey) -> None:
+        with self.lock:
+            self.in_use[key] -= 1
+            if not self.in_use[key]:
+                del self.in_use[key]
+            self.lock.notify_all()
+
+    def _evict_idle(self, evicted: List[PooledDba]) -> None:
+        limit = time.time() - config.SESSION_POOL_IDLE_TIMEOUT
+        for key in list(self.idle.keys()):
+            keep = []
+            for entry in self.idle[key]:
+                (keep if entry.last_used >= limit else evicted).append(entry)
+            if keep:
+                self.idle[key] = keep
+            else:
+                del self.idle[key]
+
+    def _prune_invalidated(self) -> None:
+        sessions = list(self.lent) + [(key, entry) for key, idle in self.idle.items() for entry in idle]
+        for target, invalidated in list(self.invalidated.items()):
+            if not any(entry.created <= invalidated and target in key[:2] for key, entry in sessions):
+                del self.invalidated[target]
+
+    def invalidate(self, namespace: str, cluster_name: str,
+                   endpoint: Optional[str] = None) -> None:
+        """
+        Close the idle sessions to a cluster or to one of its members.
+        Sessions in use are closed when released.
+        """
+        evicted = []
+        with self.lock:
+            self.invalidated[endpoint or f"{namespace}/{cluster_name}"] = time.time()
+            for key in list(self.idle.keys()):
+                if key[0] == f"{namespace}/{cluster_name}" and (endpoint is None or key[1] == endpoint):
+                    evicted += self.idle.pop(key)
+            self._prune_invalidated()
+        for entry in evicted:
+            entry.close()
+
+    @contextmanager
+    def dba(self, pod: MySQLPod, logger: Logger, retry: bool = False, **kwargs) -> Iterator['Dba']:
+        """
+        Borrow a Dba object connected to the pod. The session is returned to
+        the pool unless an exception escapes the block.
+        """
+        key, entry = self.acquire(pod, logger, retry, **kwargs)
+        reuse = False
+        try:
+            yield entry.dba
+            reuse = True
+        finally:
+            self.release(key, entry, reuse)
+
+
+g_session_pool = SessionPool()
@@ -0,0 +1,240 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from typing import Callable, Dict, List, Optional, Tuple
+from .kubeutils import api_coordination, ApiException
+from . import config
+import datetime
+import hashlib
+import json
+import kopf
+import os
+import threading
+import time
+
+k_member_label = "mysql.oracle.com/operator-shard-member"
+k_members_annotation = "mysql.oracle.com/operator-shard-members"
+k_lease_prefix = "mysql-operator-shard-"
+
+# How long the handlers of a replica wait for the owner of the object
+k_not_owned_retry_delay = 5
+
+# (old members, new members), called whenever the clusters owned by the
+# replica may have changed, also when only another replica released some
+RebalanceListener = Callable[[List[str], List[str]], None]
+
+
+def shard_owner(members: List[str], namespace: str, cluster_name: str) -> Optional[str]:
+    """
+    Rendezvous hashing of a cluster to one of the members. When a member
+    leaves, only the clusters it owned move, each to the member with the
+    next highest weight.
+    """
+    def weight(member: str) -> int:
+        return int.from_bytes(hashlib.sha256(f"{member}/{namespace}/{cluster_name}".encode()).digest()[:8], "big")
+
+    return max(members, key=weight, default=None)
+
+
+class ShardCoordinator(threading.Thread):
+    """
+    Splits the InnoDBClusters between the active operator replicas. Each
+    replica holds a Lease named after it, which it renews every third of the
+    lease duration. The members are the replicas with an unexpired Lease,
+    and a cluster (with its pods, routers and backups) is handled by the
+    member chosen by shard_owner().
+
+    Every replica publishes the members it currently acts on in its Lease.
+    A cluster is handed over explicitly: the new owner only acts on it once
+    the previous owner published members that move the cluster away from
+    it. When a replica stops renewing its Lease, the others take over its
+    clusters once the Lease expired. Like the leader election of client-go,
+    a Lease is expired when its renewTime did not change for the lease
+    duration, measured with the local monotonic clock, so the clocks of the
+    nodes don't need to be in sync. A replica that couldn't renew its Lease
+    for the lease duration stops acting by itself before that.
+    """
+
+    def __init__(self, identity: str, namespace: str,
+                 lease_duration: int = config.SHARDING_LEASE_DURATION) -> None:
+        super().__init__(daemon=True, name="shard-coordinator")
+        self.identity = identity
+        self.namespace = namespace
+        self.lease_duration = lease_duration
+        self.lock = threading.Lock()
+        self.members: List[str] = []
+        # the members each of the other members acts on, from their Leases
+        self.member_views: Dict[str, List[str]] = {}
+        # holder -> (renewTime, when it was seen changing, monotonic)
+        self.observed_renewals: Dict[str, Tuple[datetime.datetime, float]] = {}
+        self.last_renew = 0.0
+        self.listeners: List[RebalanceListener] = []
+        self.synced = threading.Event()
+        self.stopped = threading.Event()
+
+    @property
+    def lease_name(self) -> str:
+        return k_lease_prefix + self.identity
+
+    def add_listener(self, listener: RebalanceListener) -> None:
+        self.listeners.append(listener)
+
+    def owns(self, namespace: str, cluster_name: str) -> bool:
+        with self.lock:
+            # if we couldn't renew our Lease, the others may have taken over
+            if time.monotonic() - self.last_renew > self.lease_duration:
+                return False
+            if shard_owner(self.members, namespace, cluster_name) != self.identity:
+                return False
+            # wait until the previous owner released it
+            for member in self.members:
+                if member != self.identity and \
+                        shard_owner(self.member_views.get(member, []), namespace, cluster_name) == member:
+                    return False
+            return True
+
+    def renew(self) -> None:
+        # MicroTime, which needs the fraction of seconds
+        now = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+        with self.lock:
+            members = list(self.members)
+        lease = {
+            "apiVersion": "coordination.k8s.io/v1",
+            "kind": "Lease",
+            "metadata": {
+                "name": self.lease_name,
+                "namespace": self.namespace,
+                "labels": {k_member_label: "true"},
+                "annotations": {k_members_annotation: json.dumps(members)}
+            },
+            "spec": {
+                "holderIdentity": self.identity,
+                "leaseDurationSeconds": self.lease_duration,
+                "renewTime": now
+            }
+        }
+        try:
+            api_coordination.patch_namespaced_lease(self.lease_name, self.namespace, lease)
+        except ApiException as e:
+            if e.status != 404:
+                raise
+            lease["spec"]["acquireTime"] = now
+            api_coordination.create_namespaced_lease(self.namespace, lease)
+        with self.lock:
+            self.last_renew = time.monotonic()
+
+    def refresh_members(self) -> bool:
+        """
+        Reads the Leases of the replicas, returns whether our members changed.
+        """
+        leases = api_coordination.list_namespaced_lease(self.namespace, label_selector=f"{k_member_label}=true")
+        now = time.monotonic()
+        members = []
+        views = {}
+        observed = {}
+        for lease in leases.items:
+            spec = lease.spec
+            if not spec or not spec.holder_identity or not spec.renew_time:
+                continue
+            holder = spec.holder_identity
+            renew_time, seen = self.observed_renewals.get(holder, (None, now))
+            if renew_time != spec.renew_time:
+                seen = now
+            observed[holder] = (spec.renew_time, seen)
+
+            duration = spec.lease_duration_seconds or self.lease_duration
+            if holder == self.identity or now - seen < duration:
+                members.append(holder)
+                try:
+                    views[holder] = json.loads((lease.metadata.annotations or {}).get(k_members_annotation, "[]"))
+                except ValueError:
+                    views[holder] = []
+        members.sort()
+        self.observed_renewals = observed
+
+        with self.lock:
+            old_members = self.members
+            old_views = self.member_views
+            self.members = members
+            self.member_views = views
+        if members != old_members:
+            print(f"ShardCoordinator: Members changed from {old_members} to {members}")
+        if members != old_members or views != old_views:
+            for listener in self.listeners:
+                try:
+                    listener(old_members, members)
+                except Exception as e:
+                    print(f"ShardCoordinator: Error handling rebalance: {e}")
+        return members != old_members
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                self.renew()
+                if self.refresh_members():
+                    # publish right away which clusters we released
+                    self.renew()
+                self.synced.set()
+            except Exception as e:
+                print(f"ShardCoordinator: Error renewing Lease {self.namespace}/{self.lease_name}: {e}")
+            self.stopped.wait(self.lease_duration / 3)
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.join(timeout=5)
+        # let the other replicas take over right away
+        try:
+            api_coordination.delete_namespaced_lease(self.lease_name, self.namespace)
+        except ApiException as e:
+            print(f"ShardCoordinator: Could not delete Lease {self.namespace}/{self.lease_name}: {e}")
+
+
+g_shard_coordinator: Optional[ShardCoordinator] = None
+
+
+def operator_namespace() -> str:
+    try:
+        with open("/var/run/secrets/kubernetes.io/serviceaccount/namespace") as f:
+            return f.read().strip()
+    except OSError:
+        return os.getenv("MYSQL_OPERATOR_NAMESPACE", default="mysql-operator")
+
+
+def start(identity: str, namespace: str, timeout: float,
+          on_rebalance: Optional[RebalanceListener] = None) -> ShardCoordinator:
+    global g_shard_coordinator
+    g_shard_coordinator = ShardCoordinator(identity, namespace)
+    if on_rebalance:
+        g_shard_coordinator.add_listener(on_rebalance)
+    g_shard_coordinator.start()
+    if not g_shard_coordinator.synced.wait(timeout):
+        print(f"ShardCoordinator: No Lease after {timeout}s, not handling any cluster until there is one")
+    return g_shard_coordinator
+
+
+def owns_cluster(namespace: str, cluster_name: str) -> bool:
+    if not g_shard_coordinator:
+        return True
+    return g_shard_coordinator.owns(namespace, cluster_name)
+
+
+# Filter for the kopf event handlers, which pass everything as keyword arguments
+
+def is_owned_pod(labels: dict, namespace: str, **_) -> bool:
+    cluster_name = labels.get("mysql.oracle.com/cluster")
+    return not cluster_name or owns_cluster(namespace, cluster_name)
+
+
+def ensure_owned(namespace: str, cluster_name: Optional[str]) -> None:
+    """
+    For the creation, field and deletion handlers, which can't use a filter:
+    all the replicas share the state kopf keeps in the object. A replica
+    without a matching handler still records the change as handled, or
+    removes the finalizer. So these handlers match everywhere and the
+    replicas that don't own the object retry until the owner handled it.
+    """
+    if cluster_name and not owns_cluster(namespace, cluster_name):
+        raise kopf.TemporaryError(f"Cluster {namespace}/{cluster_name} is handled by another operator replica",
+                                  delay=k_not_owned_retry_delay)
@@ -6,6 +6,7 @@
 from logging import Logger
 
 from .innodbcluster.cluster_api import MySQLPod
+from . import metrics
 import typing
 from typing import Any, Optional, Callable, TYPE_CHECKING, Union
 import mysqlsh
@@ -108,6 +109,7 @@ class RetryLoop:
                 if total_wait < self.timeout and (self.max_tries is None or tries < self.max_tries):
                     self.logger.info(
                         f"Error executing {f.__qualname__}, retrying after {delay}s: {err}")
+                    metrics.retries.inc(f.__qualname__)
                     time.sleep(delay)
                     total_wait += delay
                     delay = self.backoff(delay)
@@ -174,9 +176,16 @@ def connect_dba(target: dict, logger: Logger, **kwargs) -> 'Dba':
     return RetryLoop(logger, **kwargs).call(mysqlsh.connect_dba, target)
 
 
+def target_role(pod: Optional[MySQLPod]) -> str:
+    """Role of the instance in the pod as last seen by the operator, for metrics."""
+    role = pod.get_membership_info("role") if pod else None
+    return role.lower() if role else "unknown"
+
+
 def connect_to_pod(pod: MySQLPod, logger: Logger, **kwargs):
     def connect(target):
-        session = mysqlsh.mysql.get_session(target)
+        with metrics.mysql_connect_duration.time(target_role(pod)):
+            session = mysqlsh.mysql.get_session(target)
         # avoid trouble with global autocommit=0
         session.run_sql("set autocommit=1")
         # make sure there's no global ansi_quotes or anything like that
@@ -1,12 +1,12 @@
-# Copyright (c) 2020, 2023, Oracle and/or its affiliates.
+# Copyright (c) 2020, 2024, Oracle and/or its affiliates.
 #
 # Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
 #
 
 from typing import Optional
 from .api_utils import dget_dict, dget_str, dget_int, dget_bool, dget_list, ApiSpecError
-from .utils import merge_patch_object, indent
-import yaml
+from .utils import merge_patch_object
+import copy
 
 
 class CustomStorageSpec:
@@ -17,6 +17,17 @@ class CustomStorageSpec:
     secretsKeys = None  # map: variable -> key
 
 
+def storage_pod_security_context() -> dict:
+    return {
+        "allowPrivilegeEscalation": False,
+        "privileged": False,
+        "readOnlyRootFilesystem": True,
+        "runAsNonRoot": True,
+        "runAsUser": 27,
+        "fsGroup": 27
+    }
+
+
 # TODO volume instead of persistentVolumeClaim?
 class PVCStorageSpec:
     raw_data = None
@@ -24,32 +35,28 @@ class PVCStorageSpec:
     def add_to_pod_spec(self, pod_spec: dict, container_name: str) -> None:
         # /mnt/storage is passed as parameter to the backup_main.py
         backup_job_container_spec = pod_spec['spec']['containers'][0]
-        patch = f"""
-spec:
-    initContainers:
-    - name: fixdumpdir
-      image: {backup_job_container_spec['image']}
-      imagePullPolicy: {backup_job_container_spec['imagePullPolicy']}
-      command: ["bash", "-c", "chown 27:27 /mnt/storage && chmod 0700 /mnt/storage"]
-      securityContext:
-        runAsUser: 0
-      volumeMounts:
-      - name: tmp-storage
-        mountPath: /mnt/storage
-    containers:
-    - name: {container_name}
-      env:
-      - name: DUMP_MOUNT_PATH
-        value: /mnt/storage
-      volumeMounts:
-      - name: tmp-storage
-        mountPath: /mnt/storage
-    volumes:
-    - name: tmp-storage
-      persistentVolumeClaim:
-{indent(yaml.safe_dump(self.raw_data), 8)}
-"""
-        merge_patch_object(pod_spec, yaml.safe_load(patch))
+        patch = {
+            "spec": {
+                "initContainers": [{
+                    "name": "fixdumpdir",
+                    "image": backup_job_container_spec['image'],
+                    "imagePullPolicy": backup_job_container_spec['imagePullPolicy'],
+                    "command": ["bash", "-c", "chown 27:27 /mnt/storage && chmod 0700 /mnt/storage"],
+                    "securityContext": {"runAsUser": 0},
+                    "volumeMounts": [{"name": "tmp-storage", "mountPath": "/mnt/storage"}]
+                }],
+                "containers": [{
+                    "name": container_name,
+                    "env": [{"name": "DUMP_MOUNT_PATH", "value": "/mnt/storage"}],
+                    "volumeMounts": [{"name": "tmp-storage", "mountPath": "/mnt/storage"}]
+                }],
+                "volumes": [{
+                    "name": "tmp-storage",
+                    "persistentVolumeClaim": copy.deepcopy(self.raw_data)
+                }]
+            }
+        }
+        merge_patch_object(pod_spec, patch)
 
     def parse(self, spec: dict, prefix: str) -> None:
         self.raw_data = spec
@@ -71,61 +78,35 @@ class OCIOSStorageSpec:
         # The value for OCI_MOUNT_PATH should be the mountPath of the secrets-volume
         # OCI_API_KEY_NAME is the only key in the secret which holds the API key
         # The secrets volume is not readOnly because we need to write the config file into it
-        patch = f"""
-spec:
-    securityContext:
-      allowPrivilegeEscalation: false
-      privileged: false
-      readOnlyRootFilesystem: true
-      runAsNonRoot: true
-      runAsUser: 27
-      fsGroup: 27
-    containers:
-    - name: {container_name}
-      env:
-      - name: OCI_USER_NAME
-        valueFrom:
-          secretKeyRef:
-            name: {self.ociCredentials}
-            key: user
-      - name: OCI_FINGERPRINT
-        valueFrom:
-          secretKeyRef:
-            name: {self.ociCredentials}
-            key: fingerprint
-      - name: OCI_TENANCY
-        valueFrom:
-          secretKeyRef:
-            name: {self.ociCredentials}
-            key: tenancy
-      - name: OCI_REGION
-        valueFrom:
-          secretKeyRef:
-            name: {self.ociCredentials}
-            key: region
-      - name: OCI_PASSPHRASE
-        valueFrom:
-          secretKeyRef:
-            name: {self.ociCredentials}
-            key: passphrase
-      - name: OCI_CONFIG_NAME
-        value: "/mysqlsh/oci_config"
-      - name: OCI_API_KEY_NAME
-        value: "/.oci/privatekey.pem"
-      volumeMounts:
-      - name: privatekey-volume
-        readOnly: true
-        mountPath: "/.oci"
-    volumes:
-    - name: privatekey-volume
-      secret:
-        secretName: {self.ociCredentials}
-        items:
-        - key: privatekey
-          path: privatekey.pem
-          mode: 400
-"""
-        merge_patch_object(pod_spec, yaml.safe_load(patch))
+        def secret_key_env(name: str, key: str) -> dict:
+            return {"name": name, "valueFrom": {"secretKeyRef": {"name": self.ociCredentials, "key": key}}}
+
+        patch = {
+            "spec": {
+                "securityContext": storage_pod_security_context(),
+                "containers": [{
+                    "name": container_name,
+                    "env": [
+                        secret_key_env("OCI_USER_NAME", "user"),
+                        secret_key_env("OCI_FINGERPRINT", "fingerprint"),
+                        secret_key_env("OCI_TENANCY", "tenancy"),
+                        secret_key_env("OCI_REGION", "region"),
+                        secret_key_env("OCI_PASSPHRASE", "passphrase"),
+                        {"name": "OCI_CONFIG_NAME", "value": "/mysqlsh/oci_config"},
+                        {"name": "OCI_API_KEY_NAME", "value": "/.oci/privatekey.pem"}
+                    ],
+                    "volumeMounts": [{"name": "privatekey-volume", "readOnly": True, "mountPath": "/.oci"}]
+                }],
+                "volumes": [{
+                    "name": "privatekey-volume",
+                    "secret": {
+                        "secretName": self.ociCredentials,
+                        "items": [{"key": "privatekey", "path": "privatekey.pem", "mode": 400}]
+                    }
+                }]
+            }
+        }
+        merge_patch_object(pod_spec, patch)
 
     def parse(self, spec: dict, prefix: str) -> None:
         self.prefix = dget_str(spec, "prefix", prefix, default_value = "")
@@ -150,28 +131,22 @@ class S3StorageSpec:
     endpoint: str = ""
 
     def add_to_pod_spec(self, pod_spec: dict, container_name: str) -> None:
-        patch = f"""
-spec:
-    securityContext:
-      allowPrivilegeEscalation: false
-      privileged: false
-      readOnlyRootFilesystem: true
-      runAsNonRoot: true
-      runAsUser: 27
-      fsGroup: 27
-    containers:
-    - name: {container_name}
-      volumeMounts:
-      - name: s3-config-volume
-        readOnly: true
-        # /mysqlsh is the container's $HOME
-        mountPath: "/mysqlsh/.aws"
-    volumes:
-    - name: s3-config-volume
-      secret:
-        secretName: {self.config}
-"""
-        merge_patch_object(pod_spec, yaml.safe_load(patch))
+        patch = {
+            "spec": {
+                "securityContext": storage_pod_security_context(),
+                "containers": [{
+                    "name": container_name,
+                    "volumeMounts": [{
+                        "name": "s3-config-volume",
+                        "readOnly": True,
+                        # /mysqlsh is the container's $HOME
+                        "mountPath": "/mysqlsh/.aws"
+                    }]
+                }],
+                "volumes": [{"name": "s3-config-volume", "secret": {"secretName": self.config}}]
+            }
+        }
+        merge_patch_object(pod_spec, patch)
 
     def parse(self, spec: dict, prefix: str) -> None:
         self.prefix = dget_str(spec, "prefix", prefix, default_value = "")
@@ -197,28 +172,22 @@ class AzureBlobStorageSpec:
     config: str = ""
 
     def add_to_pod_spec(self, pod_spec: dict, container_name: str) -> None:
-        patch = f"""
-spec:
-    securityContext:
-      allowPrivilegeEscalation: false
-      privileged: false
-      readOnlyRootFilesystem: true
-      runAsNonRoot: true
-      runAsUser: 27
-      fsGroup: 27
-    containers:
-    - name: {container_name}
-      volumeMounts:
-      - name: azure-config-volume
-        readOnly: true
-        # /mysqlsh is the container's $HOME
-        mountPath: "/mysqlsh/.azure"
-    volumes:
-    - name: azure-config-volume
-      secret:
-        secretName: {self.config}
-"""
-        merge_patch_object(pod_spec, yaml.safe_load(patch))
+        patch = {
+            "spec": {
+                "securityContext": storage_pod_security_context(),
+                "containers": [{
+                    "name": container_name,
+                    "volumeMounts": [{
+                        "name": "azure-config-volume",
+                        "readOnly": True,
+                        # /mysqlsh is the container's $HOME
+                        "mountPath": "/mysqlsh/.azure"
+                    }]
+                }],
+                "volumes": [{"name": "azure-config-volume", "secret": {"secretName": self.config}}]
+            }
+        }
+        merge_patch_object(pod_spec, patch)
 
     def parse(self, spec: dict, prefix: str) -> None:
         self.prefix = dget_str(spec, "prefix", prefix, default_value = "")
@@ -12,6 +12,9 @@ import base64
 import threading
 import json
 import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 
 from . import config
 
@@ -62,6 +65,147 @@ class EphemeralState:
 g_ephemeral_pod_state = EphemeralState()
 
 
+class ObjectWorkQueue:
+    """
+    Per object FIFO lock. Work on an object waits for its turn in arrival
+    order, while work on different objects runs independently. The number
+    of waiters per object is capped, so that a busy object can't take all
+    the worker threads of the operator.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queues: Dict[str, deque] = {}
+        self.holders: Dict[str, Tuple[str, str, datetime.datetime]] = {}
+
+    def acquire(self, obj, owner: str, context: str, timeout: float,
+                max_waiters: int) -> Optional[Tuple[str, str, datetime.datetime]]:
+        """
+        Returns None once the lock is held, or (owner, context, since) of the
+        current holder if it couldn't be acquired within timeout seconds.
+        """
+        key = obj.namespace+"/"+obj.name
+        turn = threading.Event()
+        with self.lock:
+            queue = self.queues.setdefault(key, deque())
+            # the head of the queue is the holder
+            if len(queue) > max_waiters:
+                return self.holders.get(key, ("n/a", "n/a", datetime.datetime.now()))
+            queue.append(turn)
+            if len(queue) == 1:
+                turn.set()
+
+        turn.wait(timeout)
+
+        with self.lock:
+            # check again with the lock held, release() could have just passed us the turn
+            if turn.is_set():
+                self.holders[key] = (owner, context, datetime.datetime.now())
+                return None
+            self.queues[key].remove(turn)
+            return self.holders.get(key, ("n/a", "n/a", datetime.datetime.now()))
+
+    def release(self, obj) -> None:
+        key = obj.namespace+"/"+obj.name
+        with self.lock:
+            self.holders.pop(key, None)
+            queue = self.queues[key]
+            queue.popleft()
+            if queue:
+                queue[0].set()
+            else:
+                del self.queues[key]
+
+    def describe(self) -> List[dict]:
+        """
+        Current holders, for how long they hold the lock and how many are
+        waiting for it.
+        """
+        now = datetime.datetime.now()
+        with self.lock:
+            return [{"object": key,
+                     "owner": owner,
+                     "context": context,
+                     "held_for": (now - since).total_seconds(),
+                     "waiting": len(self.queues.get(key, [])) - 1}
+                    for key, (owner, context, since) in self.holders.items()]
+
+
+g_cluster_work_queue = ObjectWorkQueue()
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel running callbacks after a delay, with a resolution of
+    tick seconds. Callbacks are identified by a key and there's at most one
+    pending per key: scheduling a key again keeps the earliest deadline and
+    the latest callback. Callbacks run in a pool of workers threads.
+    """
+    def __init__(self, name: str, workers: int, tick: float = 1.0, slots: int = 64):
+        self.name = name
+        self.tick = tick
+        self.slots: List[Dict[str, Tuple[int, Callable[[], None]]]] = [{} for _ in range(slots)]
+        # key -> (slot, deadline in ticks)
+        self.pending_keys: Dict[str, Tuple[int, int]] = {}
+        self.cursor = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self.thread: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+
+    def schedule(self, key: str, delay: float, callback: Callable[[], None]) -> bool:
+        """
+        Returns False if the key was already pending, in which case the two
+        are collapsed into one.
+        """
+        ticks = max(1, int((delay + self.tick - 1e-9) // self.tick))
+        with self.lock:
+            if not self.thread:
+                self.thread = threading.Thread(target=self.run, daemon=True, name=self.name)
+                self.thread.start()
+
+            deadline = self.cursor + ticks
+            old = self.pending_keys.get(key)
+            if old:
+                old_slot, old_deadline = old
+                if old_deadline <= deadline:
+                    self.slots[old_slot][key] = (old_deadline, callback)
+                    return False
+                del self.slots[old_slot][key]
+
+            slot = deadline % len(self.slots)
+            self.slots[slot][key] = (deadline, callback)
+            self.pending_keys[key] = (slot, deadline)
+            return old is None
+
+    def cancel(self, key: str) -> None:
+        with self.lock:
+            old = self.pending_keys.pop(key, None)
+            if old:
+                del self.slots[old[0]][key]
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self.pending_keys)
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.tick):
+            with self.lock:
+                self.cursor += 1
+                slot = self.slots[self.cursor % len(self.slots)]
+                due = [(key, callback) for key, (deadline, callback) in slot.items()
+                       if deadline <= self.cursor]
+                for key, _ in due:
+                    del slot[key]
+                    del self.pending_keys[key]
+
+            for _, callback in due:
+                self.executor.submit(callback)
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
 def isotime() -> str:
     return datetime.datetime.utcnow().replace(microsecond=0).isoformat()+"Z"
 
@@ -140,6 +284,97 @@ def merge_patch_object(base: dict, patch: dict, prefix: str = "", key: str = "",
                 base[k] = v
 
 
+def diff_objects(old: dict, new: dict, path: Tuple[str, ...] = ()) -> Tuple[dict, List[Tuple[str, ...]]]:
+    """
+    Compare two objects in JSON form. Returns the fields of new that are
+    missing or different in old, as a partial object in which lists are
+    whole (there's no generic way to match their items), and the paths of
+    the fields of old that are not in new.
+    """
+    changed = {}
+    removed = []
+    for k, v in new.items():
+        ov = old.get(k)
+        if isinstance(v, dict) and isinstance(ov, dict):
+            sub_changed, sub_removed = diff_objects(ov, v, path + (k,))
+            if sub_changed:
+                changed[k] = sub_changed
+            removed += sub_removed
+        elif k not in old or ov != v:
+            changed[k] = v
+    for k in old:
+        if k not in new:
+            removed.append(path + (k,))
+    return changed, removed
+
+
+def managed_fields_subset(obj, fields: dict):
+    """
+    Return the part of obj (an object in JSON form) that is listed in the
+    fieldsV1 of a managedFields entry, that is, the fields owned by a field
+    manager. Applying it again with server-side apply keeps the ownership.
+    """
+    if not fields:
+        return obj
+    if isinstance(obj, dict):
+        subset = {}
+        for key, sub in fields.items():
+            if key.startswith("f:") and key[2:] in obj:
+                subset[key[2:]] = managed_fields_subset(obj[key[2:]], sub)
+        return subset
+    if isinstance(obj, list):
+        subset = []
+        for key, sub in fields.items():
+            if key.startswith("k:"):
+                # item of an associative list, identified by its key fields
+                item_key = json.loads(key[2:])
+                for item in obj:
+                    if isinstance(item, dict) and all(item.get(k) == v for k, v in item_key.items()):
+                        subset.append({**managed_fields_subset(item, sub), **item_key})
+                        break
+            elif key.startswith("v:"):
+                # item of a set
+                value = json.loads(key[2:])
+                if value in obj:
+                    subset.append(value)
+        return subset
+    return obj
+
+
+def merge_objects(base: dict, patch: dict) -> dict:
+    """
+    Merge patch into base, recursing into objects and replacing anything
+    else, lists included.
+    """
+    for k, v in patch.items():
+        if isinstance(v, dict) and isinstance(base.get(k), dict):
+            merge_objects(base[k], v)
+        else:
+            base[k] = v
+    return base
+
+
+def object_contains(obj, sub) -> bool:
+    """
+    Whether obj has all the fields of sub with the same values. Objects in
+    lists are compared the same way, so obj may have more fields, e.g. the
+    defaults set by the API server.
+    """
+    if isinstance(sub, dict):
+        return isinstance(obj, dict) and all(k in obj and object_contains(obj[k], v) for k, v in sub.items())
+    if isinstance(sub, list):
+        return isinstance(obj, list) and len(obj) == len(sub) and all(object_contains(o, v) for o, v in zip(obj, sub))
+    return obj == sub
+
+
+def has_path(obj: dict, path: Tuple[str, ...]) -> bool:
+    for key in path:
+        if not isinstance(obj, dict) or key not in obj:
+            return False
+        obj = obj[key]
+    return True
+
+
 def generate_password() -> str:
     random.seed(int(str(time.time()).split(".")[-1]))
     return "-".join("".join(random.choice(string.ascii_letters+string.digits+"_.=+-~") for i in range(5)) for ii in range(5))
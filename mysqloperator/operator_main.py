@@ -43,14 +43,21 @@ def main(argv):
 
     loop = asyncio.get_event_loop()
 
-    # Priority defines the priority/weight of this instance of the operator for
-    # kopf peering. If there are multiple operator instances in the cluster,
-    # only the one with the highest priority will actually be active.
-    loop.run_until_complete(kopf.operator(
-        clusterwide=True,
-        priority=int(time.time()*1000000),
-        peering_name="mysql-operator" # must be the same as the identified in ClusterKopfPeering
-    ))
+    if myconfig.SHARDING:
+        # All instances are active, each handling the clusters of its shard
+        loop.run_until_complete(kopf.operator(
+            clusterwide=True,
+            standalone=True
+        ))
+    else:
+        # Priority defines the priority/weight of this instance of the operator for
+        # kopf peering. If there are multiple operator instances in the cluster,
+        # only the one with the highest priority will actually be active.
+        loop.run_until_complete(kopf.operator(
+            clusterwide=True,
+            priority=int(time.time()*1000000),
+            peering_name="mysql-operator" # must be the same as the identified in ClusterKopfPeering
+        ))
 
     return 0
 
@@ -0,0 +1,55 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+import threading
+from logging import getLogger
+from .controller.innodbcluster.cluster_objects import ApiCommand, ApiCommandType, ApiCommandsError, run_api_commands
+
+
+class RecordingCommand(ApiCommand):
+    def __init__(self, type: ApiCommandType, name: str, log: list, fail: bool = False):
+        super().__init__(type, "ns", name)
+        self.log = log
+        self.fail = fail
+
+    def run(self, logger):
+        self.log.append((str(self), threading.current_thread().name))
+        if self.fail:
+            raise RuntimeError(f"{self} failed")
+
+
+def test_run_api_commands() -> None:
+    log = []
+    commands = [
+        RecordingCommand(ApiCommandType.DELETE_CM, "a", log),
+        RecordingCommand(ApiCommandType.CREATE_CM, "b", log),
+        RecordingCommand(ApiCommandType.CREATE_CM, "a", log),
+    ]
+    run_api_commands(commands, getLogger())
+    ran = [c for c, _ in log]
+    assert sorted(ran) == sorted(str(c) for c in commands)
+    # same object, same order
+    assert ran.index("DELETE_CM ns/a") < ran.index("CREATE_CM ns/a")
+    assert all(thread.startswith("api-command") for _, thread in log)
+
+
+def test_run_api_commands_errors() -> None:
+    log = []
+    commands = [
+        RecordingCommand(ApiCommandType.PATCH_CM, "a", log, fail=True),
+        RecordingCommand(ApiCommandType.REPLACE_CM, "a", log),
+        RecordingCommand(ApiCommandType.PATCH_CM, "b", log, fail=True),
+        RecordingCommand(ApiCommandType.PATCH_CM, "c", log),
+    ]
+    try:
+        run_api_commands(commands, getLogger())
+        assert False
+    except ApiCommandsError as e:
+        assert [str(c) for c, _ in e.errors] == ["PATCH_CM ns/a", "PATCH_CM ns/b"]
+        assert "2 of the API commands failed" in str(e)
+    ran = [c for c, _ in log]
+    # all the other objects were done, but not what followed the failure
+    assert "PATCH_CM ns/c" in ran
+    assert "REPLACE_CM ns/a" not in ran
@@ -0,0 +1,329 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from types import SimpleNamespace
+from .controller import diagnose
+from .controller.diagnose import DiagnosisCache, ClusterStatus, ClusterDiagStatus, InstanceStatus, InstanceDiagStatus, \
+    diagnose_connected_instance_fast, instance_statuses_consistent
+import logging
+import mysqlsh
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class FakeCluster:
+    def __init__(self, pods: list) -> None:
+        self.namespace = "ns"
+        self.name = "mycluster"
+        self.uid = "uid-1"
+        self.pods = pods
+
+    def get_pods(self) -> list:
+        return self.pods
+
+
+def fake_pod(name: str, uid: str) -> SimpleNamespace:
+    return SimpleNamespace(name=name, metadata=SimpleNamespace(uid=uid))
+
+
+def cluster_status(status: ClusterDiagStatus) -> ClusterStatus:
+    diag = ClusterStatus()
+    diag.status = status
+    return diag
+
+
+VIEW = (("id-0", "PRIMARY", "ONLINE", "1:2"), ("id-1", "SECONDARY", "ONLINE", "1:2"))
+
+
+def test_diagnosis_cache_key() -> None:
+    cache = DiagnosisCache()
+    cluster = FakeCluster([fake_pod("mycluster-0", "a"), fake_pod("mycluster-1", "b")])
+
+    key = cache.key(cluster, VIEW)
+    assert key == ("uid-1", VIEW, frozenset({("mycluster-0", "a"), ("mycluster-1", "b")}))
+    # the order of the pods doesn't matter
+    cluster.pods.reverse()
+    assert cache.key(cluster, VIEW) == key
+
+    # no view, no caching
+    assert cache.key(cluster, None) is None
+    # a RECOVERING member becomes ONLINE without a view change
+    assert cache.key(cluster, (VIEW[0], ("id-1", "SECONDARY", "RECOVERING", "1:2"))) is None
+
+    # a replaced pod or another member state make another key
+    assert cache.key(cluster, (VIEW[0], ("id-1", "SECONDARY", "ERROR", "1:2"))) != key
+    cluster.pods[0] = fake_pod("mycluster-1", "c")
+    assert cache.key(cluster, VIEW) != key
+
+
+def test_diagnosis_cache_get_set() -> None:
+    cache = DiagnosisCache()
+    cluster = FakeCluster([fake_pod("mycluster-0", "a")])
+    key = cache.key(cluster, VIEW)
+
+    assert cache.get(cluster, key) is None
+    online = cluster_status(ClusterDiagStatus.ONLINE)
+    cache.set(cluster, key, online)
+    assert cache.get(cluster, key) is online
+    assert cache.get(cluster, None) is None
+    assert cache.get(cluster, cache.key(cluster, (VIEW[0],))) is None
+
+    partial = cluster_status(ClusterDiagStatus.ONLINE_PARTIAL)
+    cache.set(cluster, key, partial)
+    assert cache.get(cluster, key) is partial
+
+    cache.invalidate(cluster)
+    assert cache.get(cluster, key) is None
+
+
+def test_diagnosis_cache_statuses() -> None:
+    cache = DiagnosisCache()
+    cluster = FakeCluster([fake_pod("mycluster-0", "a")])
+    key = cache.key(cluster, VIEW)
+
+    for status in ClusterDiagStatus:
+        cache.set(cluster, key, cluster_status(ClusterDiagStatus.ONLINE))
+        cache.set(cluster, key, cluster_status(status))
+        # statuses that need action replace the cached one, so it's not reused
+        if status in (ClusterDiagStatus.ONLINE, ClusterDiagStatus.ONLINE_PARTIAL):
+            assert cache.get(cluster, key).status == status
+        else:
+            assert cache.get(cluster, key) is None, status
+
+    cache.set(cluster, None, cluster_status(ClusterDiagStatus.ONLINE))
+    assert cache.get(cluster, key) is None
+
+
+class FakeMember:
+    def __init__(self, index: int, instance_type: str = "group-member") -> None:
+        self.index = index
+        self.name = f"mycluster-{index}"
+        self.endpoint = f"mycluster-{index}.mycluster-instances.ns.svc.cluster.local:3306"
+        self.endpoint_url_safe = self.endpoint
+        self.instance_type = instance_type
+
+    def get_membership_info(self, field: str = None) -> None:
+        return None
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+class FakeError(mysqlsh.Error):
+    def __init__(self, code: int) -> None:
+        super().__init__(f"error {code}")
+        self.code = code
+
+
+class FakeSession:
+    def __init__(self, rows: list) -> None:
+        self.rows = rows
+
+    def run_sql(self, sql: str) -> SimpleNamespace:
+        if isinstance(self.rows, Exception):
+            raise self.rows
+        return SimpleNamespace(fetch_all=lambda: self.rows)
+
+
+def fake_dba(rows: list) -> SimpleNamespace:
+    return SimpleNamespace(session=FakeSession(rows))
+
+
+def member_row(self_index: int, index: int, state: str, role: str = "SECONDARY", view_id: str = "1:3",
+               host_index: int = None) -> tuple:
+    # a row of k_fast_diagnose_query, as returned by the member self_index
+    host = f"mycluster-{index if host_index is None else host_index}.mycluster-instances.ns.svc.cluster.local"
+    return (f"uuid-{self_index}", "gtids", view_id, f"uuid-{index}", host, 3306, state, role)
+
+
+def fast_status(pod: FakeMember, rows) -> tuple:
+    status = InstanceStatus()
+    status.pod = pod
+    return diagnose_connected_instance_fast(status, fake_dba(rows), logger), status
+
+
+def test_diagnose_fast_online() -> None:
+    rows = [member_row(0, 0, "ONLINE", "PRIMARY"), member_row(0, 1, "ONLINE"), member_row(0, 2, "RECOVERING")]
+    done, status = fast_status(FakeMember(0), rows)
+    assert done
+    assert status.status == InstanceDiagStatus.ONLINE
+    assert status.is_primary
+    assert status.in_quorum
+    assert status.view_id == "1:3"
+    assert status.gtid_executed == "gtids"
+    assert status.peers == {FakeMember(i).endpoint: s for i, s in enumerate(("ONLINE", "ONLINE", "RECOVERING"))}
+
+    rows = [member_row(2, 0, "ONLINE", "PRIMARY"), member_row(2, 1, "ONLINE"), member_row(2, 2, "RECOVERING")]
+    done, status = fast_status(FakeMember(2), rows)
+    assert done
+    assert status.status == InstanceDiagStatus.RECOVERING
+    assert status.is_primary is None
+
+
+def test_diagnose_fast_inconclusive() -> None:
+    # GR not installed or not running: a single row with NULL member columns
+    done, status = fast_status(FakeMember(0), [("uuid-0", "gtids", None, None, None, None, None, None)])
+    assert not done
+    assert status.status == InstanceDiagStatus.UNKNOWN
+
+    # not ONLINE or RECOVERING
+    done, _ = fast_status(FakeMember(0), [member_row(0, 0, "OFFLINE", view_id=None)])
+    assert not done
+    done, _ = fast_status(FakeMember(0), [member_row(0, 0, "ERROR"), member_row(0, 1, "ONLINE")])
+    assert not done
+
+    # the instance reports itself as a different endpoint
+    done, _ = fast_status(FakeMember(1), [member_row(1, 0, "ONLINE", "PRIMARY"), member_row(1, 1, "ONLINE", host_index=0)])
+    assert not done
+
+    # read replicas and failed queries go through the AdminAPI
+    done, _ = fast_status(FakeMember(0, "read-replica"), [member_row(0, 0, "ONLINE", "PRIMARY")])
+    assert not done
+    done, _ = fast_status(FakeMember(0), FakeError(2013))
+    assert not done
+
+
+def test_diagnose_fast_quorum() -> None:
+    # UNREACHABLE members count for the majority, but don't vote
+    rows = [member_row(0, 0, "ONLINE", "PRIMARY"), member_row(0, 1, "ONLINE"), member_row(0, 2, "UNREACHABLE")]
+    done, status = fast_status(FakeMember(0), rows)
+    assert done and status.in_quorum
+
+    rows = [member_row(0, 0, "ONLINE", "PRIMARY"), member_row(0, 1, "UNREACHABLE"), member_row(0, 2, "UNREACHABLE")]
+    done, status = fast_status(FakeMember(0), rows)
+    assert done and not status.in_quorum
+    assert status.status == InstanceDiagStatus.ONLINE
+
+    rows = [member_row(0, 0, "ONLINE", "PRIMARY"), member_row(0, 1, "UNREACHABLE")]
+    done, status = fast_status(FakeMember(0), rows)
+    assert done and not status.in_quorum
+
+
+def active_status(pod: FakeMember, peers: dict, view_id: str = "1:3", in_quorum: bool = True,
+                  state: InstanceDiagStatus = InstanceDiagStatus.ONLINE) -> InstanceStatus:
+    status = InstanceStatus()
+    status.pod = pod
+    status.status = state
+    status.view_id = view_id
+    status.in_quorum = in_quorum
+    status.peers = {p.endpoint: s for p, s in peers.items()}
+    return status
+
+
+def test_instance_statuses_consistent() -> None:
+    pods = [FakeMember(i) for i in range(3)]
+    peers = {pods[0]: "ONLINE", pods[1]: "ONLINE", pods[2]: "RECOVERING"}
+    statuses = {pod: active_status(pod, peers) for pod in pods}
+    statuses[pods[2]].status = InstanceDiagStatus.RECOVERING
+    assert instance_statuses_consistent(statuses, logger)
+
+    # a member outside of the cluster pods
+    stranger = FakeMember(5)
+    statuses = {pod: active_status(pod, {**peers, stranger: "ONLINE"}) for pod in pods}
+    assert not instance_statuses_consistent(statuses, logger)
+
+    # an ONLINE peer that doesn't report itself as active
+    statuses = {pod: active_status(pod, peers) for pod in pods[:2]}
+    statuses[pods[2]] = InstanceStatus()
+    statuses[pods[2]].pod = pods[2]
+    statuses[pods[2]].status = InstanceDiagStatus.OFFLINE
+    assert not instance_statuses_consistent(statuses, logger)
+
+    # members with quorum in different views
+    peers = {pods[0]: "ONLINE", pods[1]: "ONLINE", pods[2]: "ONLINE"}
+    statuses = {pod: active_status(pod, peers) for pod in pods}
+    statuses[pods[2]].view_id = "1:4"
+    assert not instance_statuses_consistent(statuses, logger)
+
+    # a member without quorum has its own view
+    statuses[pods[2]] = active_status(pods[2], {pods[2]: "ONLINE", pods[0]: "UNREACHABLE"}, "1:4", in_quorum=False)
+    statuses[pods[0]].peers[pods[2].endpoint] = "UNREACHABLE"
+    statuses[pods[1]].peers[pods[2].endpoint] = "UNREACHABLE"
+    assert instance_statuses_consistent(statuses, logger)
+
+
+class FakeDiagnosedCluster:
+    def __init__(self, pods: list) -> None:
+        self.name = "mycluster"
+        self.deleting = False
+        self.pods = pods
+
+    def reload(self) -> None:
+        pass
+
+    def get_pods(self) -> list:
+        return self.pods
+
+    def get_last_known_quorum(self) -> None:
+        return None
+
+    def get_create_time(self) -> str:
+        return "2024-01-01T00:00:00Z"
+
+
+def test_diagnose_cluster_fast_fallback(monkeypatch) -> None:
+    pods = [FakeMember(i) for i in range(3)]
+    peers = {pods[0]: "ONLINE", pods[1]: "ONLINE", pods[2]: "ONLINE"}
+    # pod 2 reports a member that isn't a pod of the cluster
+    fast = {pod: active_status(pod, peers) for pod in pods}
+    fast[pods[2]].peers[FakeMember(5).endpoint] = "ONLINE"
+    full = {pod: active_status(pod, peers) for pod in pods}
+    for statuses in (fast, full):
+        statuses[pods[0]].is_primary = True
+
+    statuses_by_mode = {True: fast, False: full}
+    calls = []
+
+    def diagnose_instances(all_pods, logger, fast: bool = False) -> dict:
+        calls.append(fast)
+        return statuses_by_mode[fast]
+
+    monkeypatch.setattr(diagnose.config, "DIAGNOSE_FAST", True)
+    monkeypatch.setattr(diagnose, "diagnose_instances", diagnose_instances)
+
+    status = diagnose.do_diagnose_cluster(FakeDiagnosedCluster(pods), logger)
+    assert calls == [True, False]
+    assert status.status == ClusterDiagStatus.ONLINE
+    assert status.primary is pods[0]
+
+    # a consistent fast diagnosis is used as is
+    calls.clear()
+    statuses_by_mode[True] = full
+    diagnose.do_diagnose_cluster(FakeDiagnosedCluster(pods), logger)
+    assert calls == [True]
+
+
+def test_diagnose_instances_late_probes(monkeypatch) -> None:
+    pods = [FakeMember(i) for i in range(2)]
+    stuck = threading.Event()
+    probed = []
+
+    def diagnose_instance(pod, logger, dba, fast: bool) -> InstanceStatus:
+        probed.append(pod)
+        if pod is pods[1]:
+            stuck.wait()
+        return active_status(pod, {pods[0]: "ONLINE", pods[1]: "ONLINE"})
+
+    monkeypatch.setattr(diagnose.config, "DIAGNOSE_TIMEOUT", 0.1)
+    monkeypatch.setattr(diagnose, "diagnose_instance", diagnose_instance)
+
+    statuses = diagnose.diagnose_instances(pods, logger)
+    assert statuses[pods[0]].status == InstanceDiagStatus.ONLINE
+    assert statuses[pods[1]].status == InstanceDiagStatus.UNKNOWN
+
+    # the stuck probe isn't started again while it is running
+    statuses = diagnose.diagnose_instances(pods, logger)
+    assert statuses[pods[1]].status == InstanceDiagStatus.UNKNOWN
+    assert probed == [pods[0], pods[1], pods[0]]
+
+    stuck.set()
+    for _ in range(100):
+        if not diagnose.g_late_probes:
+            break
+        time.sleep(0.01)
+    statuses = diagnose.diagnose_instances(pods, logger)
+    assert statuses[pods[1]].status == InstanceDiagStatus.ONLINE
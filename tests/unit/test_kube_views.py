@@ -0,0 +1,94 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+import datetime
+import json
+from .controller.kubeviews import PodView, StatefulSetView
+from .controller.innodbcluster.cluster_api import MySQLPod
+
+POD = {
+    "apiVersion": "v1",
+    "kind": "Pod",
+    "metadata": {
+        "name": "mycluster-1",
+        "namespace": "ns",
+        "resourceVersion": "123",
+        "labels": {"mysql.oracle.com/cluster": "mycluster"},
+        "deletionTimestamp": "2024-01-02T03:04:05Z",
+        "ownerReferences": [{"apiVersion": "apps/v1", "kind": "StatefulSet",
+                             "name": "mycluster", "uid": "1234"}]
+    },
+    "spec": {"subdomain": "mycluster-instances", "containers": []},
+    "status": {
+        "podIP": "10.0.0.1",
+        "conditions": [{"type": "Ready", "status": "True"}],
+        "containerStatuses": [{"name": "mysql", "ready": True, "restartCount": 2,
+                               "image": "mysql", "imageID": "x"}]
+    }
+}
+
+
+def test_pod_view() -> None:
+    pod = PodView(POD)
+    assert pod.kind == "Pod"
+    assert pod.metadata.resource_version == "123"
+    assert pod.metadata.labels == {"mysql.oracle.com/cluster": "mycluster"}
+    assert pod.metadata.deletion_timestamp == datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc)
+    assert pod.metadata.owner_references[0].api_version == "apps/v1"
+    assert pod.metadata.finalizers is None
+    assert pod.status.pod_ip == "10.0.0.1"
+    assert pod.status.container_statuses[0].restart_count == 2
+    assert pod.raw is POD
+
+    try:
+        pod.no_such_field
+        assert False
+    except AttributeError:
+        pass
+
+
+def test_mysql_pod_from_view() -> None:
+    pod = MySQLPod.from_json(POD)
+    assert pod.name == "mycluster-1"
+    assert pod.index == 1
+    assert pod.cluster_name == "mycluster"
+    assert pod.deleting
+    assert pod.address == "mycluster-1.mycluster-instances"
+    assert pod.pod_ip_address == "10.0.0.1"
+    assert pod.check_condition("Ready")
+    assert pod.owner_reference("apps/v1", "StatefulSet").name == "mycluster"
+    assert pod.self_ref()["resourceVersion"] == "123"
+    # the pod is copied from the body
+    assert pod.pod.raw is not POD
+
+
+def test_stateful_set_view() -> None:
+    sts = StatefulSetView({"metadata": {"name": "mycluster", "namespace": "ns"},
+                           "spec": {"replicas": 3}})
+    assert (sts.metadata.name, sts.metadata.namespace) == ("mycluster", "ns")
+    assert sts.spec.replicas == 3
+    assert sts.status is None
+
+
+def test_mysql_pod_memoizes_derived_values() -> None:
+    pod = MySQLPod.from_json(POD)
+    assert "__dict__" not in dir(pod)
+    assert pod.get_membership_info() is None
+    assert pod.get_container_restarts("mysql") == 2
+    assert pod.check_container_ready("sidecar") is None
+
+    body = json.loads(json.dumps(POD))
+    body["metadata"]["resourceVersion"] = "124"
+    body["metadata"]["annotations"] = {
+        "mysql.oracle.com/membership-info": json.dumps({"role": "PRIMARY", "status": "ONLINE"})}
+    body["status"]["conditions"] = [{"type": "Ready", "status": "False"}]
+    pod.pod = PodView(body)
+
+    info = pod.get_membership_info()
+    assert info == {"role": "PRIMARY", "status": "ONLINE"}
+    # parsed once for the resourceVersion
+    assert pod.get_membership_info() is info
+    assert pod.get_membership_info("role") == "PRIMARY"
+    assert pod.check_condition("Ready") is False
@@ -0,0 +1,53 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from types import SimpleNamespace
+from urllib.parse import urlsplit, parse_qs
+from kubernetes import client
+from .controller import kubeutils
+import json
+
+
+class FakePoolManager:
+    """Records the HTTP requests made by the client, below its serialization."""
+
+    def __init__(self, response: dict) -> None:
+        self.response = response
+        self.requests = []
+
+    def request(self, method: str, url: str, **kwargs) -> SimpleNamespace:
+        self.requests.append((method, url, kwargs))
+        return SimpleNamespace(status=200, reason="OK", data=json.dumps(self.response).encode("utf-8"),
+                               getheaders=lambda: {}, getheader=lambda name, default=None: default)
+
+
+def test_apply_object(monkeypatch) -> None:
+    api = client.AppsV1Api(client.ApiClient())
+    pool = FakePoolManager({"apiVersion": "apps/v1", "kind": "StatefulSet",
+                            "metadata": {"name": "mycluster", "namespace": "ns", "resourceVersion": "2"},
+                            "spec": {"replicas": 3, "selector": {}, "serviceName": "mycluster-instances",
+                                     "template": {}}})
+    monkeypatch.setattr(api.api_client.rest_client, "pool_manager", pool)
+    body = {"apiVersion": "apps/v1", "kind": "StatefulSet",
+            "metadata": {"name": "mycluster", "namespace": "ns"}, "spec": {"replicas": 3}}
+
+    sts = kubeutils.apply_object(api, "/apis/apps/v1/namespaces/{namespace}/statefulsets/{name}",
+                                 {"namespace": "ns", "name": "mycluster"}, body, "V1StatefulSet",
+                                 "mysql-operator", dry_run=True)
+    assert isinstance(sts, client.V1StatefulSet)
+    assert sts.spec.replicas == 3
+
+    method, url, kwargs = pool.requests[0]
+    assert method == "PATCH"
+    url = urlsplit(url)
+    assert url.path == "/apis/apps/v1/namespaces/ns/statefulsets/mycluster"
+    assert parse_qs(url.query) == {"fieldManager": ["mysql-operator"], "force": ["True"], "dryRun": ["All"]}
+    assert kwargs["headers"]["Content-Type"] == "application/apply-patch+yaml"
+    # the body is sent as a JSON document, serialized once
+    assert json.loads(kwargs["body"]) == body
+
+    kubeutils.apply_object(api, "/apis/apps/v1/namespaces/{namespace}/statefulsets/{name}",
+                           {"namespace": "ns", "name": "mycluster"}, body, "V1StatefulSet", "mysql-operator")
+    assert "dryRun" not in parse_qs(urlsplit(pool.requests[1][1]).query)
@@ -0,0 +1,904 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+import base64
+import uuid
+import yaml
+from logging import getLogger
+from types import SimpleNamespace
+from .controller import config, kubeutils
+from .controller.innodbcluster import cluster_api, cluster_objects, router_objects
+from .controller.innodbcluster.cluster_api import InnoDBCluster
+from .controller.storage_api import PVCStorageSpec, OCIOSStorageSpec, S3StorageSpec, AzureBlobStorageSpec
+
+# The expected manifests are what the YAML templates, which the builders
+# replaced, used to render.
+
+TLS = {"CA": "myca.pem", "myca.pem": "ca", "crl.pem": "crl", "router_tls.crt": "crt", "router_tls.key": "key"}
+
+
+class FakeCluster(InnoDBCluster):
+    def get_ca_and_tls(self) -> dict:
+        return TLS
+
+    def router_tls_exists(self) -> bool:
+        return True
+
+
+def make_cluster(spec: dict) -> FakeCluster:
+    # each cluster has its own uid, parsed specs are cached by uid
+    return FakeCluster({"metadata": {"name": "mycluster", "namespace": "ns", "uid": str(uuid.uuid4()),
+                                     "generation": 1, "annotations": {}},
+                        "spec": spec})
+
+
+def expected(tmpl: str, spec) -> dict:
+    for placeholder, image in (("@OPERATOR_IMAGE@", spec.operator_image), ("@MYSQL_IMAGE@", spec.mysql_image),
+                               ("@ROUTER_IMAGE@", spec.router_image)):
+        tmpl = tmpl.replace(placeholder, image)
+    return yaml.safe_load(tmpl)
+
+
+def container(spec: dict, name: str) -> dict:
+    return next(c for c in spec["containers"] + spec.get("initContainers", []) if c["name"] == name)
+
+
+STATEFULSET = """\
+apiVersion: apps/v1
+kind: StatefulSet
+metadata:
+  name: mycluster
+  annotations:
+    mysql.oracle.com/fqdn-template: '{service}.{namespace}.svc.{domain}'
+  labels:
+    tier: mysql
+    mysql.oracle.com/cluster: mycluster
+    mysql.oracle.com/instance-type: group-member
+    app.kubernetes.io/name: mysql-innodbcluster
+    app.kubernetes.io/instance: mysql-innodbcluster-mycluster
+    app.kubernetes.io/component: database
+    app.kubernetes.io/managed-by: mysql-operator
+    app.kubernetes.io/created-by: mysql-operator
+spec:
+  serviceName: mycluster-instances
+  replicas: 3
+  podManagementPolicy: Parallel
+  selector:
+    matchLabels:
+      component: mysqld
+      tier: mysql
+      mysql.oracle.com/cluster: mycluster
+      mysql.oracle.com/instance-type: group-member
+      app.kubernetes.io/name: mysql-innodbcluster-mysql-server
+      app.kubernetes.io/instance: mysql-innodbcluster-mycluster-mysql-server
+      app.kubernetes.io/component: database
+      app.kubernetes.io/managed-by: mysql-operator
+      app.kubernetes.io/created-by: mysql-operator
+  template:
+    metadata:
+      annotations:
+        mysql.oracle.com/fqdn-template: '{service}.{namespace}.svc.{domain}'
+      labels:
+        component: mysqld
+        tier: mysql
+        mysql.oracle.com/cluster: mycluster
+        mysql.oracle.com/instance-type: group-member
+        app.kubernetes.io/name: mysql-innodbcluster-mysql-server
+        app.kubernetes.io/instance: mysql-innodbcluster-mycluster-mysql-server
+        app.kubernetes.io/component: database
+        app.kubernetes.io/managed-by: mysql-operator
+        app.kubernetes.io/created-by: mysql-operator
+    spec:
+      subdomain: mycluster
+      readinessGates:
+      - conditionType: mysql.oracle.com/configured
+      - conditionType: mysql.oracle.com/ready
+      serviceAccountName: mycluster-sidecar-sa
+      securityContext:
+        runAsUser: 27
+        runAsGroup: 27
+        fsGroup: 27
+        runAsNonRoot: true
+      terminationGracePeriodSeconds: 120
+      initContainers:
+      - name: fixdatadir
+        image: @OPERATOR_IMAGE@
+        imagePullPolicy: Always
+        command:
+        - bash
+        - -c
+        - chown 27:27 /var/lib/mysql && chmod 0700 /var/lib/mysql
+        securityContext:
+          runAsNonRoot: false
+          runAsUser: 0
+          allowPrivilegeEscalation: false
+          privileged: false
+          readOnlyRootFilesystem: true
+          capabilities:
+            add:
+            - CHOWN
+            - FOWNER
+            drop:
+            - ALL
+        volumeMounts:
+        - name: datadir
+          mountPath: /var/lib/mysql
+        env:
+        - name: MYSQL_OPERATOR_K8S_CLUSTER_DOMAIN
+          value: cluster.local
+        - name: MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS
+          value: never
+      - name: initconf
+        image: @OPERATOR_IMAGE@
+        imagePullPolicy: Always
+        command:
+        - mysqlsh
+        - --log-level=@INFO
+        - --pym
+        - mysqloperator
+        - init
+        - --pod-name
+        - $(POD_NAME)
+        - --pod-namespace
+        - $(POD_NAMESPACE)
+        - --datadir
+        - /var/lib/mysql
+        securityContext:
+          allowPrivilegeEscalation: false
+          privileged: false
+          readOnlyRootFilesystem: true
+          runAsNonRoot: true
+          capabilities:
+            drop:
+            - ALL
+        env:
+        - name: POD_NAME
+          valueFrom:
+            fieldRef:
+              fieldPath: metadata.name
+        - name: POD_NAMESPACE
+          valueFrom:
+            fieldRef:
+              fieldPath: metadata.namespace
+        - name: MYSQL_OPERATOR_K8S_CLUSTER_DOMAIN
+          value: cluster.local
+        - name: MYSQLSH_USER_CONFIG_HOME
+          value: /tmp
+        - name: MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS
+          value: never
+        volumeMounts:
+        - name: initconfdir
+          mountPath: /mnt/initconf
+          readOnly: true
+        - name: datadir
+          mountPath: /var/lib/mysql
+        - name: mycnfdata
+          mountPath: /mnt/mycnfdata
+        - name: initconf-tmp
+          mountPath: /tmp
+        - name: rootcreds
+          readOnly: true
+          subPath: rootHost
+          mountPath: /rootcreds/rootHost
+      - name: initmysql
+        image: @MYSQL_IMAGE@
+        imagePullPolicy: Always
+        args:
+        - mysqld
+        - --user=mysql
+        securityContext:
+          allowPrivilegeEscalation: false
+          privileged: false
+          readOnlyRootFilesystem: true
+          runAsNonRoot: true
+          capabilities:
+            drop:
+            - ALL
+        env:
+        - name: MYSQL_INITIALIZE_ONLY
+          value: '1'
+        - name: MYSQL_RANDOM_ROOT_PASSWORD
+          value: '1'
+        - name: MYSQLSH_USER_CONFIG_HOME
+          value: /tmp
+        volumeMounts:
+        - name: datadir
+          mountPath: /var/lib/mysql
+        - name: rundir
+          mountPath: /var/run/mysqld
+        - name: mycnfdata
+          mountPath: /etc/my.cnf.d
+          subPath: my.cnf.d
+        - name: mycnfdata
+          mountPath: /docker-entrypoint-initdb.d
+          subPath: docker-entrypoint-initdb.d
+        - name: mycnfdata
+          mountPath: /etc/my.cnf
+          subPath: my.cnf
+        - name: initmysql-tmp
+          mountPath: /tmp
+        - name: varlibmysqlfiles
+          mountPath: /var/lib/mysql-files
+      containers:
+      - name: sidecar
+        image: @OPERATOR_IMAGE@
+        imagePullPolicy: Always
+        command:
+        - mysqlsh
+        - --pym
+        - mysqloperator
+        - sidecar
+        - --pod-name
+        - $(POD_NAME)
+        - --pod-namespace
+        - $(POD_NAMESPACE)
+        - --datadir
+        - /var/lib/mysql
+        securityContext:
+          allowPrivilegeEscalation: false
+          privileged: false
+          readOnlyRootFilesystem: true
+          runAsNonRoot: true
+          capabilities:
+            drop:
+            - ALL
+        env:
+        - name: POD_NAME
+          valueFrom:
+            fieldRef:
+              fieldPath: metadata.name
+        - name: POD_NAMESPACE
+          valueFrom:
+            fieldRef:
+              fieldPath: metadata.namespace
+        - name: MYSQL_UNIX_PORT
+          value: /var/run/mysqld/mysql.sock
+        - name: MYSQLSH_USER_CONFIG_HOME
+          value: /mysqlsh
+        - name: MYSQL_OPERATOR_K8S_CLUSTER_DOMAIN
+          value: cluster.local
+        - name: MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS
+          value: never
+        volumeMounts:
+        - name: rundir
+          mountPath: /var/run/mysqld
+        - name: mycnfdata
+          mountPath: /etc/my.cnf.d
+          subPath: my.cnf.d
+        - name: mycnfdata
+          mountPath: /etc/my.cnf
+          subPath: my.cnf
+        - name: shellhome
+          mountPath: /mysqlsh
+        - name: sidecar-tmp
+          mountPath: /tmp
+      - name: mysql
+        image: @MYSQL_IMAGE@
+        imagePullPolicy: Always
+        args:
+        - mysqld
+        - --user=mysql
+        securityContext:
+          allowPrivilegeEscalation: false
+          privileged: false
+          readOnlyRootFilesystem: true
+          runAsNonRoot: true
+          capabilities:
+            drop:
+            - ALL
+        lifecycle:
+          preStop:
+            exec:
+              command:
+              - sh
+              - -c
+              - sleep 60 && mysqladmin -ulocalroot shutdown
+        startupProbe:
+          exec:
+            command:
+            - /livenessprobe.sh
+            - '8'
+          initialDelaySeconds: 5
+          periodSeconds: 3
+          failureThreshold: 10000
+          successThreshold: 1
+          timeout: 2
+        readinessProbe:
+          exec:
+            command:
+            - /readinessprobe.sh
+          periodSeconds: 5
+          initialDelaySeconds: 10
+          failureThreshold: 10000
+        livenessProbe:
+          exec:
+            command:
+            - /livenessprobe.sh
+          initialDelaySeconds: 15
+          periodSeconds: 15
+          failureThreshold: 10
+          successThreshold: 1
+          timeout: 5
+        env:
+        - name: MYSQL_UNIX_PORT
+          value: /var/run/mysqld/mysql.sock
+        - name: MYSQLSH_CREDENTIAL_STORE_SAVE_PASSWORDS
+          value: never
+        ports:
+        - containerPort: 3306
+          name: mysql
+        - containerPort: 33060
+          name: mysqlx
+        - containerPort: 33061
+          name: gr-xcom
+        volumeMounts:
+        - name: datadir
+          mountPath: /var/lib/mysql
+        - name: rundir
+          mountPath: /var/run/mysqld
+        - name: mycnfdata
+          mountPath: /etc/my.cnf.d
+          subPath: my.cnf.d
+        - name: mycnfdata
+          mountPath: /etc/my.cnf
+          subPath: my.cnf
+        - name: initconfdir
+          mountPath: /livenessprobe.sh
+          subPath: livenessprobe.sh
+        - name: initconfdir
+          mountPath: /readinessprobe.sh
+          subPath: readinessprobe.sh
+        - name: varlibmysqlfiles
+          mountPath: /var/lib/mysql-files
+        - name: mysql-tmp
+          mountPath: /tmp
+      volumes:
+      - name: mycnfdata
+        emptyDir: {}
+      - name: rundir
+        emptyDir: {}
+      - name: varlibmysqlfiles
+        emptyDir: {}
+      - name: initconfdir
+        configMap:
+          name: mycluster-initconf
+          defaultMode: 493
+      - name: shellhome
+        emptyDir: {}
+      - name: initconf-tmp
+        emptyDir: {}
+      - name: initmysql-tmp
+        emptyDir: {}
+      - name: mysql-tmp
+        emptyDir: {}
+      - name: sidecar-tmp
+        emptyDir: {}
+      - name: rootcreds
+        secret:
+          secretName: mypwds
+          defaultMode: 256
+  volumeClaimTemplates:
+  - metadata:
+      name: datadir
+    spec:
+      accessModes:
+      - ReadWriteOnce
+      resources:
+        requests:
+          storage: 2Gi
+"""
+
+
+ROUTER_DEPLOYMENT = """\
+apiVersion: apps/v1
+kind: Deployment
+metadata:
+  name: mycluster-router
+  label:
+    tier: mysql
+    mysql.oracle.com/cluster: mycluster
+    app.kubernetes.io/name: mysql-innodbcluster
+    app.kubernetes.io/instance: mysql-innodbcluster-mycluster-router
+    app.kubernetes.io/component: router
+    app.kubernetes.io/managed-by: mysql-operator
+    app.kubernetes.io/created-by: mysql-operator
+spec:
+  replicas: 2
+  selector:
+    matchLabels:
+      component: mysqlrouter
+      tier: mysql
+      mysql.oracle.com/cluster: mycluster
+      app.kubernetes.io/name: mysql-router
+      app.kubernetes.io/instance: mysql-innodbcluster-mycluster-router
+      app.kubernetes.io/component: router
+      app.kubernetes.io/managed-by: mysql-operator
+      app.kubernetes.io/created-by: mysql-operator
+  template:
+    metadata:
+      labels:
+        component: mysqlrouter
+        tier: mysql
+        mysql.oracle.com/cluster: mycluster
+        app.kubernetes.io/name: mysql-router
+        app.kubernetes.io/instance: mysql-innodbcluster-mycluster-router
+        app.kubernetes.io/component: router
+        app.kubernetes.io/managed-by: mysql-operator
+        app.kubernetes.io/created-by: mysql-operator
+      annotations:
+        mysql.oracle.com/ca.pem.sha256: 6959097001d10501ac7d54c0bdb8db61420f658f2922cc26e46d536119a31126
+        mysql.oracle.com/crl.pem.sha256: 861aaa0731bdaea1fa598d1750466ef6210c4a1cc1e39d3ea4f3ee4f1bc9e5a2
+        mysql.oracle.com/router_tls.crt.sha256: 793ff64f83b41b5d467a0d017c4cb99bc56e969a028ca7ea65a8795724f16bd1
+        mysql.oracle.com/router_tls.key.sha256: 2c70e12b7a0646f92279f427c7b38e7334d8e5389cff167a1dc30e73f826b683
+    spec:
+      serviceAccountName: mycluster-sidecar-sa
+      securityContext:
+        runAsUser: 999
+        runAsGroup: 999
+        fsGroup: 999
+        runAsNonRoot: true
+      containers:
+      - name: router
+        image: @ROUTER_IMAGE@
+        imagePullPolicy: Always
+        securityContext:
+          allowPrivilegeEscalation: false
+          privileged: false
+          readOnlyRootFilesystem: true
+          capabilities:
+            drop:
+            - ALL
+        env:
+        - name: MYSQL_HOST
+          value: mycluster-instances.ns.svc.cluster.local
+        - name: MYSQL_PORT
+          value: '3306'
+        - name: MYSQL_USER_FILE
+          value: /.routeruser
+        - name: MYSQL_PASSWORD_FILE
+          value: /.routerpw
+        - name: MYSQL_CREATE_ROUTER_USER
+          value: '0'
+        - name: MYSQL_ROUTER_BOOTSTRAP_EXTRA_OPTIONS
+          value: --conf-set-option=DEFAULT.unknown_config_option=warning --server-ssl-ca=/router-ssl/ca/myca.pem --server-ssl-verify=VERIFY_IDENTITY --ssl-ca=/router-ssl/ca/myca.pem --client-ssl-cert=/router-ssl/key/tls.crt
+            --client-ssl-key=/router-ssl/key/tls.key
+        volumeMounts:
+        - name: tmpdir
+          mountPath: /tmp
+        - name: initconfdir
+          subPath: router-entrypoint-run.sh.tpl
+          mountPath: /run.sh
+          readOnly: true
+        - name: routercredentials
+          subPath: routerUsername
+          mountPath: /.routeruser
+          readOnly: true
+        - name: routercredentials
+          subPath: routerPassword
+          mountPath: /.routerpw
+          readOnly: true
+        - mountPath: /router-ssl/ca/
+          name: ssl-ca-data
+        - mountPath: /router-ssl/key/
+          name: ssl-key-data
+        ports:
+        - containerPort: 6446
+          name: mysqlrw
+        - containerPort: 6448
+          name: mysqlxrw
+        - containerPort: 6450
+          name: mysqlrwsplit
+        - containerPort: 6447
+          name: mysqlro
+        - containerPort: 6449
+          name: mysqlxro
+        - containerPort: 8443
+          name: http
+        readinessProbe:
+          exec:
+            command:
+            - cat
+            - /tmp/mysqlrouter/mysqlrouter.conf
+        livenessProbe:
+          failureThreshold: 3
+          httpGet:
+            path: /api/20190715/swagger.json
+            port: http
+            scheme: HTTPS
+          periodSeconds: 10
+          successThreshold: 1
+          timeoutSeconds: 1
+        args:
+        - mysqlrouter
+      volumes:
+      - name: tmpdir
+        emptyDir: {}
+      - name: initconfdir
+        configMap:
+          name: mycluster-initconf
+          defaultMode: 493
+      - name: routercredentials
+        secret:
+          secretName: mycluster-router
+          defaultMode: 288
+      - name: ssl-ca-data
+        projected:
+          sources:
+          - secret:
+              name: myca
+      - name: ssl-key-data
+        projected:
+          sources:
+          - secret:
+              name: routertls
+"""
+
+
+ROUTER_SERVICE = """\
+apiVersion: v1
+kind: Service
+metadata:
+  name: mycluster
+  namespace: ns
+  labels:
+    tier: mysql
+    mysql.oracle.com/cluster: mycluster
+spec:
+  ports:
+  - name: mysql
+    port: 3306
+    protocol: TCP
+    targetPort: 6446
+  - name: mysqlx
+    port: 33060
+    protocol: TCP
+    targetPort: 6448
+  - name: mysql-alternate
+    port: 6446
+    protocol: TCP
+    targetPort: 6446
+  - name: mysqlx-alternate
+    port: 6448
+    protocol: TCP
+    targetPort: 6448
+  - name: mysql-ro
+    port: 6447
+    protocol: TCP
+    targetPort: 6447
+  - name: mysqlx-ro
+    port: 6449
+    protocol: TCP
+    targetPort: 6449
+  - name: mysql-rw-split
+    port: 6450
+    protocol: TCP
+    targetPort: 6450
+  - name: router-rest
+    port: 8443
+    protocol: TCP
+    targetPort: 8443
+  selector:
+    component: mysqlrouter
+    tier: mysql
+    mysql.oracle.com/cluster: mycluster
+  type: ClusterIP
+"""
+
+
+STORAGE = {
+    "pvc": """\
+spec:
+  containers:
+  - name: operator-backup-job
+    image: backup:1
+    imagePullPolicy: IfNotPresent
+    env:
+    - name: DUMP_MOUNT_PATH
+      value: /mnt/storage
+    volumeMounts:
+    - name: tmp-storage
+      mountPath: /mnt/storage
+  initContainers:
+  - name: fixdumpdir
+    image: backup:1
+    imagePullPolicy: IfNotPresent
+    command:
+    - bash
+    - -c
+    - chown 27:27 /mnt/storage && chmod 0700 /mnt/storage
+    securityContext:
+      runAsUser: 0
+    volumeMounts:
+    - name: tmp-storage
+      mountPath: /mnt/storage
+  volumes:
+  - name: tmp-storage
+    persistentVolumeClaim:
+      claimName: backup-pvc
+""",
+    "oci": """\
+spec:
+  containers:
+  - name: operator-backup-job
+    image: backup:1
+    imagePullPolicy: IfNotPresent
+    env:
+    - name: OCI_USER_NAME
+      valueFrom:
+        secretKeyRef:
+          name: ocicreds
+          key: user
+    - name: OCI_FINGERPRINT
+      valueFrom:
+        secretKeyRef:
+          name: ocicreds
+          key: fingerprint
+    - name: OCI_TENANCY
+      valueFrom:
+        secretKeyRef:
+          name: ocicreds
+          key: tenancy
+    - name: OCI_REGION
+      valueFrom:
+        secretKeyRef:
+          name: ocicreds
+          key: region
+    - name: OCI_PASSPHRASE
+      valueFrom:
+        secretKeyRef:
+          name: ocicreds
+          key: passphrase
+    - name: OCI_CONFIG_NAME
+      value: /mysqlsh/oci_config
+    - name: OCI_API_KEY_NAME
+      value: /.oci/privatekey.pem
+    volumeMounts:
+    - name: privatekey-volume
+      readOnly: true
+      mountPath: /.oci
+  securityContext:
+    allowPrivilegeEscalation: false
+    privileged: false
+    readOnlyRootFilesystem: true
+    runAsNonRoot: true
+    runAsUser: 27
+    fsGroup: 27
+  volumes:
+  - name: privatekey-volume
+    secret:
+      secretName: ocicreds
+      items:
+      - key: privatekey
+        path: privatekey.pem
+        mode: 400
+""",
+    "s3": """\
+spec:
+  containers:
+  - name: operator-backup-job
+    image: backup:1
+    imagePullPolicy: IfNotPresent
+    volumeMounts:
+    - name: s3-config-volume
+      readOnly: true
+      mountPath: /mysqlsh/.aws
+  securityContext:
+    allowPrivilegeEscalation: false
+    privileged: false
+    readOnlyRootFilesystem: true
+    runAsNonRoot: true
+    runAsUser: 27
+    fsGroup: 27
+  volumes:
+  - name: s3-config-volume
+    secret:
+      secretName: s3cfg
+""",
+    "azure": """\
+spec:
+  containers:
+  - name: operator-backup-job
+    image: backup:1
+    imagePullPolicy: IfNotPresent
+    volumeMounts:
+    - name: azure-config-volume
+      readOnly: true
+      mountPath: /mysqlsh/.azure
+  securityContext:
+    allowPrivilegeEscalation: false
+    privileged: false
+    readOnlyRootFilesystem: true
+    runAsNonRoot: true
+    runAsUser: 27
+    fsGroup: 27
+  volumes:
+  - name: azure-config-volume
+    secret:
+      secretName: azcfg
+""",
+}
+
+
+def test_cluster_stateful_set(monkeypatch) -> None:
+    monkeypatch.setattr(kubeutils, "_k8s_cluster_domain", "cluster.local")
+    spec = make_cluster({"instances": 3, "secretName": "mypwds", "tlsUseSelfSigned": True}).parsed_spec
+
+    sts = cluster_objects.prepare_cluster_stateful_set(spec, getLogger())
+    assert sts == expected(STATEFULSET, spec)
+    # every call builds new objects
+    assert cluster_objects.prepare_cluster_stateful_set(spec, getLogger()) == sts
+    pod_spec = sts["spec"]["template"]["spec"]
+    assert container(pod_spec, "initmysql")["args"] is not container(pod_spec, "mysql")["args"]
+
+
+def test_cluster_stateful_set_tls(monkeypatch) -> None:
+    monkeypatch.setattr(kubeutils, "_k8s_cluster_domain", "cluster.local")
+    monkeypatch.setattr(config, "debug", 1)
+    spec = make_cluster({"instances": 3, "secretName": "mypwds", "tlsSecretName": "mytls", "tlsCASecretName": "myca",
+                         "datadirPermissions": {"setRightsUsingInitContainer": False, "fsGroupChangePolicy": "OnRootMismatch"},
+                         "readReplicas": [{"name": "rr", "instances": 1, "baseServerId": 2000}]}).parsed_spec
+
+    sts = cluster_objects.prepare_cluster_stateful_set(spec, getLogger())
+    pod_spec = sts["spec"]["template"]["spec"]
+    assert [c["name"] for c in pod_spec["initContainers"]] == ["initconf", "initmysql"]
+    assert pod_spec["securityContext"] == {"runAsUser": 27, "runAsGroup": 27, "fsGroup": 27,
+                                           "fsGroupChangePolicy": "OnRootMismatch", "runAsNonRoot": True}
+    assert pod_spec["volumes"][-1] == {"name": "ssldata", "projected": {"sources": [{"secret": {"name": "mytls"}},
+                                                                                    {"secret": {"name": "myca"}}]}}
+    assert container(pod_spec, "sidecar")["volumeMounts"][-1] == {"mountPath": "/etc/mysql-ssl", "name": "ssldata"}
+    assert container(pod_spec, "mysql")["volumeMounts"][-1] == {"mountPath": "/etc/mysql-ssl", "name": "ssldata"}
+    assert container(pod_spec, "mysql")["env"][-1] == {"name": "MYSQL_OPERATOR_DEBUG", "value": "1"}
+
+    rr_sts = cluster_objects.prepare_cluster_stateful_set(spec.readReplicas[0], getLogger())
+    assert rr_sts["metadata"]["name"] == "mycluster-rr"
+    assert rr_sts["spec"]["selector"]["matchLabels"] == {
+        "component": "mysqld",
+        "tier": "mysql",
+        "mysql.oracle.com/cluster": "mycluster",
+        "mysql.oracle.com/instance-type": "read-replica",
+        "mysql.oracle.com/read-replica": "mycluster-rr",
+        "app.kubernetes.io/name": "mysql-innodbcluster-mysql-server",
+        "app.kubernetes.io/instance": "mysql-innodbcluster-mycluster-rr-mysql-server",
+        "app.kubernetes.io/component": "database",
+        "app.kubernetes.io/managed-by": "mysql-operator",
+        "app.kubernetes.io/created-by": "mysql-operator"
+    }
+
+
+def test_keyring_stateful_set(monkeypatch) -> None:
+    monkeypatch.setattr(kubeutils, "_k8s_cluster_domain", "cluster.local")
+    spec = make_cluster({"instances": 1, "secretName": "mypwds", "tlsUseSelfSigned": True,
+                         "keyring": {"oci": {"user": "u", "keySecret": "ocikey", "keyFingerprint": "f", "tenancy": "t",
+                                             "compartment": "c", "virtualVault": "v", "masterKey": "m",
+                                             "caCertificate": "ocica"}}}).parsed_spec
+
+    pod_spec = cluster_objects.prepare_cluster_stateful_set(spec, getLogger())["spec"]["template"]["spec"]
+    manifest = spec.keyring.keyring.component_manifest_name
+    mounts = [
+        {"name": "globalcomponentconf", "mountPath": f"/usr/sbin/{spec.keyring.global_manifest_name}",
+         "subPath": spec.keyring.global_manifest_name},
+        {"name": "ocikey", "mountPath": "/.oci"},
+        {"name": "keyringfile-conf", "mountPath": f"/usr/lib64/mysql/plugin/{manifest}", "subPath": manifest},
+        {"name": "oci-keyring-ca", "mountPath": "/etc/mysql-keyring-ca"}
+    ]
+    for name in ("initmysql", "mysql"):
+        assert [m for m in container(pod_spec, name)["volumeMounts"] if m["name"] in [m["name"] for m in mounts]] == mounts
+    assert pod_spec["volumes"][-4:] == [
+        {"name": "globalcomponentconf",
+         "configMap": {"name": "mycluster-componentconf",
+                       "items": [{"key": spec.keyring.global_manifest_name, "path": spec.keyring.global_manifest_name}]}},
+        {"name": "ocikey", "secret": {"secretName": "ocikey"}},
+        {"name": "keyringfile-conf",
+         "configMap": {"name": "mycluster-componentconf", "items": [{"key": manifest, "path": manifest}]}},
+        {"name": "oci-keyring-ca", "secret": {"secretName": "ocica"}}
+    ]
+
+
+# volumeMounts of the initmysql and mysql containers and volumes each keyring
+# adds after those of the STS without keyring
+KEYRINGS = {
+    "none": ({}, [], []),
+    "file": ({"file": {"fileName": "kr", "readOnly": True, "storage": {"persistentVolumeClaim": {"claimName": "krpvc"}}}},
+             [{"name": "globalcomponentconf", "mountPath": "/usr/sbin/mysqld.my", "subPath": "mysqld.my"},
+              {"name": "keyringfile-conf", "mountPath": "/usr/lib64/mysql/plugin/component_keyring_file.cnf",
+               "subPath": "component_keyring_file.cnf"},
+              {"name": "keyringfile-storage", "mountPath": "/keyring"}],
+             [{"name": "globalcomponentconf",
+               "configMap": {"name": "mycluster-componentconf", "items": [{"key": "mysqld.my", "path": "mysqld.my"}]}},
+              {"name": "keyringfile-conf",
+               "configMap": {"name": "mycluster-componentconf",
+                             "items": [{"key": "component_keyring_file.cnf", "path": "component_keyring_file.cnf"}]}},
+              {"name": "keyringfile-storage", "persistentVolumeClaim": {"claimName": "krpvc"}}]),
+    "encryptedFile": ({"encryptedFile": {"fileName": "enc", "password": "krpw", "storage": {"secret": {"secretName": "krsecret"}}}},
+                      [{"name": "globalcomponentconf", "mountPath": "/usr/sbin/mysqld.my", "subPath": "mysqld.my"},
+                       {"name": "keyringencfile-conf",
+                        "mountPath": "/usr/lib64/mysql/plugin/component_keyring_encrypted_file.cnf",
+                        "subPath": "component_keyring_encrypted_file.cnf"},
+                       {"name": "keyringencfile-storage", "mountPath": "/keyring"}],
+                      [{"name": "globalcomponentconf",
+                        "configMap": {"name": "mycluster-componentconf", "items": [{"key": "mysqld.my", "path": "mysqld.my"}]}},
+                       {"name": "keyringencfile-conf",
+                        "secret": {"secretName": "mycluster-componentconf",
+                                   "items": [{"key": "component_keyring_encrypted_file.cnf",
+                                              "path": "component_keyring_encrypted_file.cnf"}]}},
+                       {"name": "keyringencfile-storage", "secret": {"secretName": "krsecret"}}]),
+}
+
+
+def test_keyring_stateful_set_volumes(monkeypatch) -> None:
+    monkeypatch.setattr(kubeutils, "_k8s_cluster_domain", "cluster.local")
+    # the encrypted file keyring reads its password when the spec is parsed
+    password = SimpleNamespace(data={"keyring_password": base64.b64encode(b"pw").decode("ascii")})
+    monkeypatch.setattr(cluster_api, "api_core",
+                        SimpleNamespace(read_namespaced_secret=lambda name, namespace: password))
+
+    base = expected(STATEFULSET, make_cluster({"instances": 3, "secretName": "mypwds",
+                                               "tlsUseSelfSigned": True}).parsed_spec)["spec"]["template"]["spec"]
+    for keyring, (keyring_spec, mounts, volumes) in KEYRINGS.items():
+        spec = {"instances": 1, "secretName": "mypwds", "tlsUseSelfSigned": True}
+        if keyring_spec:
+            spec["keyring"] = keyring_spec
+        pod_spec = cluster_objects.prepare_cluster_stateful_set(make_cluster(spec).parsed_spec,
+                                                                getLogger())["spec"]["template"]["spec"]
+
+        for name in ("initmysql", "mysql"):
+            assert container(pod_spec, name)["volumeMounts"] == container(base, name)["volumeMounts"] + mounts, keyring
+        assert pod_spec["volumes"] == base["volumes"] + volumes, keyring
+
+
+def test_initconf() -> None:
+    cluster = make_cluster({"instances": 1, "secretName": "mypwds", "mycnf": "[mysqld]\nmax_connections=200\n\n\n"})
+    data = cluster_objects.prepare_initconf(cluster, cluster.parsed_spec, getLogger())["data"]
+
+    assert list(data.keys()) == ["initdb-localroot.sql", "readinessprobe.sh", "livenessprobe.sh",
+                                 "router-entrypoint-run.sh.tpl", "my.cnf.in", "00-basic.cnf",
+                                 "01-group_replication.cnf", "02-ssl.cnf", "99-extra.cnf"]
+    assert "log_bin=mycluster\n" in data["01-group_replication.cnf"]
+    assert data["02-ssl.cnf"] == """\
+# SSL configurations
+# Do not edit.
+[mysqld]
+ssl-ca=/etc/mysql-ssl/myca.pem
+# ssl-crl=/etc/mysql-ssl/crl.pem
+ssl-cert=/etc/mysql-ssl/tls.crt
+ssl-key=/etc/mysql-ssl/tls.key
+
+loose_group_replication_recovery_use_ssl=1
+loose_group_replication_recovery_ssl_verify_server_cert=1
+
+loose_group_replication_recovery_ssl_ca=/etc/mysql-ssl/myca.pem
+## loose_group_replication_recovery_ssl_crl=/etc/mysql-ssl/crl.pem
+loose_group_replication_recovery_ssl_cert=/etc/mysql-ssl/tls.crt
+loose_group_replication_recovery_ssl_key=/etc/mysql-ssl/tls.key
+"""
+    assert data["99-extra.cnf"] == """\
+# Additional user configurations taken from spec.mycnf in InnoDBCluster.
+# Do not edit directly.
+[mysqld]
+max_connections=200
+"""
+
+
+def test_router_manifests(monkeypatch) -> None:
+    monkeypatch.setattr(kubeutils, "_k8s_cluster_domain", "cluster.local")
+    cluster = make_cluster({"instances": 2, "secretName": "mypwds", "tlsSecretName": "mytls", "tlsCASecretName": "myca",
+                            "router": {"instances": 2, "tlsSecretName": "routertls"}})
+    spec = cluster.parsed_spec
+
+    assert router_objects.prepare_router_deployment(cluster, getLogger()) == expected(ROUTER_DEPLOYMENT, spec)
+    assert router_objects.prepare_router_deployment(cluster, getLogger(), init_only=True)["spec"]["replicas"] == 0
+    assert router_objects.prepare_router_service(spec) == expected(ROUTER_SERVICE, spec)
+
+
+def test_storage_pod_spec() -> None:
+    for name, storage, data in (("pvc", PVCStorageSpec(), {"claimName": "backup-pvc"}),
+                                ("oci", OCIOSStorageSpec(), {"bucketName": "b", "prefix": "p", "credentials": "ocicreds"}),
+                                ("s3", S3StorageSpec(), {"bucketName": "b", "config": "s3cfg"}),
+                                ("azure", AzureBlobStorageSpec(), {"containerName": "c", "config": "azcfg"})):
+        storage.parse(data, "spec.storage")
+        pod_spec = {"spec": {"containers": [{"name": "operator-backup-job", "image": "backup:1",
+                                             "imagePullPolicy": "IfNotPresent"}]}}
+        storage.add_to_pod_spec(pod_spec, "operator-backup-job")
+        assert pod_spec == yaml.safe_load(STORAGE[name]), name
@@ -0,0 +1,122 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+import asyncio
+import inspect
+import threading
+import urllib.request
+from .controller import metrics
+from .controller.executors import HandlerExecutor, run_in
+from .controller.metrics import Registry, Counter, Gauge, Histogram, MetricsServer
+from .controller.kubeutils import api_request_labels
+
+
+def test_metrics_render() -> None:
+    registry = Registry()
+    counter = Counter("test_events_total", "Events", ("kind",), registry=registry)
+    gauge = Gauge("test_online", "Online \"members\"", ("namespace", "cluster"), registry=registry)
+    histogram = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1), registry=registry)
+
+    counter.inc("pod")
+    counter.inc("pod", amount=2)
+    gauge.set("ns", 'my"cluster', value=3)
+    histogram.observe(value=0.05)
+    histogram.observe(value=0.5)
+    histogram.observe(value=5)
+
+    assert counter.get("pod") == 3
+    assert histogram.get_count() == 3
+    assert registry.render() == """\
+# HELP test_events_total Events
+# TYPE test_events_total counter
+test_events_total{kind="pod"} 3
+# HELP test_online Online \\"members\\"
+# TYPE test_online gauge
+test_online{namespace="ns",cluster="my\\"cluster"} 3
+# HELP test_latency_seconds Latency
+# TYPE test_latency_seconds histogram
+test_latency_seconds_bucket{le="0.1"} 1
+test_latency_seconds_bucket{le="1"} 2
+test_latency_seconds_bucket{le="+Inf"} 3
+test_latency_seconds_sum 5.55
+test_latency_seconds_count 3
+"""
+
+
+def test_metrics_remove() -> None:
+    registry = Registry()
+    gauge = Gauge("test_status", "Status", ("namespace", "cluster", "status"), registry=registry)
+    gauge.set("ns", "a", "ONLINE", value=1)
+    gauge.set("ns", "b", "ONLINE", value=1)
+    gauge.set("other", "a", "OFFLINE", value=1)
+
+    gauge.remove_matching(namespace="ns", cluster="a")
+    assert gauge.get("ns", "a", "ONLINE") is None
+    assert gauge.get("ns", "b", "ONLINE") == 1
+    gauge.remove("other", "a", "OFFLINE")
+    assert gauge.get("other", "a", "OFFLINE") is None
+
+    try:
+        gauge.set("ns", value=1)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_api_request_labels() -> None:
+    assert api_request_labels("GET", "https://k8s/api/v1/namespaces/ns/pods?labelSelector=a") == ("list", "pods")
+    assert api_request_labels("GET", "https://k8s/api/v1/namespaces/ns/pods/p-0") == ("get", "pods")
+    assert api_request_labels("GET", "https://k8s/api/v1/pods?watch=True") == ("watch", "pods")
+    assert api_request_labels("GET", "https://k8s/api/v1/pods", [("watch", True)]) == ("watch", "pods")
+    assert api_request_labels("PATCH", "https://k8s/api/v1/namespaces/ns/pods/p-0/status") == ("patch", "pods/status")
+    assert api_request_labels("POST", "https://k8s/apis/apps/v1/namespaces/ns/statefulsets") == ("create", "statefulsets")
+    assert api_request_labels("GET", "https://k8s/api/v1/namespaces/ns") == ("get", "namespaces")
+
+
+def test_timed_handler_and_server() -> None:
+    @metrics.timed_handler()
+    def test_handler(fail: bool, **kwargs) -> str:
+        if fail:
+            raise RuntimeError("error")
+        return "ok"
+
+    assert test_handler.__name__ == "test_handler"
+    assert test_handler(False) == "ok"
+    try:
+        test_handler(True)
+        assert False
+    except RuntimeError:
+        pass
+    assert metrics.handler_duration.get_count("test_handler") == 2
+    assert metrics.handler_errors.get("test_handler") == 1
+
+    server = MetricsServer(0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as resp:
+            text = resp.read().decode("utf-8")
+        assert 'mysql_operator_handler_errors_total{handler="test_handler"} 1' in text
+    finally:
+        server.stop()
+
+
+def test_handler_executor() -> None:
+    executor = HandlerExecutor("test-pool", 2)
+
+    @metrics.timed_handler()
+    @run_in(executor)
+    def test_async_handler(value: int, **kwargs) -> str:
+        assert threading.current_thread().name.startswith("test-pool")
+        return f"ok {value}"
+
+    assert test_async_handler.__name__ == "test_async_handler"
+    assert inspect.iscoroutinefunction(test_async_handler.__wrapped__)
+    assert asyncio.run(test_async_handler(value=1)) == "ok 1"
+    assert metrics.handler_duration.get_count("test_async_handler") == 1
+    assert metrics.handler_executor_workers.get("test-pool") == 2
+    assert metrics.handler_executor_queued.get("test-pool") == 0
+    assert metrics.handler_executor_active.get("test-pool") == 0
+    assert metrics.handler_executor_wait.get_count("test-pool") == 1
+    executor.shutdown()
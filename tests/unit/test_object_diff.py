@@ -0,0 +1,92 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+import copy
+from .controller.utils import diff_objects, managed_fields_subset, merge_objects, object_contains, has_path
+
+LIVE = {
+    "metadata": {"labels": {"app": "mysql"}, "annotations": {}},
+    "spec": {
+        "replicas": 3,
+        "template": {
+            "metadata": {"annotations": {"kubectl.kubernetes.io/restartedAt": "2024-01-01T00:00:00Z"}},
+            "spec": {
+                "containers": [
+                    {"name": "sidecar", "image": "operator:1", "ports": [{"containerPort": 2020}]},
+                    {"name": "mysql", "image": "server:1", "args": ["--a"]}
+                ],
+                "terminationGracePeriodSeconds": 120
+            }
+        }
+    }
+}
+
+
+def test_diff_objects() -> None:
+    assert diff_objects(LIVE, copy.deepcopy(LIVE)) == ({}, [])
+
+    desired = copy.deepcopy(LIVE)
+    desired["spec"]["replicas"] = 5
+    desired["spec"]["template"]["spec"]["containers"][1]["image"] = "server:2"
+    del desired["spec"]["template"]["spec"]["terminationGracePeriodSeconds"]
+    desired["metadata"]["annotations"]["new"] = "x"
+
+    changed, removed = diff_objects(LIVE, desired)
+    # lists are whole
+    assert changed == {
+        "metadata": {"annotations": {"new": "x"}},
+        "spec": {
+            "replicas": 5,
+            "template": {"spec": {"containers": desired["spec"]["template"]["spec"]["containers"]}}
+        }
+    }
+    assert removed == [("spec", "template", "spec", "terminationGracePeriodSeconds")]
+
+
+def test_managed_fields_subset() -> None:
+    fields = {
+        "f:metadata": {"f:labels": {"f:app": {}}},
+        "f:spec": {
+            "f:replicas": {},
+            "f:template": {
+                "f:metadata": {"f:annotations": {"f:kubectl.kubernetes.io/restartedAt": {}}},
+                "f:spec": {
+                    "f:containers": {
+                        'k:{"name":"mysql"}': {".": {}, "f:image": {}, "f:name": {}, "f:args": {}},
+                        'k:{"name":"gone"}': {".": {}, "f:image": {}}
+                    }
+                }
+            }
+        }
+    }
+    assert managed_fields_subset(LIVE, fields) == {
+        "metadata": {"labels": {"app": "mysql"}},
+        "spec": {
+            "replicas": 3,
+            "template": {
+                "metadata": {"annotations": {"kubectl.kubernetes.io/restartedAt": "2024-01-01T00:00:00Z"}},
+                "spec": {"containers": [{"name": "mysql", "image": "server:1", "args": ["--a"]}]}
+            }
+        }
+    }
+    assert managed_fields_subset({"finalizers": ["a", "b"]}, {"f:finalizers": {'v:"b"': {}}}) == {"finalizers": ["b"]}
+
+
+def test_merge_and_compare_objects() -> None:
+    body = {"spec": {"template": {"spec": {"containers": [{"name": "mysql"}]}}}}
+    merge_objects(body, {"spec": {"replicas": 1, "template": {"spec": {"containers": [{"name": "sidecar"}]}}}})
+    assert body == {"spec": {"replicas": 1, "template": {"spec": {"containers": [{"name": "sidecar"}]}}}}
+
+    with_defaults = copy.deepcopy(LIVE)
+    with_defaults["spec"]["template"]["spec"]["containers"][0]["imagePullPolicy"] = "Always"
+    assert object_contains(with_defaults, LIVE)
+    assert not object_contains(LIVE, with_defaults)
+
+    one_container = copy.deepcopy(LIVE)
+    del one_container["spec"]["template"]["spec"]["containers"][0]
+    assert not object_contains(LIVE, one_container)
+
+    assert has_path(LIVE, ("spec", "template", "spec", "terminationGracePeriodSeconds"))
+    assert not has_path(LIVE, ("spec", "replicas", "x"))
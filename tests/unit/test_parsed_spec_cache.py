@@ -0,0 +1,51 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+import copy
+from .controller.innodbcluster.cluster_api import InnoDBCluster, ParsedSpecCache, g_parsed_spec_cache
+
+CLUSTER = {
+    "metadata": {"name": "mycluster", "namespace": "ns", "uid": "1234", "generation": 1},
+    "spec": {"instances": 3, "secretName": "mypwds", "tlsUseSelfSigned": True}
+}
+
+
+def test_parsed_spec_reuse() -> None:
+    spec = InnoDBCluster(copy.deepcopy(CLUSTER)).parsed_spec
+    assert spec.instances == 3
+    assert InnoDBCluster(copy.deepcopy(CLUSTER)).parsed_spec is spec
+
+    changed = copy.deepcopy(CLUSTER)
+    changed["metadata"]["generation"] = 2
+    changed["spec"]["instances"] = 5
+    assert InnoDBCluster(changed).parsed_spec.instances == 5
+    # only the latest generation is kept
+    assert g_parsed_spec_cache.get("1234", 1) is None
+
+    g_parsed_spec_cache.invalidate("1234")
+    assert g_parsed_spec_cache.get("1234", 2) is None
+
+    # without a uid nothing is cached
+    no_uid = copy.deepcopy(CLUSTER)
+    del no_uid["metadata"]["uid"]
+    assert InnoDBCluster(no_uid).parsed_spec is not InnoDBCluster(copy.deepcopy(no_uid)).parsed_spec
+
+
+def test_parsed_spec_cache_lru() -> None:
+    cache = ParsedSpecCache(max_size=2)
+    cache.put("a", 1, "spec-a")
+    cache.put("b", 1, "spec-b")
+    assert cache.get("a", 1) == "spec-a"
+    cache.put("c", 1, "spec-c")
+    # b was the least recently used
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == "spec-a"
+    assert cache.get("c", 1) == "spec-c"
+
+    # an older generation doesn't replace a newer one
+    cache.put("a", 3, "spec-a3")
+    cache.put("a", 2, "spec-a2")
+    assert cache.get("a", 3) == "spec-a3"
+    assert cache.get("a", 2) is None
@@ -0,0 +1,145 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from types import SimpleNamespace
+from .controller.innodbcluster import pod_cache
+from .controller.innodbcluster.pod_cache import PodCache, pod_cache_key
+from .controller.kubeutils import client as api_client, ApiException
+import json
+import pytest
+
+
+def make_pod(ns: str, name: str, labels: dict) -> api_client.V1Pod:
+    return api_client.V1Pod(metadata=api_client.V1ObjectMeta(
+        namespace=ns, name=name, labels=labels, resource_version="1"))
+
+
+def test_pod_cache_key() -> None:
+    pod = make_pod("ns", "mycluster-0", {"mysql.oracle.com/cluster": "mycluster"})
+    assert pod_cache_key(pod) == ("ns", "mycluster", "group-member", None)
+
+    pod = make_pod("ns", "mycluster-rr-0", {"mysql.oracle.com/cluster": "mycluster",
+                                            "mysql.oracle.com/instance-type": "read-replica",
+                                            "mysql.oracle.com/read-replica": "rr"})
+    assert pod_cache_key(pod) == ("ns", "mycluster", "read-replica", "rr")
+
+    assert pod_cache_key(make_pod("ns", "other", {})) is None
+
+
+def test_pod_cache_not_synced() -> None:
+    cache = PodCache()
+    cache._store(make_pod("ns", "mycluster-0", {"mysql.oracle.com/cluster": "mycluster"}))
+
+    assert cache.get_pods("ns", "mycluster") is None
+    assert cache.get_pod("ns", "mycluster-0") is None
+
+
+def test_pod_cache_store_and_forget() -> None:
+    cache = PodCache()
+    cache.synced.set()
+
+    member = make_pod("ns", "mycluster-0", {"mysql.oracle.com/cluster": "mycluster"})
+    replica = make_pod("ns", "mycluster-rr-0", {"mysql.oracle.com/cluster": "mycluster",
+                                                "mysql.oracle.com/instance-type": "read-replica",
+                                                "mysql.oracle.com/read-replica": "rr"})
+    cache._store(member)
+    cache._store(replica)
+    cache._store(make_pod("other", "mycluster-0", {"mysql.oracle.com/cluster": "mycluster"}))
+
+    assert cache.get_pods("ns", "mycluster") == [member]
+    assert cache.get_pods("ns", "mycluster", "read-replica", "rr") == [replica]
+    assert cache.get_pod("ns", "mycluster-rr-0") is replica
+
+    # an update replaces the previous version of the pod
+    updated = make_pod("ns", "mycluster-0", {"mysql.oracle.com/cluster": "mycluster"})
+    cache._store(updated)
+    assert cache.get_pods("ns", "mycluster") == [updated]
+    assert cache.get_pod("ns", "mycluster-0") is updated
+
+    cache._forget(updated)
+    assert cache.get_pods("ns", "mycluster") == []
+    assert cache.get_pod("ns", "mycluster-0") is None
+    assert len(cache.get_pods("other", "mycluster")) == 1
+
+
+def pod_json(name: str, rv: str) -> dict:
+    return {"apiVersion": "v1", "kind": "Pod",
+            "metadata": {"namespace": "ns", "name": name, "resourceVersion": rv,
+                         "labels": {"mysql.oracle.com/cluster": "mycluster"}}}
+
+
+class FakePoolManager:
+    """Serves the LIST and WATCH of pods below the client's serialization."""
+
+    def __init__(self, items: list, events: list) -> None:
+        self.items = items
+        self.events = events
+        self.requests = []
+
+    def request(self, method: str, url: str, **kwargs) -> SimpleNamespace:
+        query = dict(kwargs["fields"])
+        self.requests.append(query)
+        if query.get("watch"):
+            data = "".join(json.dumps(event) + "\n" for event in self.events).encode("utf-8")
+        else:
+            data = json.dumps({"kind": "PodList", "metadata": {"resourceVersion": "10"},
+                               "items": self.items}).encode("utf-8")
+        return SimpleNamespace(status=200, reason="OK", data=data,
+                               stream=lambda amt=None, decode_content=False: iter([data]),
+                               close=lambda: None, release_conn=lambda: None,
+                               getheaders=lambda: {}, getheader=lambda name, default=None: default)
+
+
+def test_pod_cache_list_and_watch(monkeypatch) -> None:
+    pool = FakePoolManager([pod_json("mycluster-0", "5"), pod_json("mycluster-1", "6")],
+                           [{"type": "MODIFIED", "object": pod_json("mycluster-0", "11")},
+                            {"type": "DELETED", "object": pod_json("mycluster-1", "12")},
+                            {"type": "ADDED", "object": pod_json("mycluster-2", "13")}])
+    monkeypatch.setattr(pod_cache.api_core.api_client.rest_client, "pool_manager", pool)
+
+    cache = PodCache()
+    cache._relist()
+    assert cache.resource_version == "10"
+    assert sorted(pod.metadata.name for pod in cache.get_pods("ns", "mycluster")) == ["mycluster-0", "mycluster-1"]
+
+    cache._watch()
+    watch_query = pool.requests[1]
+    assert watch_query["resourceVersion"] == "10"
+    assert watch_query["labelSelector"] == "component=mysqld"
+    assert cache.resource_version == "13"
+    assert sorted(pod.metadata.name for pod in cache.get_pods("ns", "mycluster")) == ["mycluster-0", "mycluster-2"]
+    assert cache.get_pod("ns", "mycluster-0").metadata.resource_version == "11"
+
+    pool.events = [{"type": "ERROR", "object": {"kind": "Status", "code": 410, "reason": "Expired",
+                                                "message": "too old resource version"}}]
+    with pytest.raises(ApiException) as e:
+        cache._watch()
+    assert e.value.status == 410
+
+
+def test_pod_cache_watch_errors(monkeypatch) -> None:
+    cache = PodCache()
+    calls = []
+    errors = [ApiException(status=500, reason="Internal Error"), ApiException(status=410, reason="Gone")]
+
+    def relist() -> None:
+        calls.append("list")
+        cache.synced.set()
+
+    def watch() -> None:
+        calls.append("watch")
+        if errors:
+            raise errors.pop(0)
+        cache.stopped = True
+
+    sleeps = []
+    monkeypatch.setattr(cache, "_relist", relist)
+    monkeypatch.setattr(cache, "_watch", watch)
+    monkeypatch.setattr(pod_cache.time, "sleep", sleeps.append)
+    cache.run()
+
+    # other errors back off and resume the watch, only an expired watch relists
+    assert calls == ["list", "watch", "watch", "list", "watch"]
+    assert sleeps == [pod_cache.k_retry_interval]
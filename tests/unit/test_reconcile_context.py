@@ -0,0 +1,47 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+import contextvars
+import threading
+from .controller import reconcile_context
+
+
+def test_reconcile_context() -> None:
+    reads = []
+
+    def read():
+        reads.append(1)
+        return {"data": {"a": "1"}}
+
+    # without a context nothing is memoized
+    reconcile_context.memoized("ConfigMap", "ns", "cm", read)
+    reconcile_context.memoized("ConfigMap", "ns", "cm", read)
+    assert len(reads) == 2
+
+    reads.clear()
+    with reconcile_context.reconcile() as context:
+        cm = reconcile_context.memoized("ConfigMap", "ns", "cm", read)
+        # changes of the callers are not seen by the others
+        cm["data"]["a"] = "2"
+        assert reconcile_context.memoized("ConfigMap", "ns", "cm", read) == {"data": {"a": "1"}}
+        assert len(reads) == 1
+
+        reconcile_context.refresh("ConfigMap", "ns", "cm", cm)
+        assert reconcile_context.memoized("ConfigMap", "ns", "cm", read) == {"data": {"a": "2"}}
+        reconcile_context.refresh("ConfigMap", "ns", "cm", None)
+        assert reconcile_context.memoized("ConfigMap", "ns", "cm", read) is None
+        reconcile_context.forget("ConfigMap", "ns", "cm")
+        assert reconcile_context.memoized("ConfigMap", "ns", "cm", read) == {"data": {"a": "1"}}
+        assert len(reads) == 2
+
+        # threads see it with a copy of the context
+        thread = threading.Thread(target=contextvars.copy_context().run,
+                                  args=(reconcile_context.memoized, "ConfigMap", "ns", "cm", read))
+        thread.start()
+        thread.join()
+        assert len(reads) == 2
+        assert (context.hits, context.misses) == (4, 2)
+
+    assert reconcile_context.g_reconcile_context.get() is None
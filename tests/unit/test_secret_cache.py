@@ -0,0 +1,130 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from kubernetes import client as api_client
+from kubernetes.client.rest import ApiException
+from .controller import secret_cache
+from .controller.secret_cache import SecretCache, SecretWatch
+import base64
+import pytest
+
+
+def secret(name: str, rv: str, password: str) -> api_client.V1Secret:
+    return api_client.V1Secret(
+        metadata=api_client.V1ObjectMeta(namespace="ns", name=name, resource_version=rv),
+        data={"password": base64.b64encode(password.encode("ascii")).decode("ascii")})
+
+
+class FakeApi:
+    def __init__(self, secrets: dict) -> None:
+        self.secrets = secrets
+        self.reads = 0
+        self.field_selectors = []
+
+    def read_namespaced_secret(self, name: str, ns: str) -> api_client.V1Secret:
+        self.reads += 1
+        if name not in self.secrets:
+            raise ApiException(status=404, reason="Not Found")
+        return self.secrets[name]
+
+    def list_namespaced_secret(self, ns: str, field_selector: str) -> api_client.V1SecretList:
+        self.field_selectors.append(field_selector)
+        name = field_selector.split("=", 1)[1]
+        items = [self.secrets[name]] if name in self.secrets else []
+        return api_client.V1SecretList(metadata=api_client.V1ListMeta(resource_version="10"), items=items)
+
+
+def watched(cache: SecretCache, name: str) -> SecretWatch:
+    # register the watch like get() does, without running its thread
+    w = SecretWatch(cache, "ns", name)
+    cache.watches[w.key] = w
+    return w
+
+
+def test_secret_cache_not_started(monkeypatch) -> None:
+    api = FakeApi({"mycluster-router": secret("mycluster-router", "1", "a")})
+    monkeypatch.setattr(secret_cache, "api_core", api)
+
+    cache = SecretCache()
+    assert cache.get("ns", "mycluster-router")["password"] == "a"
+    assert cache.get("ns", "mycluster-router")["password"] == "a"
+    assert api.reads == 2
+    assert not cache.watches
+
+    with pytest.raises(ApiException) as e:
+        cache.get("ns", "mycluster-backup")
+    assert e.value.status == 404
+
+
+def test_secret_cache_watch(monkeypatch) -> None:
+    api = FakeApi({"mycluster-router": secret("mycluster-router", "1", "a")})
+    monkeypatch.setattr(secret_cache, "api_core", api)
+
+    cache = SecretCache()
+    w = watched(cache, "mycluster-router")
+
+    # reads go to the API server until the LIST was loaded
+    assert cache.get("ns", "mycluster-router")["password"] == "a"
+    assert api.reads == 1
+
+    w.load()
+    assert api.field_selectors == ["metadata.name=mycluster-router"]
+    assert w.resource_version == "10"
+    assert cache.get("ns", "mycluster-router")["password"] == "a"
+    assert api.reads == 1
+
+    w.handle({"type": "MODIFIED", "object": secret("mycluster-router", "11", "b")})
+    assert cache.get("ns", "mycluster-router")["password"] == "b"
+    assert w.resource_version == "11"
+
+    w.handle({"type": "DELETED", "object": secret("mycluster-router", "12", "b")})
+    with pytest.raises(ApiException) as e:
+        cache.get("ns", "mycluster-router")
+    assert e.value.status == 404
+    assert api.reads == 1
+
+    with pytest.raises(ApiException):
+        w.handle({"type": "ERROR", "raw_object": {"code": 410, "message": "Gone"}})
+
+    # a failed watch drops the secret until it's listed again
+    cache._unloaded(w)
+    assert cache.get("ns", "mycluster-router")["password"] == "a"
+    assert api.reads == 2
+
+
+def test_secret_cache_missing(monkeypatch) -> None:
+    api = FakeApi({})
+    monkeypatch.setattr(secret_cache, "api_core", api)
+
+    cache = SecretCache()
+    w = watched(cache, "mycluster-router-tls")
+    w.load()
+    with pytest.raises(ApiException) as e:
+        cache.get("ns", "mycluster-router-tls")
+    assert e.value.status == 404
+    assert api.reads == 0
+
+    w.handle({"type": "ADDED", "object": secret("mycluster-router-tls", "11", "c")})
+    assert cache.get("ns", "mycluster-router-tls")["password"] == "c"
+
+
+def test_secret_cache_invalidate(monkeypatch) -> None:
+    api = FakeApi({"mycluster-router": secret("mycluster-router", "1", "a")})
+    monkeypatch.setattr(secret_cache, "api_core", api)
+
+    cache = SecretCache()
+    w = watched(cache, "mycluster-router")
+    w.load()
+
+    cache.invalidate("ns", "mycluster-router")
+    assert w.stopped
+    assert not cache.watches
+    assert not cache.secrets
+
+    # events of the stopped watch don't refill the cache
+    w.handle({"type": "MODIFIED", "object": secret("mycluster-router", "11", "b")})
+    assert not cache.secrets
+    assert cache.get("ns", "mycluster-router")["password"] == "a"
+    assert api.reads == 1
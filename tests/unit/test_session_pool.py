@@ -0,0 +1,92 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+from types import SimpleNamespace
+from .controller import metrics, session_pool
+from .controller.session_pool import SessionPool
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class FakeDba:
+    def __init__(self) -> None:
+        self.session = SimpleNamespace(closed=False)
+        self.session.close = lambda: setattr(self.session, "closed", True)
+        self.session.run_sql = lambda sql: None
+
+
+def fake_pod(name: str, ip: str = "10.0.0.1") -> SimpleNamespace:
+    return SimpleNamespace(namespace="ns", cluster_name="mycluster",
+                           endpoint=f"{name}.mycluster-instances.ns.svc.cluster.local:3306",
+                           endpoint_co={"user": "mysqladmin"}, pod_ip_address=ip,
+                           get_membership_info=lambda field: None)
+
+
+def test_session_pool_reuse(monkeypatch) -> None:
+    monkeypatch.setattr(session_pool.mysqlsh, "connect_dba", lambda target: FakeDba(), raising=False)
+    pool = SessionPool()
+    pod = fake_pod("mycluster-0")
+
+    with pool.dba(pod, logger) as dba:
+        pass
+    with pool.dba(pod, logger) as dba2:
+        assert dba2 is dba
+
+    # the pod was recreated with another IP address
+    with pool.dba(fake_pod("mycluster-0", "10.0.0.2"), logger) as dba3:
+        assert dba3 is not dba
+    assert dba.session.closed
+
+
+def test_session_pool_invalidated_pruned(monkeypatch) -> None:
+    monkeypatch.setattr(session_pool.mysqlsh, "connect_dba", lambda target: FakeDba(), raising=False)
+    pool = SessionPool()
+    pod0 = fake_pod("mycluster-0")
+    pod1 = fake_pod("mycluster-1")
+
+    key0, old0 = pool.acquire(pod0, logger)
+    with pool.dba(pod1, logger) as idle1:
+        pass
+
+    # an invalidation is only kept while sessions opened before it are around
+    pool.invalidate("ns", "mycluster", pod1.endpoint)
+    assert idle1.session.closed
+    assert not pool.invalidated
+
+    time.sleep(0.01)
+    pool.invalidate("ns", "mycluster")
+    assert list(pool.invalidated) == ["ns/mycluster"]
+
+    with pool.dba(pod0, logger) as new0:
+        assert new0 is not old0.dba
+    assert list(pool.invalidated) == ["ns/mycluster"]
+
+    pool.release(key0, old0)
+    assert old0.dba.session.closed
+    assert not pool.invalidated
+    assert not pool.lent
+
+
+def test_session_pool_overflow(monkeypatch) -> None:
+    monkeypatch.setattr(session_pool.mysqlsh, "connect_dba", lambda target: FakeDba(), raising=False)
+    monkeypatch.setattr(session_pool.config, "SESSION_POOL_MAX_PER_TARGET", 1)
+    monkeypatch.setattr(session_pool.config, "SESSION_POOL_ACQUIRE_TIMEOUT", 0)
+    overflow = metrics.session_pool_overflow.get("unknown")
+    pool = SessionPool()
+    pod = fake_pod("mycluster-0")
+
+    key, first = pool.acquire(pod, logger)
+    # the limit is soft, an extra session is opened once the wait timed out
+    with pool.dba(pod, logger) as extra:
+        assert extra is not first.dba
+    assert metrics.session_pool_overflow.get("unknown") == overflow + 1
+    # with the first session still in use, the extra one isn't kept
+    assert extra.session.closed
+
+    pool.release(key, first)
+    assert not first.dba.session.closed
+    assert pool.idle[key] == [first]
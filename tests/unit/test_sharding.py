@@ -0,0 +1,102 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+import datetime
+import json
+import time
+from types import SimpleNamespace
+import kopf
+from .controller import sharding
+from .controller.sharding import shard_owner, ShardCoordinator
+
+CLUSTERS = [("ns", f"cluster{i}") for i in range(200)]
+
+
+def test_shard_owner() -> None:
+    members = ["op-a", "op-b", "op-c"]
+    owners = {c: shard_owner(members, *c) for c in CLUSTERS}
+    # independent of the order of the members
+    assert owners == {c: shard_owner(list(reversed(members)), *c) for c in CLUSTERS}
+    assert set(owners.values()) == set(members)
+    assert shard_owner([], "ns", "cluster0") is None
+
+    # only the clusters of the member that left move
+    remaining = ["op-a", "op-c"]
+    for c in CLUSTERS:
+        if owners[c] != "op-b":
+            assert shard_owner(remaining, *c) == owners[c]
+        else:
+            assert shard_owner(remaining, *c) in remaining
+
+
+def test_shard_coordinator_owns() -> None:
+    coordinator = ShardCoordinator("op-a", "mysql-operator", lease_duration=15)
+    coordinator.members = ["op-a", "op-b"]
+    owned = [c for c in CLUSTERS if shard_owner(coordinator.members, *c) == "op-a"]
+    assert owned
+
+    # nothing is owned without a renewed Lease
+    assert not coordinator.owns(*owned[0])
+    coordinator.last_renew = time.monotonic()
+    assert all(coordinator.owns(*c) for c in owned)
+    assert not any(coordinator.owns(*c) for c in CLUSTERS if c not in owned)
+
+    coordinator.last_renew = time.monotonic() - 16
+    assert not coordinator.owns(*owned[0])
+
+
+def lease(holder: str, renew_time: datetime.datetime, members: list) -> SimpleNamespace:
+    return SimpleNamespace(
+        metadata=SimpleNamespace(annotations={sharding.k_members_annotation: json.dumps(members)}),
+        spec=SimpleNamespace(holder_identity=holder, renew_time=renew_time, lease_duration_seconds=15))
+
+
+def test_shard_coordinator_handover(monkeypatch) -> None:
+    # op-b's clock is a day behind, that doesn't make its Lease expired
+    behind = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    leases = [lease("op-a", behind, ["op-a"]), lease("op-b", behind, [])]
+    monkeypatch.setattr(sharding.api_coordination, "list_namespaced_lease",
+                        lambda *args, **kwargs: SimpleNamespace(items=leases))
+    rebalances = []
+    coordinator = ShardCoordinator("op-b", "mysql-operator", lease_duration=15)
+    coordinator.add_listener(lambda old, new: rebalances.append((old, new)))
+    coordinator.last_renew = time.monotonic()
+    moved = [c for c in CLUSTERS if shard_owner(["op-a", "op-b"], *c) == "op-b"]
+
+    assert coordinator.refresh_members()
+    assert coordinator.members == ["op-a", "op-b"]
+    # op-a still acts on all the clusters
+    assert not any(coordinator.owns(*c) for c in moved)
+
+    # op-a released them
+    leases[0] = lease("op-a", behind + datetime.timedelta(seconds=5), ["op-a", "op-b"])
+    assert not coordinator.refresh_members()
+    assert all(coordinator.owns(*c) for c in moved)
+    assert rebalances == [([], ["op-a", "op-b"]), (["op-a", "op-b"], ["op-a", "op-b"])]
+
+    # op-a stopped renewing its Lease for the lease duration
+    coordinator.observed_renewals["op-a"] = (leases[0].spec.renew_time, time.monotonic() - 16)
+    assert coordinator.refresh_members()
+    assert coordinator.members == ["op-b"]
+    assert all(coordinator.owns(*c) for c in CLUSTERS)
+
+
+def test_ensure_owned() -> None:
+    coordinator = ShardCoordinator("op-a", "mysql-operator", lease_duration=15)
+    coordinator.members = ["op-a", "op-b"]
+    coordinator.last_renew = time.monotonic()
+    not_owned = next(c for c in CLUSTERS if shard_owner(coordinator.members, *c) == "op-b")
+    owned = next(c for c in CLUSTERS if shard_owner(coordinator.members, *c) == "op-a")
+    sharding.g_shard_coordinator = coordinator
+    try:
+        sharding.ensure_owned(*owned)
+        sharding.ensure_owned("ns", None)
+        try:
+            sharding.ensure_owned(*not_owned)
+            assert False
+        except kopf.TemporaryError:
+            pass
+    finally:
+        sharding.g_shard_coordinator = None
@@ -0,0 +1,94 @@
+# Copyright (c) 2024, Oracle and/or its affiliates.
+#
+# Licensed under the Universal Permissive License v 1.0 as shown at https://oss.oracle.com/licenses/upl/
+#
+
+import threading
+import time
+from .controller.utils import ObjectWorkQueue, TimerWheel
+
+
+class Obj:
+    def __init__(self, namespace: str, name: str):
+        self.namespace = namespace
+        self.name = name
+
+
+def test_work_queue_fifo() -> None:
+    queue = ObjectWorkQueue()
+    cluster = Obj("ns", "mycluster")
+    order = []
+
+    assert queue.acquire(cluster, "first", "test", timeout=1, max_waiters=5) is None
+
+    def worker(name: str) -> None:
+        assert queue.acquire(cluster, name, "test", timeout=5, max_waiters=5) is None
+        order.append(name)
+        queue.release(cluster)
+
+    threads = []
+    for name in ("second", "third"):
+        t = threading.Thread(target=worker, args=(name,))
+        t.start()
+        threads.append(t)
+        # make sure the waiters are queued in order
+        while len(queue.queues["ns/mycluster"]) < len(threads) + 1:
+            time.sleep(0.01)
+
+    info = queue.describe()
+    assert len(info) == 1
+    assert info[0]["owner"] == "first"
+    assert info[0]["waiting"] == 2
+
+    queue.release(cluster)
+    for t in threads:
+        t.join()
+
+    assert order == ["second", "third"]
+    assert queue.queues == {}
+    assert queue.holders == {}
+
+
+def test_work_queue_timeout_and_limit() -> None:
+    queue = ObjectWorkQueue()
+    cluster = Obj("ns", "mycluster")
+    other = Obj("ns", "other")
+
+    assert queue.acquire(cluster, "holder", "ctx", timeout=1, max_waiters=1) is None
+    # other objects are not affected
+    assert queue.acquire(other, "holder", "ctx", timeout=0, max_waiters=1) is None
+
+    owner, context, _ = queue.acquire(cluster, "waiter", "test", timeout=0.1, max_waiters=1)
+    assert (owner, context) == ("holder", "ctx")
+    assert len(queue.queues["ns/mycluster"]) == 1
+
+    # with max_waiters=0 nobody may wait behind the holder
+    owner, _, _ = queue.acquire(cluster, "waiter", "test", timeout=10, max_waiters=0)
+    assert owner == "holder"
+
+    queue.release(cluster)
+    queue.release(other)
+    assert queue.queues == {}
+
+
+def test_timer_wheel_collapses_keys() -> None:
+    wheel = TimerWheel("test-wheel", workers=1, tick=0.05)
+    fired = []
+    done = threading.Event()
+
+    def callback(name: str):
+        def f() -> None:
+            fired.append(name)
+            done.set()
+        return f
+
+    assert wheel.schedule("ns/pod-0", 0.2, callback("first"))
+    # a later deadline is collapsed into the pending one, the callback is replaced
+    assert not wheel.schedule("ns/pod-0", 5, callback("second"))
+    assert wheel.pending() == 1
+
+    assert done.wait(5)
+    wheel.stop()
+
+    assert fired == ["second"]
+    assert wheel.pending() == 0